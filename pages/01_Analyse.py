@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.express as px
 from pathlib import Path
 
+from src.loader import load_chart_history
+
 # ------------------------------------------------------------
 # Pfade korrekt auflösen (wichtig, da Datei im pages/ Ordner liegt)
 # ------------------------------------------------------------
@@ -33,7 +35,7 @@ st.markdown("---")
 # ------------------------------------------------------------
 # Daten laden
 # ------------------------------------------------------------
-df = pd.read_csv(DATA_PATH, parse_dates=["chart_week"])
+df = load_chart_history(DATA_PATH)
 seasonal_trends = df.groupby("chart_week")["streams"].sum().reset_index()
 
 # ------------------------------------------------------------
@@ -227,12 +229,12 @@ st.markdown("---")
 # TOP 10 Künstler pro Woche
 # ------------------------------------------------------------
 top_artists_weekly = df[df['rank'] <= 10] \
-    .groupby(['chart_week', 'artist_names'])['streams'] \
+    .groupby(['chart_week', 'artist_names'], observed=True)['streams'] \
     .sum().reset_index()
 
 # Anzahl eines Künstlers in den TOP 10 pro Woche
 top_artists_count = top_artists_weekly \
-    .groupby(['chart_week', 'artist_names']) \
+    .groupby(['chart_week', 'artist_names'], observed=True) \
     .size().reset_index(name='dominance')
 
 top_artists_count = top_artists_count.sort_values('chart_week')
@@ -240,7 +242,7 @@ top_artists_count = top_artists_count.sort_values('chart_week')
 # ------------------------------------------------------------
 # TOP 5 Künstler für übersichtliche Visualisierung
 # ------------------------------------------------------------
-top_overall_artists = df.groupby('artist_names')['streams'] \
+top_overall_artists = df.groupby('artist_names', observed=True)['streams'] \
     .sum().nlargest(5).index
 
 df_filtered = top_artists_weekly[
@@ -392,7 +394,7 @@ top_10_weekly = df[df['rank'] <= 10].copy()
 weekly_total = top_10_weekly.groupby('chart_week')['streams'].sum()
 
 # Stream‑Share pro Künstler und Woche
-artist_dominance = top_10_weekly.groupby(['chart_week', 'artist_names'])['streams'] \
+artist_dominance = top_10_weekly.groupby(['chart_week', 'artist_names'], observed=True)['streams'] \
     .sum().reset_index()
 
 artist_dominance['stream_share'] = artist_dominance.apply(
@@ -401,7 +403,7 @@ artist_dominance['stream_share'] = artist_dominance.apply(
 )
 
 # Top‑Künstler auswählen
-top_artist_list = artist_dominance.groupby('artist_names')['streams'] \
+top_artist_list = artist_dominance.groupby('artist_names', observed=True)['streams'] \
     .mean().nlargest(10).index
 
 df_growth = artist_dominance[
@@ -409,11 +411,11 @@ df_growth = artist_dominance[
 ].copy()
 
 # Rolling Mean (4 Wochen)
-df_growth['rolling_avg'] = df_growth.groupby('artist_names')['stream_share'] \
+df_growth['rolling_avg'] = df_growth.groupby('artist_names', observed=True)['stream_share'] \
     .transform(lambda x: x.rolling(window=4, min_periods=1).mean())
 
 # Wachstumsrate
-df_growth['growth_rate'] = df_growth.groupby('artist_names')['stream_share'] \
+df_growth['growth_rate'] = df_growth.groupby('artist_names', observed=True)['stream_share'] \
     .transform(lambda x: x.pct_change() * 100)
 
 # Cleanup
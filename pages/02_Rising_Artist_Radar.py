@@ -1,5 +1,6 @@
 import os
 import ast
+import hashlib
 from pathlib import Path
 import pandas as pd
 import streamlit as st
@@ -10,11 +11,14 @@ import time
 import math
 
 # ____ Pipeline-Module _____
-from src.extraction_unique_entities import prepare_unique_tracks
-from src.spotify_client import SpotifyClient
-from src.merge_dataframes import merge_new_data
-from src.features import build_features, genre_parser
-from src.predict_pipeline import run_prediction_pipeline
+from src.feature_store import FeatureStore
+from src.history_store import HistoryStore
+from src.genres import explode_genres
+from src.jobs import ACTIVE_STATUSES, JobQueue, background_worker
+from src.model_registry import model_registry
+from src.pipeline import week_job
+from src.prediction_store import PredictionStore, read_radar_data
+from src.regions import DEFAULT_REGION, extract_region_from_filename, list_regions, region_dirs
 from src.trend_reports import generate_gemini_report
 
 # ------------------------------------------------------------ 
@@ -31,6 +35,9 @@ MODEL_DIR = BASE_DIR / "models"
 for d in [RAW_DIR, INTERIM_DIR, BACKUP_DIR]: 
     d.mkdir(parents=True, exist_ok=True)
 
+# Forecast nur für Tracks, die in den letzten N Chart-Wochen platziert waren
+FORECAST_RECENT_WEEKS = 8
+
 # ------------------------------------------------------------
 # Seiteneinstellungen
 # ------------------------------------------------------------
@@ -43,14 +50,8 @@ st.set_page_config(
 # ------------------------------------------------------------
 # Modell-Check
 # ------------------------------------------------------------
-MODEL_FILES = {
-    "Prophet": "models/market_trend_prophet_v1.json",
-    "LightGBM": "models/rising_artist_lgbm_v1.txt",
-    "Threshold": "models/rising_artist_threshold.json",
-    "Feature Columns": "models/rising_artist_features.json"
-}
-
-missing_models = [name for name, path in MODEL_FILES.items() if not Path(path).exists()]
+# Versionierte Modelle (models/registry.json); geladen wird erst beim ersten Scoring
+registry = model_registry(MODEL_DIR)
 
 # ------------------------------------------------------------
 # UI Header
@@ -63,13 +64,39 @@ Entdecken Sie, welche Künstler gerade an Fahrt aufnehmen. Unsere KI analysiert
 
 # Sidebar
 st.sidebar.header("🔧 Systemstatus")
-if missing_models:
+view_version = registry.active_version()
+if view_version is None:
     st.sidebar.error("Modelle konnten nicht geladen werden:")
-    for m in missing_models:
-        st.sidebar.write(f"• {m}")
+    st.sidebar.write(f"• Keine Modellversion in `{MODEL_DIR}` registriert.")
 else:
+    # Angezeigte Version gilt nur für diese Session (gespeicherte Vorhersagen dieser Version);
+    # neue Wochen bewertet immer die aktive Version
+    versions = registry.versions()
+    view_version = st.sidebar.selectbox(
+        "Modellversion", versions, index=versions.index(registry.active_version()),
+        help="Zeigt die gespeicherten Vorhersagen dieser Version (nur in dieser Session)."
+    )
+    if view_version != registry.active_version():
+        st.sidebar.caption(f"Aktive Version für neue Jobs: {registry.active_version()}")
+        confirm = st.sidebar.checkbox(f"{view_version} für alle Sessions und neue Jobs aktivieren")
+        # Hot Swap ohne Neustart: neue Version laden, dann aktivieren
+        if st.sidebar.button("Aktivieren", disabled=not confirm):
+            with st.sidebar.status(f"Wechsle auf {view_version}..."):
+                registry.activate(view_version)
+
     st.sidebar.success("System bereit!")
-    st.sidebar.caption("Alle Modelle geladen.")
+    bundle = registry.loaded()
+    if bundle is None:
+        st.sidebar.caption(f"Modell {registry.active_version()} wird beim ersten Scoring geladen.")
+    else:
+        st.sidebar.caption(
+            f"Modell {bundle.version} geladen in {bundle.load_seconds * 1000:.0f} ms "
+            f"(Threshold {bundle.threshold})."
+        )
+
+# Region (eigene Historie, Features und Vorhersagen pro Markt)
+regions = list_regions(PROCESSED_DIR) or [DEFAULT_REGION]
+region = st.sidebar.selectbox("Region", regions)
 
 # ------------------------------------------------------------
 # Datei-Upload 
@@ -80,202 +107,137 @@ uploaded_file = st.file_uploader(
     type="csv"
 )
 
+# Ein Worker pro Server-Prozess; Jobs und Fortschritt liegen in SQLite und sind
+# für alle Sessions sichtbar (auch nach einem Browser-Refresh)
+jobs = JobQueue(INTERIM_DIR / "jobs.sqlite")
+background_worker(INTERIM_DIR / "jobs.sqlite", {"week": week_job})
+
 if uploaded_file is None:
     st.info("Bitte lade eine CSV-Datei hoch, um die Analyse zu starten.")
-    st.stop()
-
-# ------------------------------------------------------------ 
-# Datei speichern 
-# ------------------------------------------------------------
-# Dateiname für raw_ "_origin" anhängen
-file_path_raw = Path(uploaded_file.name)
-origin_name = f"{file_path_raw.stem}_origin{file_path_raw.suffix}"
-
-# Ursprungsdatei ohne Änderung in raw
-raw_path = RAW_DIR / origin_name
-
-with open(raw_path, "wb") as f: 
-    f.write(uploaded_file.getbuffer())
-
-st.success(f"Datei wurde erfolgreich hochgeladen.")
-st.caption(f"Speicherort der Originaldatei: `{raw_path}`")
-
-# ------------------------------------------------------------ 
-# Schritt 1: Unique Tracks extrahieren 
-# ------------------------------------------------------------
-st.subheader("🔍 Titel & Künstler automatisch erkennen")
-
-processed_path, unique_path, date_str = prepare_unique_tracks(
-    input_path=raw_path, 
-    processed_dir=PROCESSED_DIR, 
-    output_dir=INTERIM_DIR
-)
-
-st.success(f"Titel und Künstler wurden erkannt und gespeichert.")
-st.caption(f"Verarbeitete Datei gespeichert unter: `{processed_path}`") 
-st.caption(f"Unique-Track-Datei gespeichert unter: `{unique_path}`")
-
-# ---------------------------------------------------------------- 
-# Schritt 2: Spotify Enrichment Pipeline mit anschließendem Merge 
-# ----------------------------------------------------------------
-st.subheader("🎼 Spotify-Daten erweitern")
-
-if st.button("🎧 Spotify-Infos laden"):
-    with st.spinner("Hole Spotify-IDs und Metadaten..."):
-        client = SpotifyClient()
-
-        df_enriched = client.run_full_pipeline(
-            unique_tracks_csv=unique_path,
-            date_str=date_str,
-            output_dir=INTERIM_DIR
-        )
-    st.success("Die Titel wurden erfolgreich mit Spotify-Infos angereichert.")
-
+else:
     # ------------------------------------------------------------ 
-    # Schritt 3: Merge: Charts + enriched_data + Historie 
+    # Datei speichern 
     # ------------------------------------------------------------
-    
-    df_final = merge_new_data(
-        charts_csv=PROCESSED_DIR / f"regional_global_weekly_{date_str}.csv", 
-        enriched_csv=INTERIM_DIR / f"enriched_data_{date_str}.csv", 
-        date_str=date_str, 
-        processed_dir=PROCESSED_DIR, 
-        hist_raw_path=PROCESSED_DIR / "hist_data_24-25.csv", 
-        hist_updated_path=PROCESSED_DIR / "hist_data_updated.csv",
-        backup_dir=BACKUP_DIR
-    )
-
-    st.success("Die neuen Daten wurden erfolgreich mit der Historie verbunden.")
-    
-    st.write("Vorschau der angereicherten Daten:")
-    st.dataframe(df_final.tail())
-    
-    # -------------------------------------------------------- 
-    # Schritt 4: Feature Engineering 
-    # -------------------------------------------------------- 
-    st.header("🧠 Daten verarbeiten")
-    st.subheader("🧩 Merkmale berechnen") 
-    
-    df_features = build_features(df_final) 
-    df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce") 
-    
-    st.success("Die Daten wurden erfolgreich aufbereitet.")
+    # Gleiche Datei (gleicher Inhalt) = gleicher Job, egal aus welcher Session;
+    # der Hash steht auch im Dateinamen, damit Job und Datei zusammenpassen
+    file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
+    # Dateiname für raw_ "_<hash>_origin" anhängen
+    file_path_raw = Path(uploaded_file.name)
+    origin_name = f"{file_path_raw.stem}_{file_hash[:12]}_origin{file_path_raw.suffix}"
+
+    # Ursprungsdatei ohne Änderung in raw (gleicher Inhalt liegt schon unter diesem Namen)
+    raw_path = RAW_DIR / origin_name
+
+    if not raw_path.exists():
+        with open(raw_path, "wb") as f: 
+            f.write(uploaded_file.getbuffer())
+
+    st.success(f"Datei wurde erfolgreich hochgeladen.")
+    st.caption(f"Speicherort der Originaldatei: `{raw_path}`")
+
+    # ---------------------------------------------------------------- 
+    # Verarbeitung im Hintergrund: Unique Tracks → Spotify-Enrichment → Merge
+    # → Features → Vorhersage → Forecast (src/pipeline.py)
+    # ----------------------------------------------------------------
+    st.subheader("🎼 Spotify-Daten erweitern")
+
+    if st.button("🎧 Spotify-Infos laden"):
+        _, created = jobs.submit(
+            "week",
+            file_hash,
+            {"raw_path": str(raw_path), "base_dir": str(BASE_DIR), "recent_weeks": FORECAST_RECENT_WEEKS}
+        )
+        if created:
+            st.success("Die Woche wird im Hintergrund verarbeitet.")
+        else:
+            st.info("Diese Datei wurde bereits eingereicht.")
 
-    # -------------------------------------------------------- 
-    # Schritt 5a: Prediction Pipeline 
-    # -------------------------------------------------------- 
-    st.subheader("🤖 KI‑Vorhersage starten") 
-    
-    preds, probs = run_prediction_pipeline(df_features) 
-    
-    df_features["is_rising"] = preds 
-    df_features["probability"] = probs 
+# ------------------------------------------------------------ 
+# Verarbeitungsstatus (alle Sessions)
+# ------------------------------------------------------------
+STAGE_LABELS = {
+    "ingest": "Titel & Künstler erkennen",
+    "enrich": "Spotify-Daten erweitern",
+    "merge": "Mit der Historie verbinden",
+    "features": "Merkmale berechnen",
+    "predict": "KI-Vorhersage",
+    "forecast": "Zukunftsprognose",
+}
 
-    st.session_state["df_features"] = df_features
-    
-    st.success("Die KI-Vorhersagen sind bereit.")
+@st.fragment(run_every=2)
+def job_status():
+    recent = jobs.recent(limit=5)
+    if not recent:
+        return
+
+    st.subheader("⏳ Verarbeitung")
+    for job in recent:
+        name = Path(job["payload"]["raw_path"]).name
+        if job["status"] in ("queued", "running"):
+            label = STAGE_LABELS.get(job["stage"], "Wartet auf den Worker")
+            st.progress(job["progress"], text=f"{name}: {label}")
+        elif job["status"] == "done":
+            result = job["result"]
+            st.caption(
+                f"✅ {name}: Woche {result['date_str']} verarbeitet "
+                f"({result['weeks']} Wochen, Forecast für {result['forecast_tracks']:,} aktive Tracks)."
+            )
+        else:
+            st.caption(f"❌ {name}: {job['error']}")
 
-    # -------------------------------------------------------- 
-    # Schritt 5b: Zukunfts-Horizont erzeugen (Forecast) 
-    # -------------------------------------------------------- 
-    
-    # Parameter: wie viele Wochen in die Zukunft?
-    FORECAST_WEEKS = 12  # z.B. 12 Wochen
-    
-    # Letztes historisches Datum bestimmen
-    last_ds = df_features["ds"].max()
-    
-    # Zukünftige Wochen erzeugen
-    future_dates = pd.date_range(
-        start=last_ds + pd.Timedelta(weeks=1),
-        periods=FORECAST_WEEKS,
-        freq="W"
-    )
-    
-    # DataFrame für zukünftige Wochen
-    future_dates_df = pd.DataFrame({
-        "ds_future": future_dates,
-        "key": 1
-    })
-    
-    # Pro Track die letzte bekannte Zeile nehmen
-    last_per_track = (
-        df_features.sort_values("ds")
-        .groupby("track_id")
-        .tail(1)
-    )
-    
-    # Sicherstellen, dass 'ds' existiert
-    if "ds" not in last_per_track.columns:
-        last_per_track["ds"] = last_per_track["chart_week"]
-    
-    # 'ds' umbenennen, damit der Merge sauber funktioniert
-    last_per_track = last_per_track.rename(columns={"ds": "ds_last"})
-    
-    # Cross Join: jeder Track × jede zukünftige Woche
-    last_per_track = last_per_track.assign(key=1)
-    
-    future_df = last_per_track.merge(
-        future_dates_df,
-        on="key",
-        how="outer"
-    ).drop(columns=["key"])
-    
-    # ds auf ds_future setzen
-    future_df["ds"] = future_df["ds_future"]
-    
-    # chart_week auf ds setzen (für Konsistenz)
-    future_df["chart_week"] = future_df["ds"]
-    
-    # Aufräumen
-    future_df = future_df.drop(columns=["ds_last", "ds_future"])
-    
-    # Zeitbasierte Regressoren aus der Historie ableiten
-    regressor_time = (
-        df_features.groupby("ds")[["genre_idx_lagged", "seasonality_score"]]
-        .mean()
-        .reset_index()
-    )
-    
-    future_df = future_df.drop(columns=["genre_idx_lagged", "seasonality_score"], errors="ignore")
-    future_df = future_df.merge(regressor_time, on="ds", how="left")
-    
-    # Robust füllen: erst bfill, dann ffill
-    future_df["genre_idx_lagged"] = future_df["genre_idx_lagged"].bfill().ffill()
-    future_df["seasonality_score"] = future_df["seasonality_score"].bfill().ffill()
-    
-    # Falls immer noch NaN (z. B. komplett fehlende Historie)
-    future_df["genre_idx_lagged"] = future_df["genre_idx_lagged"].fillna(0)
-    future_df["seasonality_score"] = future_df["seasonality_score"].fillna(0)
+    # Dashboard neu laden, sobald ein Job fertig wird
+    finished = {job["job_id"] for job in recent if job["status"] == "done"}
+    if "jobs_done" in st.session_state and finished - st.session_state["jobs_done"]:
+        st.session_state["jobs_done"] = finished
+        st.rerun(scope="app")
+    st.session_state["jobs_done"] = finished
 
-    
-    # Prediction Pipeline auf Zukunft laufen lassen
-    future_preds, future_probs = run_prediction_pipeline(future_df)
-    
-    future_df["is_rising"] = future_preds
-    future_df["probability"] = future_probs
-    
-    # Flag für Zukunft
-    df_features["is_future"] = False
-    future_df["is_future"] = True
-    
-    # Historische + zukünftige Daten zusammenführen
-    df_all = pd.concat([df_features, future_df], ignore_index=True)
-    
-    # In Session State speichern
-    st.session_state["df_features"] = df_all
-    
-    st.success("Zukunftsprognosen wurden für alle Tracks berechnet.")
+job_status()
 
 # ------------------------------------------------------------ 
 # Dashboard (Visualisierungen)
 # ------------------------------------------------------------
 st.header("📊 Analyse & Visualisierung")
 
-if "df_features" not in st.session_state:
+# Das Dashboard liest nur, was Job-Worker bzw. CLI gespeichert haben (read_radar_data);
+# berechnet oder geschrieben wird hier nichts. Neu geladen wird nach einem fertigen Job
+# der Region bzw. einem neuen gespeicherten Forecast, nie während ein Job der Region läuft.
+stores = region_dirs(PROCESSED_DIR, region)
+history = HistoryStore(stores["history"], region)
+if history.is_empty() or view_version is None:
     st.info("Bitte lade zuerst Spotify-Infos und starte die KI-Vorhersage.")
     st.stop()
 
+region_jobs = [
+    job for job in jobs.recent(limit=50)
+    if extract_region_from_filename(job["payload"]["raw_path"]) == region
+]
+region_busy = any(job["status"] in ACTIVE_STATUSES for job in region_jobs)
+last_done = max(
+    ((job["finished_at"], job["job_id"]) for job in region_jobs if job["status"] == "done"), default=None
+)
+
+view_fingerprint = registry.version_fingerprint(view_version)
+prediction_store = PredictionStore(stores["predictions"], view_fingerprint)
+data_version = (region, view_fingerprint, last_done, prediction_store.latest_forecast()[0])
+
+if region_busy and st.session_state.get("data_version", (None,))[0] == region:
+    st.caption("Eine neue Woche wird gerade verarbeitet; angezeigt wird der letzte gespeicherte Stand.")
+elif region_busy:
+    st.info("Diese Region wird gerade verarbeitet. Das Dashboard erscheint, sobald der Job fertig ist.")
+    st.stop()
+elif st.session_state.get("data_version") != data_version:
+    with st.spinner("Lade gespeicherte Vorhersagen..."):
+        df_loaded, _ = read_radar_data(
+            history, FeatureStore(stores["features"]), prediction_store, recent_weeks=FORECAST_RECENT_WEEKS
+        )
+    if df_loaded is None:
+        st.info("Für diese Region und Modellversion liegen noch keine Vorhersagen vor.")
+        st.stop()
+    st.session_state["df_features"] = df_loaded
+    st.session_state["data_version"] = data_version
+
 df_all = st.session_state["df_features"].copy()
 df_display = df_all.copy()
 
@@ -304,11 +266,8 @@ elif view_mode == "Nur Forecast":
 if "artist_genres" in df_display.columns:
     st.subheader("🔥 Genre Trend Heatmap")
 
-    # Kopie für die Heatmap erstellen, um df_display nicht für andere Charts zu verändern
-    df_heatmap = df_display.copy()
-    
-    # Explode: Erstellt pro Genre eine eigene Zeile
-    df_heatmap = df_heatmap.explode("artist_genres")
+    # Explode über die Genre-IDs: pro Genre eine eigene Zeile (nur benötigte Spalten)
+    df_heatmap = explode_genres(df_display, ["ds", "probability"], name="artist_genres")
 
     # Ungültige Genres entfernen
     df_heatmap = df_heatmap.dropna(subset=["artist_genres"])
@@ -316,7 +275,7 @@ if "artist_genres" in df_display.columns:
     
     # Aggregation: Durchschnittliche Wahrscheinlichkeit pro Woche und Genre
     genre_trend = (
-        df_heatmap.groupby(["ds", "artist_genres"])["probability"]
+        df_heatmap.groupby(["ds", "artist_genres"], observed=True)["probability"]
         .mean()
         .reset_index()
         .sort_values("ds")
@@ -324,7 +283,7 @@ if "artist_genres" in df_display.columns:
 
     # Nur Top-Genres anzeigen (optional, verhindert eine zu lange Y-Achse)
     top_genres = (
-        genre_trend.groupby("artist_genres")["probability"]
+        genre_trend.groupby("artist_genres", observed=True)["probability"]
         .sum()
         .nlargest(20)
         .index
@@ -379,7 +338,7 @@ if not hist_df.empty:
 
     hist_unique = (
         hist_last_week.sort_values("probability", ascending=False)
-        .drop_duplicates(subset=["artist_names", "track_name"])
+        .drop_duplicates(subset=["track_key"])
     )
     top_10_hist = hist_unique.nlargest(10, "probability")
 else:
@@ -393,7 +352,7 @@ if not future_df.empty:
 
     future_unique = (
         future_first_week.sort_values("probability", ascending=False)
-        .drop_duplicates(subset=["artist_names", "track_name"])
+        .drop_duplicates(subset=["track_key"])
     )
     top_10_future = future_unique.nlargest(10, "probability")
 else:
@@ -449,16 +408,15 @@ else:
 st.subheader("📈 Song-spezifischer Probability-Forecast")
 
 selected_artist = st.selectbox("Künstler wählen:", df_all["artist_names"].unique())
-selected_song = st.selectbox(
-    "Song wählen:",
-    df_all[df_all["artist_names"] == selected_artist]["track_name"].unique()
-)
+
+# Songs des Künstlers über track_key (Anzeige mit Songtitel)
+artist_tracks = df_all[df_all["artist_names"] == selected_artist].drop_duplicates("track_key")
+song_titles = dict(zip(artist_tracks["track_key"], artist_tracks["track_name"]))
+selected_key = st.selectbox("Song wählen:", list(song_titles), format_func=song_titles.get)
+selected_song = song_titles.get(selected_key)
 
 # Daten für diesen Song
-song_data = df_all[
-    (df_all["artist_names"] == selected_artist) &
-    (df_all["track_name"] == selected_song)
-].sort_values("ds")
+song_data = df_all[df_all["track_key"] == selected_key].sort_values("ds")
 
 if not song_data.empty:
 
@@ -546,7 +504,7 @@ if st.button("🪄 Analyse-Bericht generieren"):
 
                 future_unique = (
                     df_future_week.sort_values("probability", ascending=False)
-                    .drop_duplicates(subset=["artist_names", "track_name"])
+                    .drop_duplicates(subset=["track_key"])
                 )
                 top_10_future = future_unique.nlargest(10, "probability")
 
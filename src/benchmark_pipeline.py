@@ -0,0 +1,298 @@
+"""
+Benchmark aller Pipeline-Stufen auf synthetischen Charts (synthetic_charts.py).
+
+Gemessen werden prepare_unique_tracks, merge_new_data, load_chart_history, build_features,
+run_prediction_pipeline und der Forecast (score_forecast) entlang zweier Achsen,
+ausgehend vom aktuellen Volumen (107 Wochen Global Top 200 ≈ 21k Zeilen):
+- --scales: Chart-Tiefe pro Woche (1×, 10×, 100×), eine Region
+- --regions: Anzahl Regionen (1 bis 70 Märkte) mit je eigener Historie; die Stufen
+  laufen wie in der Pipeline pro Region, gemessen wird die Summe über alle Regionen
+
+Jede Kombination läuft in einem eigenen Prozess (sauberer Speicher-Ausgangswert).
+Pro Stufe: Laufzeit des ersten Laufs (first_seconds, kalt: leere Trend-Tabelle,
+Historie ohne die neue Woche), beste Laufzeit aus --repeat Läufen (seconds) und
+Peak-RSS über dem Stand vor der Stufe. Stufen mit Zustand auf der Platte
+(merge_new_data, Prophet-Trend) werden vor jedem Lauf zurückgesetzt, damit auch
+die Wiederholungen den kalten Pfad messen statt eines Cache-Treffers.
+Ergebnisse landen als CSV in data/interim/benchmarks/; mit --compare wird gegen
+einen früheren Lauf verglichen.
+
+Aufruf: python -m src.benchmark_pipeline --scales 1 10 100 --regions 1 10 70 --repeat 3
+"""
+import argparse
+import ctypes
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from .synthetic_charts import generate_charts, history_frame, write_chart_files
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = BASE_DIR / "data" / "interim" / "benchmarks"
+
+# Aktuelles Volumen: 107 Wochen × Top 200
+BASE_WEEKS = 107
+BASE_DEPTH = 200
+
+# Märkte für die Regionen-Achse (global + 69 Länder = 70 Charts)
+REGION_CODES = (
+    "global", "ar", "at", "au", "be", "bg", "bo", "br", "by", "ca", "ch", "cl", "co", "cr",
+    "cy", "cz", "de", "dk", "do", "ec", "ee", "eg", "es", "fi", "fr", "gb", "gr", "gt", "hk",
+    "hn", "hu", "id", "ie", "il", "in", "is", "it", "jp", "kr", "kz", "lt", "lu", "lv", "ma",
+    "mx", "my", "ng", "ni", "nl", "no", "nz", "pa", "pe", "ph", "pk", "pl", "pt", "py", "ro",
+    "sa", "se", "sg", "sk", "sv", "th", "tr", "tw", "ua", "us", "za",
+)
+
+
+# ____ SPEICHERMESSUNG ____
+
+def _malloc_trim():
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class PeakRss:
+    """
+    Misst den Peak-RSS eines Blocks über einen Sampling-Thread (/proc/self/statm,
+    alle interval Sekunden). Ohne /proc (macOS, Windows) bleibt nur ru_maxrss.
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except OSError:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        # Freigegebenen Speicher vorheriger Stufen zurückgeben, damit er nicht wiederverwendet
+        # wird und den Peak dieser Stufe verdeckt
+        gc.collect()
+        _malloc_trim()
+        self.baseline = self.peak = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+    @property
+    def delta_mb(self):
+        return (self.peak - self.baseline) / 2**20
+
+
+# ____ SETUP ____
+
+def prepare_workspace(root, scale, weeks=BASE_WEEKS, seed=42, n_regions=1):
+    """
+    Legt Projekt-Ordner mit synthetischen Daten an: pro Region die letzte Woche als
+    Roh-Datei plus enriched_data, alle Wochen davor als Historie (bereits im
+    HistoryStore der Region).
+
+    Returns:
+        (dirs, {region: raw_path}, date_str, Zeilen insgesamt)
+    """
+    from .history_store import HistoryStore
+    from .regions import region_dirs, week_tag
+
+    root = Path(root)
+    dirs = {name: root / "data" / name for name in ("raw", "interim", "processed", "backups")}
+    for d in dirs.values():
+        d.mkdir(parents=True, exist_ok=True)
+
+    regions = REGION_CODES[:n_regions]
+    charts, meta = generate_charts(weeks=weeks, regions=regions, depth=BASE_DEPTH * scale, seed=seed)
+    last_week = charts["chart_week"].max()
+    date_str = f"{last_week:%Y-%m-%d}"
+
+    raw_paths = {}
+    for region, df_region in charts.groupby("region", sort=False):
+        raw_paths[region] = write_chart_files(df_region[df_region["chart_week"] == last_week], dirs["raw"])[0]
+        meta.to_csv(dirs["interim"] / f"enriched_data_{week_tag(region, date_str)}.csv", index=False)
+
+        hist_path = dirs["interim"] / f"hist_{region}.csv"
+        history_frame(df_region[df_region["chart_week"] < last_week], meta).to_csv(hist_path, index=False)
+        HistoryStore(region_dirs(dirs["processed"], region)["history"], region).bootstrap_from_csv(hist_path)
+        hist_path.unlink()
+
+    return dirs, raw_paths, date_str, len(charts)
+
+
+# ____ BENCHMARK ____
+
+def _timed(results, stage, repeat, func, reset=None):
+    """
+    Führt func repeat-mal aus (vorher jeweils reset(), nicht mitgemessen); festgehalten
+    werden die Zeit des ersten Laufs, die beste Zeit und der größte Speicher-Peak.
+    """
+    times, peak, out = [], 0.0, None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        with PeakRss() as mem:
+            t0 = time.perf_counter()
+            out = func()
+            times.append(time.perf_counter() - t0)
+        peak = max(peak, mem.delta_mb)
+    results.append({
+        "stage": stage,
+        "first_seconds": round(times[0], 4),
+        "seconds": round(min(times), 4),
+        "peak_rss_mb": round(peak, 1),
+    })
+    print(f"  {stage}: erster Lauf {times[0]:.3f}s, bester {min(times):.3f}s, +{peak:.0f} MB")
+    return out
+
+
+def _snapshot(paths, backup_root):
+    """Sichert Ordner (vor einer schreibenden Stufe) und liefert eine Funktion, die sie wiederherstellt."""
+    saved = {}
+    for i, path in enumerate(paths):
+        saved[path] = Path(backup_root) / str(i)
+        shutil.copytree(path, saved[path])
+
+    def restore():
+        for path, copy in saved.items():
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.copytree(copy, path)
+    return restore
+
+
+def benchmark_scale(scale, weeks=BASE_WEEKS, repeat=3, seed=42, n_regions=1):
+    """Alle Stufen für eine Skalierung und Anzahl Regionen (läuft in einem eigenen Prozess)."""
+    from .extraction_unique_entities import prepare_unique_tracks
+    from .features import build_features
+    from .forecast import score_forecast
+    from .loader import load_chart_history
+    from .merge_dataframes import merge_new_data
+    from .model_registry import model_registry
+    from .predict_pipeline import run_prediction_pipeline
+    from .regions import region_dirs, week_tag
+
+    def per_region(func):
+        """func(region) für jede Region (wie die Pipeline: eine Region nach der anderen)."""
+        return lambda: {region: func(region) for region in raw_paths}
+
+    def reset_trend():
+        shutil.rmtree(trend_dir, ignore_errors=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs, raw_paths, date_str, n_rows = prepare_workspace(tmp, scale, weeks, seed, n_regions)
+        trend_dir = dirs["interim"] / "prophet_trend"
+        model_registry(BASE_DIR / "models").get()
+        print(f"Skalierung {scale}×, {n_regions} Regionen: {n_rows:,} Zeilen")
+
+        # Historien und Backups vor dem Merge, damit jede Wiederholung die neue Woche neu schreibt
+        reset_history = _snapshot(
+            [region_dirs(dirs["processed"], region)["history"] for region in raw_paths] + [dirs["backups"]],
+            Path(tmp) / "snapshot"
+        )
+
+        results = []
+        _timed(results, "prepare_unique_tracks", repeat, per_region(lambda region: prepare_unique_tracks(
+            raw_paths[region], dirs["processed"], dirs["interim"]
+        )))
+        stores = _timed(results, "merge_new_data", repeat, per_region(lambda region: merge_new_data(
+            charts_csv=dirs["processed"] / f"regional_{region}_weekly_{date_str}.csv",
+            enriched_csv=dirs["interim"] / f"enriched_data_{week_tag(region, date_str)}.csv",
+            date_str=date_str,
+            processed_dir=dirs["processed"],
+            hist_raw_path=dirs["processed"] / "hist_data_updated.csv",
+            hist_updated_path=dirs["processed"] / "hist_data_updated.csv",
+            backup_dir=dirs["backups"],
+            history_dir=region_dirs(dirs["processed"], region)["history"],
+            region=region
+        )[1]), reset=reset_history)
+        df_all = _timed(results, "load_chart_history", repeat, per_region(
+            lambda region: load_chart_history(stores[region], report=False)
+        ))
+        df_features = _timed(results, "build_features", repeat, per_region(lambda region: build_features(df_all[region])))
+        del df_all
+        for df in df_features.values():
+            df["ds"] = df["chart_week"]
+        _timed(results, "run_prediction_pipeline", repeat, per_region(
+            lambda region: run_prediction_pipeline(df_features[region], trend_dir=trend_dir)
+        ), reset=reset_trend)
+        _timed(results, "score_forecast", repeat, per_region(
+            lambda region: score_forecast(df_features[region], trend_dir=trend_dir)
+        ), reset=reset_trend)
+
+    return [{"scale": scale, "regions": n_regions, "rows": n_rows, **r} for r in results]
+
+
+def run_benchmarks(scales=(1, 10, 100), weeks=BASE_WEEKS, repeat=3, seed=42, regions=(1,)):
+    """Benchmark über alle Skalierungen × Anzahl Regionen, je Kombination ein frischer Prozess."""
+    results = []
+    for n_regions in regions:
+        for scale in scales:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results += pool.submit(benchmark_scale, scale, weeks, repeat, seed, n_regions).result()
+    return pd.DataFrame(results)
+
+
+def compare(current, previous_csv):
+    """Laufzeit- und Speicher-Verhältnis zu einem früheren Lauf (> 1 = langsamer/größer)."""
+    previous = pd.read_csv(previous_csv)
+    # Ältere Läufe kannten nur eine Region und nur die beste Zeit
+    if "regions" not in previous.columns:
+        previous["regions"] = 1
+    if "first_seconds" not in previous.columns:
+        previous["first_seconds"] = float("nan")
+    merged = current.merge(previous, on=["scale", "regions", "stage"], suffixes=("", "_prev"))
+    merged["first_ratio"] = (merged["first_seconds"] / merged["first_seconds_prev"]).round(2)
+    merged["time_ratio"] = (merged["seconds"] / merged["seconds_prev"]).round(2)
+    merged["mem_ratio"] = (merged["peak_rss_mb"] / merged["peak_rss_mb_prev"]).round(2)
+    return merged[[
+        "scale", "regions", "stage", "first_seconds_prev", "first_seconds", "first_ratio",
+        "seconds_prev", "seconds", "time_ratio", "peak_rss_mb_prev", "peak_rss_mb", "mem_ratio"
+    ]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline-Stufen auf synthetischen Charts")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--regions", type=int, nargs="+", default=[1],
+                        help=f"Anzahl Regionen (bis {len(REGION_CODES)})")
+    parser.add_argument("--weeks", type=int, default=BASE_WEEKS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", default=None, help="CSV eines früheren Laufs")
+    args = parser.parse_args()
+
+    df = run_benchmarks(args.scales, args.weeks, args.repeat, args.seed, args.regions)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = RESULTS_DIR / f"{datetime.now():%Y-%m-%d_%H-%M-%S}.csv"
+    df.to_csv(out, index=False)
+
+    print(df.to_string(index=False))
+    if args.compare:
+        print(compare(df, args.compare).to_string(index=False))
+    print(f"Ergebnisse gespeichert: {out}")
@@ -1,7 +1,23 @@
 import pandas as pd
+import argparse
+import glob
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from .regions import extract_region_from_filename, week_tag
+
+# Spalten, die aus den wöchentlichen Chart-Exports übernommen werden (vgl. Notebooks 01/02)
+CHART_COLUMNS = [
+    "chart_week", "region", "rank", "uri", "artist_names",
+    "track_name", "peak_rank", "previous_rank",
+    "weeks_on_chart", "streams"
+]
+
+# Nur echte Chart-Exports, z.B. regional-global-weekly-2024-01-04.csv (keine -checkpoint-Kopien)
+CHART_FILE_PATTERN = re.compile(r"^regional-[a-z]+-weekly-\d{4}-\d{2}-\d{2}(_[0-9a-f]{12})?(_origin)?\.csv$")
+
 def extract_date_from_filename(filename: str) -> str: 
     """
     Extrahiert das Datum aus einem Dateinamen wie: 
@@ -12,12 +28,20 @@ def extract_date_from_filename(filename: str) -> str:
         raise ValueError(f"Kein Datum im Dateinnamen gefunden: {filename}")
     return match.group(0)
 
+def track_id_from_uri(uri: pd.Series) -> pd.Series:
+    """
+    Extrahiert die Track-ID aus der Spalte 'uri' (spotify:track:<id>).
+    Leere oder ungültige URIs werden zu NaN.
+    """
+    return uri.astype(str).str.extract(r"^spotify:track:([A-Za-z0-9]+)$", expand=False)
+
 def prepare_unique_tracks(input_path: str, processed_dir: str, output_dir: str):
     """
     1. Die CSV-Datei laden
-    2. Datum aus Dateinamen extrahieren
-    3. Spalte chart_week einfügen (zunächst als String, später im Datumsformat)
+    2. Datum und Region aus Dateinamen extrahieren
+    3. Spalten chart_week und region einfügen (chart_week zunächst als String, später im Datumsformat)
     4. Eindeutige Kombinationen aus track_name + artist_names erzeugen
+       (inkl. track_id aus der Spalte 'uri', falls vorhanden)
     5. Datei speichern
     """
     input_path = Path(input_path)
@@ -27,33 +51,130 @@ def prepare_unique_tracks(input_path: str, processed_dir: str, output_dir: str):
     processed_dir.mkdir(parents=True, exist_ok=True) 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Datum extrahieren
+    # Datum und Region extrahieren
     date_str = extract_date_from_filename(input_path.name)
+    region = extract_region_from_filename(input_path.name)
 
     df = pd.read_csv(input_path)
 
     # chart_week-Spalte einfügen
     df.insert(0, "chart_week", date_str)
+    df.insert(1, "region", region)
 
     # chart_week als Datum casten
     df["chart_week"] = pd.to_datetime(df["chart_week"], format="%Y-%m-%d")
     
     # Original-Datei mit Spalte "chart_week" speichern
-    processed_path = processed_dir / f"regional_global_weekly_{date_str}.csv" 
+    processed_path = processed_dir / f"regional_{region}_weekly_{date_str}.csv" 
     df.to_csv(processed_path, index=False)
 
     # Eindeutige Kombinationen extrahieren
     df_unique = df.drop_duplicates(subset=["track_name","artist_names"])
     
-    # Nur track_name und artist_names behalten
-    df_unique = df_unique[["track_name", "artist_names"]]
+    # Nur track_name und artist_names behalten, track_id direkt aus der uri übernehmen
+    if "uri" in df_unique.columns:
+        df_unique = df_unique.assign(track_id=track_id_from_uri(df_unique["uri"]))
+        df_unique = df_unique[["track_name", "artist_names", "track_id"]]
+    else:
+        df_unique = df_unique[["track_name", "artist_names"]]
 
     # Speichern
     output_dir_path = Path(output_dir) 
     output_dir_path.mkdir(parents=True, exist_ok=True) 
     
-    output_path = output_dir_path / f"unique_tracks_to_enrich_{date_str}.csv"
+    output_path = output_dir_path / f"unique_tracks_to_enrich_{week_tag(region, date_str)}.csv"
     df_unique.to_csv(output_path, index=False)
 
     print(f"Gespeichert unter: {output_path}")
-    return processed_path, output_path, date_str
\ No newline at end of file
+    return processed_path, output_path, date_str
+
+
+# ____ BULK-INGEST ____
+
+def _read_chart_file(path: str) -> pd.DataFrame:
+    """Liest einen wöchentlichen Chart-Export und ergänzt chart_week aus dem Dateinamen."""
+    df = pd.read_csv(path)
+    df["chart_week"] = pd.to_datetime(extract_date_from_filename(Path(path).name), format="%Y-%m-%d")
+    df["region"] = extract_region_from_filename(path)
+    return df[[c for c in CHART_COLUMNS if c in df.columns]]
+
+def find_chart_files(source) -> list:
+    """
+    Sammelt Chart-Exports aus einem Ordner, einem Glob-Muster oder einer Liste davon.
+    """
+    sources = source if isinstance(source, (list, tuple)) else [source]
+    files = []
+    for src in sources:
+        src = str(src)
+        matches = glob.glob(os.path.join(src, "*.csv")) if os.path.isdir(src) else glob.glob(src)
+        files += [f for f in matches if CHART_FILE_PATTERN.match(Path(f).name)]
+    return sorted(set(files))
+
+def ingest_charts(source, processed_dir=None, output_dir=None, max_workers=None):
+    """
+    Führt beliebig viele wöchentliche Chart-Exports in einem Durchgang zusammen
+    (ersetzt die manuellen Merges aus den Notebooks 01–03):
+    1. Dateien parallel in einem Prozess-Pool einlesen, chart_week aus dem Dateinamen
+    2. Zusammenführen, Namen bereinigen, Duplikate (uri + chart_week) entfernen
+    3. Eindeutige Tracks (track_name + artist_names, inkl. track_id aus der uri) extrahieren
+    4. Optional speichern: df_cleaned_full.csv und unique_tracks_to_enrich.csv
+
+    Returns:
+        (df_full, df_unique)
+    """
+    files = find_chart_files(source)
+    if not files:
+        raise ValueError(f"Keine Chart-Dateien gefunden: {source}")
+
+    print(f"Lese {len(files)} Chart-Dateien ein...")
+    if max_workers == 1 or len(files) == 1:
+        frames = [_read_chart_file(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(_read_chart_file, files, chunksize=4))
+
+    df_full = pd.concat(frames, ignore_index=True)
+
+    # Whitespaces an den Enden entfernen
+    df_full["artist_names"] = df_full["artist_names"].str.strip()
+    df_full["track_name"] = df_full["track_name"].str.strip()
+
+    # Duplikate (Song + Woche + Region) entfernen und nach Datum, Region und Rank sortieren
+    df_full = (
+        df_full.drop_duplicates(subset=["uri", "chart_week", "region"], keep="last")
+        .sort_values(by=["chart_week", "region", "rank"])
+        .reset_index(drop=True)
+    )
+
+    # Eindeutige Tracks über alle Wochen
+    df_unique = df_full.drop_duplicates(subset=["track_name", "artist_names"], keep="last")
+    df_unique = df_unique.assign(track_id=track_id_from_uri(df_unique["uri"]))
+    df_unique = df_unique[["track_name", "artist_names", "track_id"]].reset_index(drop=True)
+
+    print(f"{len(df_full)} Zeilen aus {df_full['chart_week'].nunique()} Wochen, "
+          f"{len(df_unique)} eindeutige Tracks.")
+
+    if processed_dir is not None:
+        processed_dir = Path(processed_dir)
+        processed_dir.mkdir(parents=True, exist_ok=True)
+        df_full.to_csv(processed_dir / "df_cleaned_full.csv", index=False)
+        print(f"Gespeichert unter: {processed_dir / 'df_cleaned_full.csv'}")
+
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        df_unique.to_csv(output_dir / "unique_tracks_to_enrich.csv", index=False)
+        print(f"Gespeichert unter: {output_dir / 'unique_tracks_to_enrich.csv'}")
+
+    return df_full, df_unique
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wöchentliche Chart-Exports gesammelt einlesen")
+    parser.add_argument("source", nargs="+", help="Ordner oder Glob-Muster, z.B. data/raw/weekly-top-songs-global-2024")
+    parser.add_argument("--processed-dir", default=None)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    ingest_charts(args.source, args.processed_dir, args.output_dir, args.workers)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .history_store import HistoryStore, file_sha256
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "interim" / "feature_cache"
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GB
+DEFAULT_MAX_ENTRIES = 64
+
+
+# ____ FINGERPRINTS ____
+
+def fingerprint(*parts):
+    """Stabiler SHA-256-Schlüssel aus beliebigen JSON-fähigen Bestandteilen."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def history_fingerprint(store: HistoryStore):
+    """Datenversion der Historie: nur die Prüfsummen aus dem Manifest, kein Hashing der Daten."""
+    return fingerprint({week: meta["sha256"] for week, meta in store.manifest["weeks"].items()})
+
+
+def files_fingerprint(paths):
+    """Prüfsumme mehrerer Dateien (z.B. Modell-Artefakte)."""
+    return fingerprint({Path(p).name: file_sha256(p) for p in paths})
+
+
+# ____ CACHE ____
+
+class FeatureCache:
+    """
+    Persistenter, content-addressed Cache für DataFrames (eine Parquet-Datei pro Schlüssel).
+
+    Der Schlüssel ist ein Fingerprint der Eingaben (z.B. Historien-Prüfsummen +
+    Feature-Version), die Daten selbst werden nie gehasht. Übersteht Neustarts,
+    verdrängt wird nach LRU (Dateizeit wird bei jedem Treffer aktualisiert), sobald
+    max_bytes oder max_entries überschritten sind.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def path(self, key):
+        return self.root / f"{key}.parquet"
+
+    def get(self, key, columns=None):
+        """DataFrame zum Schlüssel oder None."""
+        path = self.path(key)
+        try:
+            df = pd.read_parquet(path, columns=columns)
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return df
+
+    def put(self, key, df):
+        path = self.path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def get_or_compute(self, key, compute):
+        """Liefert den gecachten DataFrame oder berechnet und speichert ihn."""
+        df = self.get(key)
+        if df is None:
+            t0 = time.perf_counter()
+            df = compute()
+            self.put(key, df)
+            print(f"Cache-Eintrag {key[:12]} berechnet ({time.perf_counter() - t0:.2f}s).")
+        return df
+
+    # ____ VERDRÄNGUNG ____
+    def entries(self):
+        """(Pfad, Größe, letzte Nutzung) aller Einträge, zuletzt genutzte zuerst."""
+        entries = []
+        for path in self.root.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda e: e[2], reverse=True)
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Entfernt die am längsten nicht genutzten Einträge über den Limits."""
+        total = 0
+        for i, (path, size, _) in enumerate(self.entries()):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                path.unlink(missing_ok=True)
+                self.stats["evicted"] += 1
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            path.unlink(missing_ok=True)
@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .feature_cache import FeatureCache, fingerprint, history_fingerprint
+from .features import build_features
+from .genres import genre_pop_index, parse_genres
+from .history_store import HistoryStore, atomic_write_json
+from .keys import KEY_COLUMNS, add_keys, ordered_codes
+from .loader import apply_schema, load_chart_history
+
+# Version der Feature-Berechnung: bei Änderungen an build_features erhöhen,
+# dann wird der FeatureStore beim nächsten update() komplett neu aufgebaut.
+# 2: Spalte region (Multi-Region, siehe regions.py)
+FEATURE_VERSION = 2
+
+MANIFEST_NAME = "manifest.json"
+
+
+# ____ CARRY-OVER STATE ____
+
+def _empty_state():
+    return {
+        "last_week": None,
+        "artist_last_streams": {},
+        "month_sums": {},
+        "month_counts": {},
+        "total_sum": 0.0,
+        "total_count": 0,
+        "last_genre_idx": None,
+    }
+
+
+def _to_json_float(value):
+    return None if pd.isna(value) else float(value)
+
+
+def _from_json_float(value):
+    return np.nan if value is None else value
+
+
+def state_from_features(df_features):
+    """
+    Leitet den Carry-Over-State aus einem vollständig berechneten Feature-Frame ab
+    (Reihenfolge wie von build_features: chart_week, innerhalb der Woche artist_names).
+    """
+    state = _empty_state()
+    if df_features.empty:
+        return state
+
+    streams = pd.to_numeric(df_features["streams"], errors="coerce")
+
+    # Letzte Streams je Artist (letzte Zeile in Feature-Reihenfolge); dedupliziert
+    # wird über int32-Codes, Strings nur für die Schlüssel des States
+    codes, names = pd.factorize(df_features["artist_names"])
+    last_rows = (
+        pd.DataFrame({"artist": codes, "streams": streams.to_numpy()})
+        .loc[lambda d: d["artist"] >= 0]
+        .drop_duplicates("artist", keep="last")
+    )
+    state["artist_last_streams"] = {
+        str(names[a]): _to_json_float(s) for a, s in zip(last_rows["artist"], last_rows["streams"])
+    }
+
+    # Summe und Anzahl der Streams je Monat und insgesamt
+    monthly = streams.groupby(df_features["month"]).agg(["sum", "count"])
+    state["month_sums"] = {str(int(m)): float(s) for m, s in monthly["sum"].items()}
+    state["month_counts"] = {str(int(m)): int(c) for m, c in monthly["count"].items()}
+    state["total_sum"] = float(streams.sum())
+    state["total_count"] = int(streams.count())
+
+    state["last_genre_idx"] = _to_json_float(df_features["genre_pop_idx"].iloc[-1])
+    state["last_week"] = pd.Timestamp(df_features["chart_week"].max()).strftime("%Y-%m-%d")
+    return state
+
+
+def _for_parquet(df):
+    """
+    Ohne genre_ids und Surrogat-Schlüssel (prozessabhängige IDs) und mit Categoricals
+    als Strings (wie im HistoryStore); Kategorien entstehen beim Lesen über apply_schema.
+    """
+    df = df.drop(columns=["genre_ids"] + KEY_COLUMNS, errors="ignore")
+    return df.astype({c: "string" for c in df.select_dtypes("category").columns})
+
+
+def seasonality_from_state(month, state):
+    """seasonality_score = Ø Streams des Monats / Ø Streams gesamt (über die ganze Historie)."""
+    month_avg = {int(m): state["month_sums"][m] / state["month_counts"][m] for m in state["month_sums"]}
+    total_avg = state["total_sum"] / state["total_count"] if state["total_count"] else np.nan
+    return pd.Series(month, copy=False).map(month_avg).astype("float64") / total_avg
+
+
+# ____ INKREMENTELLE FEATURES ____
+
+def build_week_features(df_week, state):
+    """
+    Berechnet die Features einer neuen (neuesten) chart_week nur aus dieser Woche
+    und dem Carry-Over-State. Liefert dieselben Werte wie build_features über die
+    gesamte Historie inklusive dieser Woche.
+
+    Returns:
+        (df_features der Woche, aktualisierter State)
+    """
+    state = json.loads(json.dumps(state))
+    df = df_week.copy()
+    df["chart_week"] = pd.to_datetime(df["chart_week"], errors="coerce")
+
+    # Schlüssel, Genre-IDs und Genre Popularity Index (hängen nur von der Woche selbst ab)
+    df = add_keys(df.reset_index(drop=True))
+    df["genre_ids"] = parse_genres(df["artist_genres"]).set_axis(df.index)
+    df["genre_pop_idx"] = genre_pop_index(df)
+
+    # Artist Growth Rate: Vorgänger der ersten Zeile eines Artists = letzte Streams aus dem State.
+    # Sortiert und verglichen wird über int32-Codes; Strings nur für den State (pro Artist)
+    codes, n_artists = ordered_codes(df["artist_names"])
+    order = np.argsort(codes, kind="stable")
+    df, artists = df.iloc[order], codes[order]
+    names = df["artist_names"].astype(object).to_numpy()
+    streams = pd.to_numeric(df["streams"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    has_artist = artists < n_artists
+
+    first = np.ones(len(df), dtype=bool)
+    first[1:] = artists[1:] != artists[:-1]
+    prev = np.roll(streams, 1)
+    prev[first] = [
+        _from_json_float(state["artist_last_streams"].get(a)) if ok else np.nan
+        for a, ok in zip(names[first], has_artist[first])
+    ]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth = streams / prev - 1
+    growth[~has_artist] = np.nan
+    df["artist_growth_rate"] = pd.Series(growth, index=df.index).replace([np.inf, -np.inf], 0).fillna(0)
+
+    last = np.ones(len(df), dtype=bool)
+    last[:-1] = artists[:-1] != artists[1:]
+    for a, s in zip(names[last & has_artist], streams[last & has_artist]):
+        state["artist_last_streams"][str(a)] = _to_json_float(s)
+
+    # Seasonality Score: Monatssummen und -anzahlen fortschreiben
+    df["month"] = df["chart_week"].dt.month
+    valid = ~np.isnan(streams)
+    for m, s in pd.Series(streams[valid]).groupby(df["month"].to_numpy()[valid]).agg(["sum", "count"]).iterrows():
+        key = str(int(m))
+        state["month_sums"][key] = state["month_sums"].get(key, 0.0) + float(s["sum"])
+        state["month_counts"][key] = state["month_counts"].get(key, 0) + int(s["count"])
+    state["total_sum"] += float(streams[valid].sum())
+    state["total_count"] += int(valid.sum())
+    df["seasonality_score"] = seasonality_from_state(df["month"], state)
+
+    # genre_idx_lagged: Vorgänger der ersten Zeile = letzter Genre-Index der Vorwoche
+    df = df.sort_values("chart_week", kind="stable")
+    lagged = df["genre_pop_idx"].shift(1)
+    if len(df):
+        lagged.iloc[0] = _from_json_float(state["last_genre_idx"])
+        state["last_genre_idx"] = _to_json_float(df["genre_pop_idx"].iloc[-1])
+        state["last_week"] = pd.Timestamp(df["chart_week"].max()).strftime("%Y-%m-%d")
+    df["genre_idx_lagged"] = lagged.bfill()
+
+    return df, state
+
+
+def _derive_columns(df):
+    """
+    Prozessabhängige Spalten nach dem Laden wieder einfügen (Gegenstück zu _for_parquet),
+    an derselben Position wie in build_features: Schlüssel, dann genre_ids.
+    """
+    add_keys(df, df.columns.get_loc("genre_pop_idx"))
+    df.insert(df.columns.get_loc("genre_pop_idx"), "genre_ids", parse_genres(df["artist_genres"]))
+    return df
+
+
+# ____ FEATURE STORE ____
+
+class FeatureStore:
+    """
+    Wochenweise gespeicherte Features mit Carry-Over-State.
+
+    Aufbau:
+        <root>/manifest.json             Wochen (mit Prüfsumme der Historien-Partition) + State
+        <root>/weeks/YYYY-MM-DD.parquet  Features einer chart_week
+
+    Eine neue (neueste) Woche wird nur aus dieser Woche und dem State berechnet.
+    Ersetzte oder nachgereichte ältere Wochen lösen einen vollständigen Neuaufbau aus.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.week_dir = self.root / "weeks"
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.week_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    # ____ MANIFEST ____
+    def _load_manifest(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == FEATURE_VERSION:
+                return manifest
+        return {"version": FEATURE_VERSION, "weeks": {}, "state": _empty_state()}
+
+    def _save_manifest(self):
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    def weeks(self):
+        return sorted(self.manifest["weeks"])
+
+    @property
+    def state(self):
+        return self.manifest["state"]
+
+    # ____ SCHREIBEN ____
+    def _write_partition(self, df_week, week, source_sha256):
+        path = self.week_dir / f"{week}.parquet"
+        tmp = path.with_suffix(".parquet.tmp")
+        _for_parquet(df_week).to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        self.manifest["weeks"][week] = {
+            "file": path.name,
+            "rows": len(df_week),
+            "source_sha256": source_sha256,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def append_week(self, df_week, week, source_sha256=None):
+        """Berechnet die Features einer neuen Woche inkrementell (O(Woche))."""
+        week = pd.Timestamp(week).strftime("%Y-%m-%d")
+        last_week = self.state["last_week"]
+        if last_week is not None and week <= last_week:
+            raise ValueError(f"Woche {week} ist nicht neuer als {last_week}: Neuaufbau nötig.")
+
+        t0 = time.perf_counter()
+        df_features, state = build_week_features(df_week, self.state)
+        self._write_partition(df_features, week, source_sha256)
+        self.manifest["state"] = state
+        self._save_manifest()
+
+        print(f"Features inkrementell berechnet: {week}, {len(df_features)} Zeilen "
+              f"in {time.perf_counter() - t0:.2f}s.")
+        return df_features
+
+    def rebuild(self, history: HistoryStore):
+        """Vollständiger Neuaufbau aller Wochen mit build_features (Referenzpfad)."""
+        t0 = time.perf_counter()
+        df_features = build_features(load_chart_history(history, report=False))
+
+        for path in self.week_dir.glob("*.parquet"):
+            path.unlink()
+        self.manifest = {"version": FEATURE_VERSION, "weeks": {}, "state": _empty_state()}
+
+        for week, df_week in df_features.groupby("chart_week", sort=True):
+            week = week.strftime("%Y-%m-%d")
+            self._write_partition(df_week, week, history.manifest["weeks"][week]["sha256"])
+
+        self.manifest["state"] = state_from_features(df_features)
+        self._save_manifest()
+
+        print(f"Features neu aufgebaut: {len(df_features)} Zeilen in "
+              f"{df_features['chart_week'].nunique()} Wochen ({time.perf_counter() - t0:.2f}s).")
+        return df_features
+
+    def update(self, history: HistoryStore):
+        """
+        Gleicht den FeatureStore mit dem HistoryStore ab: neue Wochen am Ende werden
+        inkrementell berechnet, alles andere (ersetzte, gelöschte oder ältere Wochen)
+        führt zum Neuaufbau.
+        """
+        changed = [
+            w for w in history.weeks()
+            if self.manifest["weeks"].get(w, {}).get("source_sha256") != history.manifest["weeks"][w]["sha256"]
+        ]
+        removed = set(self.manifest["weeks"]) - set(history.weeks())
+        last_week = self.state["last_week"]
+
+        if not changed and not removed:
+            return
+        if removed or last_week is None or min(changed) <= last_week:
+            self.rebuild(history)
+            return
+
+        for week in changed:
+            df_week = load_chart_history(history, weeks=[week], report=False)
+            self.append_week(df_week, week, history.manifest["weeks"][week]["sha256"])
+
+    # ____ LESEN ____
+    def read(self, weeks=None):
+        """
+        Lädt die Features. Historienweite Größen werden mit dem aktuellen State
+        nachgezogen, sodass das Ergebnis build_features über die ganze Historie entspricht:
+        - seasonality_score aus den aktuellen Monats- und Gesamtmitteln
+        - genre_idx_lagged: bfill über Wochengrenzen hinweg
+        """
+        selected = self.weeks() if weeks is None else [
+            w for w in self.weeks() if w in {pd.Timestamp(x).strftime("%Y-%m-%d") for x in weeks}
+        ]
+        if not selected:
+            return pd.DataFrame()
+
+        df = pd.concat(
+            [pd.read_parquet(self.week_dir / self.manifest["weeks"][w]["file"]) for w in selected],
+            ignore_index=True
+        )
+        df = _derive_columns(apply_schema(df))
+        df["seasonality_score"] = seasonality_from_state(df["month"], self.state)
+        df["genre_idx_lagged"] = df["genre_idx_lagged"].bfill()
+        return df
+
+    def verify(self, history: HistoryStore):
+        """Vergleicht read() Bit für Bit mit einem vollständigen build_features-Lauf."""
+        expected = build_features(load_chart_history(history, report=False)).reset_index(drop=True)
+        actual = self.read()
+        lists = ["genre_ids", "artist_name_keys"]
+        pd.testing.assert_frame_equal(
+            actual.drop(columns=lists),
+            expected.drop(columns=lists),
+            check_exact=True
+        )
+        for col in lists:
+            if actual[col].tolist() != expected[col].tolist():
+                raise AssertionError(f"FeatureStore weicht vom Neuaufbau ab: Spalte {col}.")
+        print(f"FeatureStore identisch mit vollständigem Neuaufbau ({len(actual)} Zeilen).")
+        return True
+
+
+# ____ ZUGRIFF MIT CACHE ____
+
+def features_key(history: HistoryStore):
+    """Cache-Schlüssel der Features: Historien-Prüfsummen + Feature-Version."""
+    return fingerprint("features", FEATURE_VERSION, history_fingerprint(history))
+
+
+def load_features(history: HistoryStore, store: FeatureStore, cache: FeatureCache = None):
+    """
+    Features zum aktuellen Stand der Historie. Mit Cache wird ein bereits berechneter
+    Stand direkt geladen (auch nach einem Neustart), sonst update() + read().
+    Genre-IDs und Schlüssel werden wie im FeatureStore beim Laden neu abgeleitet.
+    """
+    key = features_key(history)
+    df = cache.get(key) if cache is not None else None
+
+    if df is None:
+        store.update(history)
+        df = store.read()
+        if cache is not None:
+            cache.put(key, _for_parquet(df))
+        return df
+
+    return _derive_columns(apply_schema(df))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Features inkrementell aktualisieren bzw. neu aufbauen.")
+    parser.add_argument("--history", default="data/processed/history", help="Ordner des HistoryStores")
+    parser.add_argument("--features", default="data/processed/features", help="Ordner des FeatureStores")
+    parser.add_argument("--rebuild", action="store_true", help="Vollständiger Neuaufbau")
+    parser.add_argument("--verify", action="store_true", help="Mit vollständigem Neuaufbau vergleichen")
+    args = parser.parse_args()
+
+    history = HistoryStore(args.history)
+    store = FeatureStore(args.features)
+
+    if args.rebuild:
+        store.rebuild(history)
+    else:
+        store.update(history)
+
+    if args.verify:
+        store.verify(history)
@@ -1,88 +1,70 @@
+import numpy as np
 import pandas as pd
-import ast
-import streamlit as st
 
-# ____ GENRE PARSER ____
-def genre_parser(val):
-    """Bringt die Zeilen der Spalte 'artist_genres' in ein einheitliches Format."""
-    if isinstance(val, list):
-        return val
-
-    if pd.isna(val) or val in ['unknown', "['unknown']"]:
-        return ['unknown']
-
-    val_str = str(val).strip()
-
-    # Pipe-getrennte Genres
-    if '|' in val_str:
-        return [g.strip() for g in val_str.split('|')]
-
-    # Liste als String
-    if val_str.startswith('[') and val_str.endswith(']'):
-        try:
-            parsed = ast.literal_eval(val_str)
-            return parsed if isinstance(parsed, list) else ['unknown']
-        except:
-            return ['unknown']
-
-    # Einzelnes Genre
-    return [val_str]
+from .genres import genre_pop_index, parse_genres
+from .keys import add_keys, ordered_codes
 
 # ____ FEATURE ENGINEERING PIPELINE ____
 
-@st.cache_data
 def build_features(df):
     """
     Berechnet alle Features, die das LightGBM-Modell benötigt.
     Funktioniert für historische Daten und neue Wochen.
+
+    Mit mehreren Regionen (Spalte 'region') werden die Features je Region
+    berechnet (Genre-Index, Artist-Wachstum und Saisonalität pro Markt).
     """
+    if "region" in df.columns and df["region"].nunique() > 1:
+        parts = [_build_region_features(part) for _, part in df.groupby("region", observed=True, sort=True)]
+        return pd.concat(parts, ignore_index=True).sort_values("chart_week", kind="stable")
+
+    return _build_region_features(df)
+
+
+def _build_region_features(df):
+    """Features für die Charts einer Region."""
     df = df.copy()
 
     # chart_week → datetime
     if "chart_week" in df.columns:
         df["chart_week"] = pd.to_datetime(df["chart_week"], errors="coerce")
 
-    # Genre Parsing
+    # Surrogat-Schlüssel (track_key, artist_key, artist_name_keys; siehe keys.py)
+    add_keys(df)
+
+    # Genre Parsing: einmalig vektorisiert in Genre-IDs (list<int32>, siehe genres.py)
     if "artist_genres" in df.columns:
-        df["artist_genres"] = df["artist_genres"].apply(genre_parser)
+        df["genre_ids"] = parse_genres(df["artist_genres"]).set_axis(df.index)
 
     # Genre Popularity Index (genre_pop_idx)
     if "streams" in df.columns and "artist_genres" in df.columns:
-        genre_df = df.explode("artist_genres")
-
-        # Durchschnittliche Streams pro Genre pro Woche
-        genre_stats = (
-            genre_df.groupby(["chart_week", "artist_genres"])["streams"]
-            .mean()
-            .rename("genre_pop_idx")
-            .reset_index()
-        )
-
-        # Merge Genre-Stats zurück
-        genre_df = genre_df.merge(
-            genre_stats, on=["chart_week", "artist_genres"], how="left"
-        )
-
-        # Durchschnittlicher Genre-Index pro Track
-        song_genre_index = (
-            genre_df.groupby(["chart_week", "track_id"])["genre_pop_idx"]
-            .mean()
-            .reset_index()
-        )
-
-        df = df.merge(song_genre_index, on=["chart_week", "track_id"], how="left")
+        # Ø Streams pro Genre und Woche, dann Ø über die Genres eines Tracks
+        # (dünnbesetzte Track×Genre-Matrix, siehe genres.genre_pop_index)
+        df = df.reset_index(drop=True)
+        df["genre_pop_idx"] = genre_pop_index(df)
     else:
         df["genre_pop_idx"] = 0
 
-    # Artist Growth Rate
+    # Artist Growth Rate: Veränderung der Streams zur vorherigen Zeile desselben artist_names
+    # (Reihenfolge chart_week). Sortiert und verglichen wird über int32-Codes in
+    # String-Reihenfolge, gerechnet auf Arrays (wie build_week_features in feature_store.py)
+    artists = None
     if "streams" in df.columns:
-        df = df.sort_values(by=["artist_names", "chart_week"])
-        df["artist_growth_rate"] = (
-            df.groupby("artist_names")["streams"]
-            .pct_change()
-            .replace([float("inf"), -float("inf")], 0)
-            .fillna(0)
-        )
+        artists, n_artists = ordered_codes(df["artist_names"])
+        order = np.lexsort((df["chart_week"].to_numpy(), artists))
+        sorted_artists = artists[order]
+        streams = pd.to_numeric(df["streams"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)[order]
+
+        first = np.ones(len(df), dtype=bool)
+        first[1:] = sorted_artists[1:] != sorted_artists[:-1]
+        prev = np.roll(streams, 1)
+        prev[first] = np.nan
+
+        growth = np.empty(len(df))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            growth[order] = streams / prev - 1
+        growth[artists == n_artists] = np.nan
+        df["artist_growth_rate"] = pd.Series(growth, index=df.index).replace([np.inf, -np.inf], 0).fillna(0)
     else:
         df["artist_growth_rate"] = 0
 
@@ -96,8 +78,13 @@ def build_features(df):
         df["seasonality_score"] = 1.0
 
     # Prophet‑Regressor: genre_idx_lagged (Lag des Genre‑Index)
-    df = df.sort_values("chart_week")
+    # Sortierung nach chart_week, innerhalb einer Woche nach artist_names, damit der
+    # Lag reproduzierbar ist (siehe feature_store.py)
+    if artists is not None:
+        df = df.iloc[np.lexsort((artists, df["chart_week"].to_numpy()))]
+    else:
+        df = df.sort_values("chart_week", kind="stable")
     df["genre_idx_lagged"] = df["genre_pop_idx"].shift(1)
-    df["genre_idx_lagged"] = df["genre_idx_lagged"].fillna(method="bfill")
+    df["genre_idx_lagged"] = df["genre_idx_lagged"].bfill()
 
     return df
@@ -0,0 +1,195 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from .feature_cache import fingerprint
+from .genres import genre_csr
+from .model_registry import model_registry
+from .predict_pipeline import TREND_DIR, prophet_trend
+
+FORECAST_WEEKS = 12
+
+# Kandidaten für den Forecast: Tracks der letzten N Chart-Wochen (None = alle Tracks)
+RECENT_WEEKS = 8
+
+# Features, die sich über den Horizont ändern (pro Woche); alle anderen Modell-Features
+# sind pro Track konstant (letzte bekannte Zeile)
+WEEK_FEATURES = ["prophet_trend", "genre_idx_lagged", "seasonality_score"]
+
+# Spalten, die für die Darstellung der Forecast-Zeilen gebraucht werden
+DISPLAY_COLUMNS = ["track_id", "track_key", "artist_names", "track_name", "artist_genres", "genre_ids"]
+
+
+# ____ HORIZONT ____
+
+def forecast_dates(last_ds, weeks=FORECAST_WEEKS):
+    """Zukünftige Wochen nach dem letzten historischen Datum."""
+    return pd.date_range(start=last_ds + pd.Timedelta(weeks=1), periods=weeks, freq="W")
+
+
+def last_rows_per_track(df_features):
+    """Letzte bekannte Zeile pro Track (Reihenfolge nach letzter Chart-Woche)."""
+    return (
+        df_features[df_features["track_key"] >= 0]
+        .sort_values("ds", kind="stable")
+        .drop_duplicates("track_key", keep="last")
+    )
+
+
+def select_candidates(tracks, df_features, recent_weeks=RECENT_WEEKS, streams_quantile=None, growing_artists=False):
+    """
+    Aktive Kandidaten für den Forecast (Kriterien werden mit ODER verknüpft):
+    - recent_weeks:     Track war in den letzten N Chart-Wochen platziert
+    - streams_quantile: letzte Streams mind. auf diesem Quantil aller Tracks (z.B. 0.9)
+    - growing_artists:  Ø artist_growth_rate eines der Artists des Tracks (einzeln aus
+                        artist_names, siehe keys.py) in den letzten N Wochen > 0
+    Ohne aktives Kriterium bleiben alle Tracks erhalten.
+
+    Returns:
+        Bool-Maske über tracks
+    """
+    keep = np.zeros(len(tracks), dtype=bool)
+    active = False
+    chart_weeks = np.sort(df_features["ds"].dropna().unique())
+
+    if recent_weeks is not None and len(chart_weeks):
+        cutoff = chart_weeks[-min(recent_weeks, len(chart_weeks))]
+        keep |= (tracks["ds"] >= cutoff).to_numpy()
+        active = True
+
+    if streams_quantile is not None:
+        streams = pd.to_numeric(tracks["streams"], errors="coerce")
+        keep |= (streams >= streams.quantile(streams_quantile)).to_numpy()
+        active = True
+
+    if growing_artists and len(chart_weeks):
+        cutoff = chart_weeks[-min(recent_weeks or 1, len(chart_weeks))]
+        recent = df_features[df_features["ds"] >= cutoff]
+
+        # Ø Wachstum je einzelnem Artist per np.bincount über die artist_name_keys
+        lengths, artists = genre_csr(recent["artist_name_keys"])
+        n_artists = int(artists.max()) + 1 if len(artists) else 0
+        growth = np.repeat(recent["artist_growth_rate"].to_numpy(dtype="float64"), lengths)
+        growth_sum = np.bincount(artists, weights=growth, minlength=n_artists)
+        growing = growth_sum > 0
+
+        # Track behalten, wenn mindestens einer seiner Artists wächst
+        lengths, artists = genre_csr(tracks["artist_name_keys"])
+        hit = np.zeros(len(artists), dtype=bool)
+        known = artists < n_artists
+        hit[known] = growing[artists[known]]
+        keep |= np.bincount(np.repeat(np.arange(len(tracks)), lengths), weights=hit, minlength=len(tracks)) > 0
+        active = True
+
+    return keep if active else np.ones(len(tracks), dtype=bool)
+
+
+def week_regressors(df_features, dates):
+    """
+    Zeitbasierte Regressoren pro Zukunftswoche: Ø der Historie an diesem Datum,
+    Lücken per bfill/ffill, sonst 0.
+    """
+    regressors = (
+        df_features.groupby("ds")[["genre_idx_lagged", "seasonality_score"]]
+        .mean()
+        .reindex(dates)
+    )
+    return regressors.bfill().ffill().fillna(0).rename_axis("ds").reset_index()
+
+
+# ____ SCORING ____
+
+def score_forecast(df_features, weeks=FORECAST_WEEKS, batch_tracks=4096, cache=None, cache_key=None,
+                   recent_weeks=RECENT_WEEKS, streams_quantile=None, growing_artists=False, num_threads=0,
+                   trend_dir=TREND_DIR):
+    """
+    Bewertet jeden Track für jede Zukunftswoche, ohne den Cross Join zu materialisieren.
+
+    Layout: Track-Matrix (Tracks × track-konstante Features) und Wochen-Matrix
+    (Wochen × wochenabhängige Features, u.a. prophet_trend). Die Modell-Eingabe
+    wird blockweise für batch_tracks Tracks × alle Wochen als float32 zusammengesetzt
+    (wie score_lgbm in predict_pipeline.py).
+    Bewertet werden nur aktive Kandidaten (siehe select_candidates), damit die
+    Kosten mit der aktuellen Chart-Größe wachsen und nicht mit der Historie.
+
+    Returns:
+        dict mit tracks (letzte Zeile pro Kandidat), dates, probs und preds
+        (jeweils Tracks × Wochen) sowie n_total / n_pruned (ausgeblendete Tracks)
+    """
+    bundle = model_registry().get()
+    prophet_model, lgbm_model, best_t, feature_cols = bundle.as_tuple()
+    t0 = time.perf_counter()
+
+    all_tracks = last_rows_per_track(df_features)
+    tracks = all_tracks[select_candidates(all_tracks, df_features, recent_weeks, streams_quantile, growing_artists)]
+    dates = forecast_dates(df_features["ds"].max(), weeks)
+    n_tracks, n_weeks = len(tracks), len(dates)
+    result = {"tracks": tracks, "dates": dates, "n_total": len(all_tracks), "n_pruned": len(all_tracks) - n_tracks}
+
+    key = None
+    if cache is not None and cache_key is not None:
+        key = fingerprint(
+            "forecast", cache_key, weeks, bundle.fingerprint,
+            recent_weeks, streams_quantile, growing_artists
+        )
+        cached = cache.get(key)
+        if cached is not None and len(cached) == n_tracks * n_weeks:
+            result["probs"] = cached["prob"].to_numpy().reshape(n_tracks, n_weeks)
+            result["preds"] = cached["pred"].to_numpy().reshape(n_tracks, n_weeks)
+            return result
+
+    # Wochen-Matrix: Regressoren + Prophet-Trend (einmal pro Datum)
+    week_df = week_regressors(df_features, dates)
+    week_df["prophet_trend"] = prophet_trend(
+        prophet_model, week_df, model_version=bundle.prophet_version, trend_dir=trend_dir
+    )
+
+    week_cols = [c for c in feature_cols if c in WEEK_FEATURES]
+    track_cols = [c for c in feature_cols if c not in WEEK_FEATURES]
+
+    W = week_df[week_cols].fillna(0).to_numpy(dtype="float64")
+    T = np.zeros((n_tracks, len(track_cols)))
+    for j, col in enumerate(track_cols):
+        if col in tracks.columns:
+            T[:, j] = pd.to_numeric(tracks[col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+    # Spaltenpositionen in der Modell-Eingabe
+    week_pos = [feature_cols.index(c) for c in week_cols]
+    track_pos = [feature_cols.index(c) for c in track_cols]
+
+    probs = np.empty((n_tracks, n_weeks))
+    for start in range(0, n_tracks, batch_tracks):
+        block = T[start:start + batch_tracks]
+        X = np.empty((len(block) * n_weeks, len(feature_cols)), dtype=np.float32)
+        X[:, track_pos] = np.repeat(block, n_weeks, axis=0)
+        X[:, week_pos] = np.tile(W, (len(block), 1))
+        probs[start:start + len(block)] = lgbm_model.predict(X, num_threads=num_threads).reshape(len(block), n_weeks)
+
+    preds = (probs > best_t).astype(int)
+
+    if key is not None:
+        cache.put(key, pd.DataFrame({"pred": preds.ravel(), "prob": probs.ravel()}))
+
+    print(f"Forecast: {n_tracks} Tracks × {n_weeks} Wochen in {time.perf_counter() - t0:.2f}s "
+          f"({result['n_pruned']} inaktive Tracks ausgeblendet).")
+    result["probs"], result["preds"] = probs, preds
+    return result
+
+
+def forecast_frame(result, columns=DISPLAY_COLUMNS):
+    """
+    Langes Format (Track × Woche) für die Darstellung, nur mit den Anzeige-Spalten
+    (keine Feature-Spalten).
+    """
+    tracks, dates = result["tracks"], result["dates"]
+    n_tracks, n_weeks = len(tracks), len(dates)
+
+    rows = np.repeat(np.arange(n_tracks), n_weeks)
+    out = tracks[[c for c in columns if c in tracks.columns]].iloc[rows].reset_index(drop=True)
+    out["ds"] = np.tile(dates.to_numpy(), n_tracks)
+    out["chart_week"] = out["ds"]
+    out["is_rising"] = result["preds"].ravel()
+    out["probability"] = result["probs"].ravel()
+    out["is_future"] = True
+    return out
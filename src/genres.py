@@ -0,0 +1,274 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+# ____ GENRE-VOKABULAR ____
+
+class GenreVocab:
+    """
+    Globales, append-only Genre-Vokabular: jedes Genre bekommt eine feste Integer-ID.
+    Alle Konsumenten (Features, Heatmap, Trendbericht) teilen dieselben IDs.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def encode(self, names):
+        """Genre-Namen → IDs (neue Genres werden angehängt)."""
+        uniques, inverse = np.unique(np.asarray(names, dtype=object), return_inverse=True)
+        with self._lock:
+            for name in uniques:
+                if name not in self._ids:
+                    self._ids[name] = len(self._names)
+                    self._names.append(name)
+            lookup = np.array([self._ids[name] for name in uniques], dtype=np.int32)
+        return lookup[inverse].astype(np.int32)
+
+    def decode(self, ids):
+        """IDs → Categorical mit den Genre-Namen (ohne Python-Strings pro Zeile)."""
+        return pd.Categorical.from_codes(np.asarray(ids, dtype=np.int32), categories=self.names)
+
+
+_VOCAB = GenreVocab()
+
+def genre_vocab():
+    """Liefert das prozessweit geteilte Genre-Vokabular."""
+    return _VOCAB
+
+
+# ____ PARSING ____
+
+def _split_unique(uniques):
+    """
+    Zerlegt eindeutige Genre-Strings vektorisiert (Werte vorher getrimmt):
+    - Pipe-getrennt:   "pop|dance pop"   → ["pop", "dance pop"] (Pipe hat Vorrang)
+    - Liste als String: "['pop', 'rap']" → ["pop", "rap"] (Anführungszeichen entfernt, "[]" → keine Genres)
+    - Einzelnes Genre:  "pop"            → ["pop"]
+    Liefert (Position des Unique-Werts, Genre) für alle Genres.
+    """
+    s = uniques.str.strip()
+    is_pipe = s.str.contains("|", regex=False)
+    is_list = ~is_pipe & s.str.startswith("[") & s.str.endswith("]")
+
+    # Listen-Strings auf das Pipe-Format bringen
+    s = s.where(~is_list, s.str.slice(1, -1).str.replace(",", "|", regex=False))
+
+    parts = s.str.split("|").explode()
+    parts = parts.str.strip()
+    from_list = is_list.reindex(parts.index)
+    parts = parts.where(~from_list, parts.str.strip("'\""))
+
+    # "[]" ergibt keine Genres
+    parts = parts[~(from_list & (parts == ""))]
+    return parts.index.to_numpy(), parts.to_numpy(dtype=object)
+
+
+def parse_genres(values, vocab=None):
+    """
+    Parst eine Genre-Spalte einmalig und vektorisiert in Genre-IDs.
+    Geparst wird nur pro eindeutigem Wert; das Ergebnis ist eine kompakte
+    Arrow-Liste (list<int32>) pro Zeile, die Namen liegen im GenreVocab.
+
+    Args:
+        values (pd.Series): 'artist_genres' (Pipe-String, Listen-String, Liste oder NaN)
+        vocab (GenreVocab, optional): Default ist das globale Vokabular
+
+    Returns:
+        pd.Series mit dtype list<int32>[pyarrow], gleicher Index wie values
+    """
+    vocab = vocab if vocab is not None else genre_vocab()
+    values = pd.Series(values)
+
+    # Echte Python-Listen (ältere Zwischenstände) in das Pipe-Format bringen
+    if values.dtype == object:
+        values = values.map(lambda v: "|".join(v) if isinstance(v, list) else v)
+
+    values = values.astype(object).where(values.notna(), "unknown")
+    codes, uniques = pd.factorize(values.astype(str))
+
+    # Genres je eindeutigem Wert
+    owner, names = _split_unique(pd.Series(uniques, dtype=object))
+    ids = vocab.encode(names) if len(names) else np.array([], dtype=np.int32)
+    u_lengths = np.bincount(owner, minlength=len(uniques)).astype(np.int64)
+    u_offsets = np.concatenate([[0], np.cumsum(u_lengths)])
+
+    # Pro Zeile: Offsets und Indizes aus den Unique-Werten zusammensetzen
+    lengths = u_lengths[codes]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    pos = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths) + np.repeat(u_offsets[codes], lengths)
+
+    arr = pa.ListArray.from_arrays(
+        pa.array(offsets.astype(np.int32)),
+        pa.array(ids[pos], type=pa.int32())
+    )
+    return pd.Series(pd.arrays.ArrowExtensionArray(arr), index=values.index, name="genre_ids")
+
+
+# ____ CSR-ZUGRIFF UND EXPLODE ____
+
+def genre_csr(genre_ids):
+    """
+    CSR-Sicht auf eine genre_ids-Spalte.
+
+    Returns:
+        (lengths, indices): Genres pro Zeile (int64) und alle Genre-IDs hintereinander (int32)
+    """
+    if isinstance(genre_ids.dtype, pd.ArrowDtype):
+        chunked = genre_ids.array.__arrow_array__()
+    else:
+        chunked = pa.array(genre_ids.tolist(), type=pa.list_(pa.int32()))
+    lengths = pc.fill_null(pc.list_value_length(chunked), 0).to_numpy().astype(np.int64)
+    indices = pc.list_flatten(chunked).to_numpy().astype(np.int32)
+    return lengths, indices
+
+
+def explode_genres(df, columns=(), genre_col="genre_ids", name="genre", vocab=None):
+    """
+    Eine Zeile pro (Zeile, Genre) ohne Python-Listen: columns werden per np.repeat
+    vervielfältigt, die Genre-Namen kommen als Categorical aus dem Vokabular.
+    Fehlt genre_col, wird 'artist_genres' on-the-fly geparst.
+    """
+    vocab = vocab if vocab is not None else genre_vocab()
+    genre_ids = df[genre_col] if genre_col in df.columns else parse_genres(df["artist_genres"], vocab)
+
+    lengths, indices = genre_csr(genre_ids)
+    rows = np.repeat(np.arange(len(df)), lengths)
+
+    out = df[list(columns)].iloc[rows].reset_index(drop=True)
+    out[name] = vocab.decode(indices)
+    return out
+
+
+def top_genre_names(df, n=5, genre_col="genre_ids", vocab=None):
+    """Die n häufigsten Genres (Namen) über alle Zeilen, gezählt per np.bincount auf den IDs."""
+    vocab = vocab if vocab is not None else genre_vocab()
+    genre_ids = df[genre_col] if genre_col in df.columns else parse_genres(df["artist_genres"], vocab)
+
+    _, indices = genre_csr(genre_ids)
+    counts = np.bincount(indices, minlength=len(vocab))
+    top = np.argsort(-counts, kind="stable")[:n]
+    names = vocab.names
+    return [names[i] for i in top if counts[i] > 0]
+
+
+# ____ GENRE POPULARITY INDEX ____
+
+def genre_pop_index(df, genre_col="genre_ids", week_col="chart_week", track_col="track_key",
+                    value_col="streams", block_rows=1 << 15):
+    """
+    Genre Popularity Index über eine dünnbesetzte Track×Genre-Matrix pro chart_week
+    statt explode → groupby → merge → groupby → merge.
+
+    Pro Woche (A = Zeilen × Genre-IDs):
+    - Ø Streams pro Genre:       (Aᵀ · streams) / (Aᵀ · 1)
+    - Ø Genre-Index pro Track:   Summe der Genre-Mittelwerte / (A · 1)
+    Zeilen mit gleicher (Woche, track_id) werden wie beim groupby zusammengefasst
+    (über track_key, ohne diese Spalte über track_id).
+    Mehrere Wochen werden blockdiagonal in einer Matrix verarbeitet (ca. block_rows
+    Zeilen pro Block), damit der Speicher auch bei vielen Regionen begrenzt bleibt.
+    Das Ergebnis ist bitgleich zur bisherigen pandas-Berechnung.
+
+    Returns:
+        np.ndarray (float64), zeilengleich zu df; NaN ohne Woche, track_id oder Genres
+    """
+    n = len(df)
+    genre_ids = df[genre_col] if genre_col in df.columns else parse_genres(df["artist_genres"])
+    lengths, indices = genre_csr(genre_ids)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    n_genres = int(indices.max()) + 1 if len(indices) else 1
+
+    week_codes, week_uniques = pd.factorize(df[week_col])
+    # Integer-Schlüssel (track_key, -1 = fehlt, siehe keys.py) direkt, sonst factorize
+    track_col = track_col if track_col in df.columns else "track_id"
+    if pd.api.types.is_integer_dtype(df[track_col]):
+        track_codes = df[track_col].to_numpy()
+    else:
+        track_codes, _ = pd.factorize(df[track_col])
+    values = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    result = np.full(n, np.nan)
+
+    # Zeilen stabil nach (Woche, track_id) sortieren: Zeilen eines Tracks liegen dann
+    # nebeneinander, in ursprünglicher Reihenfolge (wie beim groupby)
+    order = np.lexsort((track_codes, week_codes))
+    bounds = np.searchsorted(week_codes[order], np.arange(len(week_uniques) + 1))
+
+    # Blockweise verarbeiten: ein Block = ganze Wochen mit zusammen ca. block_rows Zeilen
+    block_bounds = np.unique(np.searchsorted(bounds, np.arange(bounds[0], bounds[-1], block_rows), side="right") - 1)
+    block_bounds = np.append(block_bounds, len(week_uniques))
+
+    for w0, w1 in zip(block_bounds[:-1], block_bounds[1:]):
+        rows = order[bounds[w0]:bounds[w1]]
+        row_len = lengths[rows]
+        entries = _segment_positions(offsets[rows], row_len)
+
+        # Spalte = (Woche im Block, Genre-ID)
+        local_week = week_codes[rows] - w0
+        cols = np.repeat(local_week * n_genres, row_len) + indices[entries]
+        A = sparse.csr_matrix(
+            (np.ones(len(entries)), cols, np.concatenate([[0], np.cumsum(row_len)])),
+            shape=(len(rows), (w1 - w0) * n_genres)
+        )
+
+        # Ø Streams pro Genre und Woche (Streams sind ganzzahlig → Summen in float64 exakt)
+        v = values[rows]
+        has_value = ~np.isnan(v)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            genre_mean = (A.T @ np.where(has_value, v, 0.0)) / (A.T @ has_value.astype("float64"))
+
+        # Gruppen (Woche, track_id) = zusammenhängende Zeilen; ohne track_id bleibt NaN
+        t = track_codes[rows]
+        valid = t >= 0
+        starts_group = np.ones(len(rows), dtype=bool)
+        starts_group[1:] = (local_week[1:] != local_week[:-1]) | (t[1:] != t[:-1])
+        group = np.where(valid, np.cumsum(starts_group & valid) - 1, -1)
+        n_groups = int(group.max()) + 1 if len(group) else 0
+
+        # Anzahl der Genres mit gültigem Mittelwert pro Track: A · 1
+        has_mean = ~np.isnan(genre_mean)
+        group_cnt = np.bincount(group[valid], weights=(A @ has_mean.astype("float64"))[valid], minlength=n_groups)
+
+        # Summe der Genre-Mittelwerte pro Track: nicht ganzzahlig, daher wie pandas'
+        # groupby-mean kompensiert summieren, damit das Ergebnis bitgleich bleibt
+        entry_vals = genre_mean[cols]
+        entry_group = np.repeat(group, row_len)
+        use = (entry_group >= 0) & ~np.isnan(entry_vals)
+        group_sum = _kahan_segment_sum(entry_vals[use], np.bincount(entry_group[use], minlength=n_groups))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[rows[valid]] = group_sum[group[valid]] / group_cnt[group[valid]]
+
+    return result
+
+
+def _segment_positions(starts, lengths):
+    """Alle Positionen der Segmente [start, start + length) hintereinander."""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+
+
+def _kahan_segment_sum(values, sizes):
+    """Kompensierte Summe (Kahan) je zusammenhängendem Segment, vektorisiert über die Segmente."""
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    total = np.zeros(len(sizes))
+    comp = np.zeros(len(sizes))
+    for k in range(int(sizes.max()) if len(sizes) else 0):
+        idx = np.flatnonzero(sizes > k)
+        y = values[starts[idx] + k] - comp[idx]
+        t = total[idx] + y
+        comp[idx] = t - total[idx] - y
+        total[idx] = t
+    return total
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from .history_store import HistoryStore, atomic_write_json
+
+# Aufbau des Backup-Ordners:
+#   <backup_dir>/objects/<sha[:2]>/<sha>.parquet   Wochen-Partitionen, content-addressed
+#   <backup_dir>/snapshots/<YYYY-MM-DD_HH-MM-SS>.json   Snapshot = {week: sha256}
+# Ein Snapshot kopiert nur Partitionen, deren Inhalt noch nicht gesichert ist.
+
+SNAPSHOT_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+def _object_path(backup_dir, sha):
+    return Path(backup_dir) / "objects" / sha[:2] / f"{sha}.parquet"
+
+
+def list_snapshots(backup_dir):
+    """Alle Snapshot-IDs (Zeitstempel), aufsteigend."""
+    snap_dir = Path(backup_dir) / "snapshots"
+    if not snap_dir.exists():
+        return []
+    return sorted(p.stem for p in snap_dir.glob("*.json"))
+
+
+def load_snapshot(backup_dir, snapshot_id):
+    with open(Path(backup_dir) / "snapshots" / f"{snapshot_id}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_snapshot(store: HistoryStore, backup_dir, one_per_day=True):
+    """
+    Sichert den aktuellen Stand des HistoryStores inkrementell:
+    nur neue oder ersetzte Wochen-Partitionen werden kopiert, der Snapshot selbst
+    ist ein kleines Manifest. Mit one_per_day=True ersetzt er frühere Snapshots desselben Tages.
+
+    Returns:
+        (snapshot_id, Anzahl neu kopierter Partitionen)
+    """
+    backup_dir = Path(backup_dir)
+    snap_dir = backup_dir / "snapshots"
+    snap_dir.mkdir(parents=True, exist_ok=True)
+
+    now = datetime.now()
+    snapshot_id = now.strftime(SNAPSHOT_FORMAT)
+
+    weeks = {}
+    copied = 0
+    for week in store.weeks():
+        sha = store.manifest["weeks"][week]["sha256"]
+        target = _object_path(backup_dir, sha)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            shutil.copyfile(store.partition_path(week), tmp)
+            os.replace(tmp, target)
+            copied += 1
+        weeks[week] = sha
+
+    if one_per_day:
+        for old in list_snapshots(backup_dir):
+            if old.startswith(now.strftime("%Y-%m-%d")):
+                (snap_dir / f"{old}.json").unlink()
+
+    atomic_write_json(snap_dir / f"{snapshot_id}.json", {"created_at": now.isoformat(timespec="seconds"), "weeks": weeks})
+    print(f"Backup-Snapshot {snapshot_id}: {len(weeks)} Wochen, {copied} Partitionen neu gesichert.")
+    return snapshot_id, copied
+
+
+def restore_snapshot(backup_dir, snapshot_id, target_dir):
+    """Stellt einen Snapshot als vollständigen HistoryStore unter target_dir wieder her."""
+    snapshot = load_snapshot(backup_dir, snapshot_id)
+    store = HistoryStore(target_dir)
+
+    for week, sha in snapshot["weeks"].items():
+        dest = store.week_dir / f"{week}.parquet"
+        shutil.copyfile(_object_path(backup_dir, sha), dest)
+        store.manifest["weeks"][week] = {
+            "file": dest.name,
+            "rows": pq.read_metadata(dest).num_rows,
+            "sha256": sha,
+            "updated_at": snapshot["created_at"],
+        }
+
+    # Wochen, die im Snapshot nicht vorkommen, aus dem Ziel entfernen
+    for week in set(store.manifest["weeks"]) - set(snapshot["weeks"]):
+        store.partition_path(week).unlink(missing_ok=True)
+        del store.manifest["weeks"][week]
+
+    store._save_manifest()
+    print(f"Snapshot {snapshot_id} wiederhergestellt nach: {target_dir}")
+    return store
+
+
+def apply_retention(backup_dir, keep_daily=14, keep_weekly=12):
+    """
+    Aufbewahrung: der jeweils neueste Snapshot der letzten `keep_daily` Tage und der
+    letzten `keep_weekly` Kalenderwochen bleibt erhalten, alle anderen werden gelöscht.
+    Danach werden nicht mehr referenzierte Partitionen entfernt.
+    """
+    backup_dir = Path(backup_dir)
+    snapshots = list_snapshots(backup_dir)
+
+    keep, days, weeks = set(), [], []
+    for snapshot_id in reversed(snapshots):
+        ts = datetime.strptime(snapshot_id, SNAPSHOT_FORMAT)
+        day, iso_week = ts.date(), ts.isocalendar()[:2]
+
+        if day not in days and len(days) < keep_daily:
+            days.append(day)
+            keep.add(snapshot_id)
+        if iso_week not in weeks and len(weeks) < keep_weekly:
+            weeks.append(iso_week)
+            keep.add(snapshot_id)
+
+    for snapshot_id in set(snapshots) - keep:
+        (backup_dir / "snapshots" / f"{snapshot_id}.json").unlink()
+
+    # Garbage Collection der Objekte
+    referenced = set()
+    for snapshot_id in keep:
+        referenced.update(load_snapshot(backup_dir, snapshot_id)["weeks"].values())
+
+    removed = 0
+    for obj in (backup_dir / "objects").glob("*/*.parquet"):
+        if obj.stem not in referenced:
+            obj.unlink()
+            removed += 1
+
+    print(f"Retention: {len(keep)} Snapshots behalten, {len(snapshots) - len(keep)} gelöscht, "
+          f"{removed} Partitionen entfernt.")
+    return sorted(keep)
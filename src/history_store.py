@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .regions import DEFAULT_REGION
+
+# Spaltenreihenfolge der Historie (wie hist_data_updated.csv)
+HISTORY_COLUMNS = [
+    "chart_week", "rank", "artist_names", "track_name", "peak_rank", "previous_rank",
+    "weeks_on_chart", "streams", "track_id", "artist_id", "release_date", "explicit",
+    "track_popularity", "artist_genres", "artist_followers", "artist_popularity", "source",
+    "region"
+]
+
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha256(path):
+    """SHA-256-Prüfsumme einer Datei (blockweise gelesen)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def atomic_write_json(path, data):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class HistoryStore:
+    """
+    Append-only Chart-Historie, partitioniert nach chart_week (eine Parquet-Datei pro Woche).
+
+    Aufbau:
+        <root>/manifest.json             Wochen, Zeilenzahl, Prüfsumme, Zeitstempel
+        <root>/weeks/YYYY-MM-DD.parquet  eine Partition pro chart_week
+
+    Eine neue Woche schreibt genau eine Partition; ein erneuter Upload derselben
+    Woche ersetzt sie. Leser laden nur die Wochen, die sie brauchen.
+
+    Ein Store enthält genau eine Region (siehe regions.region_dirs); die Region steht
+    im Manifest und als Spalte "region" in jeder Partition.
+    """
+
+    def __init__(self, root, region=None):
+        self.root = Path(root)
+        self.week_dir = self.root / "weeks"
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.week_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self.region = region or self.manifest.get("region", DEFAULT_REGION)
+        self.manifest["region"] = self.region
+
+    # ____ MANIFEST ____
+    def _load_manifest(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {"columns": HISTORY_COLUMNS, "weeks": {}}
+
+    def _save_manifest(self):
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    def weeks(self):
+        """Alle gespeicherten chart_weeks (YYYY-MM-DD), aufsteigend."""
+        return sorted(self.manifest["weeks"])
+
+    def is_empty(self):
+        return not self.manifest["weeks"]
+
+    def n_rows(self):
+        """Zeilen der gesamten Historie (aus dem Manifest, ohne Daten zu lesen)."""
+        return sum(meta["rows"] for meta in self.manifest["weeks"].values())
+
+    def partition_path(self, week):
+        return self.week_dir / self.manifest["weeks"][week]["file"]
+
+    # ____ SCHREIBEN ____
+    def _normalize(self, df):
+        """Einheitliche Spalten und Datentypen, damit alle Partitionen dasselbe Schema haben."""
+        df = df.reindex(columns=HISTORY_COLUMNS)
+        df["region"] = df["region"].fillna(self.region)
+        df["chart_week"] = pd.to_datetime(df["chart_week"], errors="coerce")
+        df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
+        df["explicit"] = df["explicit"].map(
+            {True: True, False: False, "True": True, "False": False}
+        ).astype("boolean")
+        for col in ["track_popularity", "artist_followers", "artist_popularity"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        for col in ["artist_names", "track_name", "track_id", "artist_id", "artist_genres", "source", "region"]:
+            df[col] = df[col].astype("string")
+        return df
+
+    def write_week(self, df_week, week):
+        """
+        Schreibt (bzw. ersetzt) die Partition einer chart_week.
+        Doppelte track_ids innerhalb der Woche werden wie bisher dedupliziert (keep="last").
+        """
+        week = pd.Timestamp(week).strftime("%Y-%m-%d")
+        df_week = self._normalize(df_week)
+        df_week = (
+            df_week.drop_duplicates(subset=["chart_week", "track_id"], keep="last")
+            .sort_values("track_id")
+            .reset_index(drop=True)
+        )
+
+        path = self.week_dir / f"{week}.parquet"
+        tmp = path.with_suffix(".parquet.tmp")
+        df_week.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        self.manifest["weeks"][week] = {
+            "file": path.name,
+            "rows": len(df_week),
+            "sha256": file_sha256(path),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save_manifest()
+        return path
+
+    def bootstrap_from_csv(self, csv_path):
+        """Einmalige Migration einer bestehenden Historien-CSV in Wochen-Partitionen."""
+        df = pd.read_csv(csv_path)
+        df["chart_week"] = pd.to_datetime(df["chart_week"], errors="coerce")
+
+        for week, df_week in df.groupby("chart_week", sort=True):
+            self.write_week(df_week, week)
+
+        print(f"Historie migriert: {len(df)} Zeilen in {df['chart_week'].nunique()} Wochen ({csv_path}).")
+
+    # ____ LESEN ____
+    def read(self, weeks=None, start=None, end=None, columns=None):
+        """
+        Lädt die Historie (optional nur bestimmte Wochen, einen Zeitraum oder Spalten).
+
+        Args:
+            weeks (list, optional): konkrete chart_weeks
+            start, end (str/Timestamp, optional): Zeitraum (inklusive)
+            columns (list, optional): nur diese Spalten laden
+        """
+        selected = self.weeks()
+        if weeks is not None:
+            wanted = {pd.Timestamp(w).strftime("%Y-%m-%d") for w in weeks}
+            selected = [w for w in selected if w in wanted]
+        if start is not None:
+            selected = [w for w in selected if w >= pd.Timestamp(start).strftime("%Y-%m-%d")]
+        if end is not None:
+            selected = [w for w in selected if w <= pd.Timestamp(end).strftime("%Y-%m-%d")]
+
+        if not selected:
+            return self._normalize(pd.DataFrame(columns=HISTORY_COLUMNS))[columns or HISTORY_COLUMNS]
+
+        frames = [self._read_partition(w, columns) for w in selected]
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_partition(self, week, columns=None):
+        """Eine Partition; ältere Partitionen ohne Spalte region bekommen die Region des Stores."""
+        path = self.partition_path(week)
+        wanted = columns if columns is not None else HISTORY_COLUMNS
+        try:
+            df = pd.read_parquet(path, columns=columns)
+        except (KeyError, ValueError):
+            if "region" not in wanted:
+                raise
+            df = pd.read_parquet(path, columns=[c for c in columns if c != "region"])
+
+        if "region" in wanted and "region" not in df.columns:
+            df["region"] = pd.Series(self.region, index=df.index, dtype="string")
+        return df[[c for c in wanted if c in df.columns]]
@@ -0,0 +1,306 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from pathlib import Path
+
+DEFAULT_JOBS_PATH = Path(__file__).resolve().parents[1] / "data" / "interim" / "jobs.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    payload TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_host TEXT,
+    owner_pid INTEGER,
+    heartbeat_at REAL
+);
+"""
+
+# Spalten, die in älteren Queue-Dateien noch fehlen
+_OWNER_COLUMNS = {"owner_host": "TEXT", "owner_pid": "INTEGER", "heartbeat_at": "REAL"}
+
+# queued → running → done | failed
+ACTIVE_STATUSES = ("queued", "running")
+
+# Laufende Jobs melden sich in diesem Takt; ohne Meldung nach HEARTBEAT_TIMEOUT gilt der Besitzer als tot
+HEARTBEAT_SECONDS = 10
+HEARTBEAT_TIMEOUT = 120
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_alive(job, now=None):
+    """
+    Lebt der Prozess, der den Job übernommen hat? Auf demselben Rechner wird die PID
+    geprüft, sonst (und zusätzlich) der Heartbeat.
+    """
+    now = time.time() if now is None else now
+    if job["heartbeat_at"] is None or now - job["heartbeat_at"] > HEARTBEAT_TIMEOUT:
+        return False
+    if job["owner_host"] == socket.gethostname() and job["owner_pid"] is not None:
+        return _pid_alive(job["owner_pid"])
+    return True
+
+
+class JobQueue:
+    """
+    Lokale Job-Queue (SQLite) für lange Pipeline-Läufe außerhalb des Streamlit-Skripts.
+
+    Der Job-Schlüssel ist der Inhalt (z.B. SHA-256 der Wochen-Datei): dieselbe Datei
+    wird nur einmal eingereiht, egal wie viele Sessions sie hochladen. Status und
+    Fortschritt liegen in der Datenbank und sind damit für alle Sessions sichtbar
+    und überstehen einen Browser-Refresh.
+
+    Mehrere Prozesse (z.B. mehrere Streamlit-Server) dürfen dieselbe Datei nutzen:
+    claim() übernimmt einen Job in einer Schreibtransaktion (BEGIN IMMEDIATE), und
+    jeder laufende Job trägt Rechner, PID und Heartbeat seines Besitzers.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit; Transaktionen werden explizit geöffnet (siehe _transaction)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, col_type in _OWNER_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {col_type}")
+
+    def close(self):
+        self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _transaction(self, fn):
+        """fn(conn) in einer Schreibtransaktion ausführen (sperrt die Datei für andere Schreiber)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for col in ("payload", "result"):
+            job[col] = json.loads(job[col]) if job[col] else None
+        return job
+
+    # ____ EINREIHEN ____
+    def submit(self, kind, job_id, payload=None):
+        """
+        Reiht einen Job ein. Existiert derselbe Job schon (wartend, laufend oder fertig),
+        wird er wiederverwendet; nur fehlgeschlagene Jobs werden neu eingereiht.
+
+        Returns:
+            (job_id, neu eingereiht?)
+        """
+        def insert(conn):
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] != "failed":
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, kind, status, payload, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload or {}), time.time())
+            )
+            return True
+
+        return job_id, self._transaction(insert)
+
+    # ____ WORKER-SEITE ____
+    def claim(self):
+        """
+        Ältesten wartenden Job übernehmen (status → running, Besitzer = dieser Prozess)
+        oder None. Atomar auch über Prozesse hinweg: zwei Worker bekommen nie denselben Job.
+        """
+        def take(conn):
+            now = time.time()
+            return conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', started_at = ?, progress = 0, stage = NULL,
+                    owner_host = ?, owner_pid = ?, heartbeat_at = ?
+                WHERE job_id = (SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+                  AND status = 'queued'
+                RETURNING *
+                """,
+                (now, socket.gethostname(), os.getpid(), now)
+            ).fetchone()
+
+        return self._to_dict(self._transaction(take))
+
+    def update(self, job_id, stage, progress):
+        self._execute(
+            "UPDATE jobs SET stage = ?, progress = ?, heartbeat_at = ? WHERE job_id = ?",
+            (stage, progress, time.time(), job_id)
+        )
+
+    def heartbeat(self, job_id):
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, result=None, error=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?",
+            (
+                "failed" if error else "done",
+                0 if error else 1,
+                json.dumps(result) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+            )
+        )
+
+    def requeue_stale(self):
+        """Laufende Jobs, deren Besitzer nicht mehr lebt (siehe owner_alive), wieder einreihen."""
+        def requeue(conn):
+            stale = [
+                row["job_id"] for row in conn.execute("SELECT * FROM jobs WHERE status = 'running'")
+                if not owner_alive(row)
+            ]
+            for job_id in stale:
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'queued', stage = NULL, progress = 0,
+                        owner_host = NULL, owner_pid = NULL, heartbeat_at = NULL
+                    WHERE job_id = ? AND status = 'running'
+                    """,
+                    (job_id,)
+                )
+            return len(stale)
+
+        return self._transaction(requeue)
+
+    # ____ ABFRAGEN ____
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def recent(self, limit=10):
+        """Zuletzt eingereichte Jobs, neueste zuerst."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def active(self):
+        return [job for job in self.recent(limit=50) if job["status"] in ACTIVE_STATUSES]
+
+
+class JobWorker:
+    """
+    Hintergrund-Thread, der Jobs nacheinander abarbeitet (eine Woche nach der anderen,
+    weil alle Stufen in dieselben Stores schreiben).
+
+    handlers: {kind: handler(payload, progress)}, progress(stage, index, n_stages);
+    der Rückgabewert des Handlers wird als Ergebnis gespeichert.
+    """
+
+    def __init__(self, queue: JobQueue, handlers, poll_seconds=1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        stale = self.queue.requeue_stale()
+        if stale:
+            print(f"{stale} unterbrochene Jobs wieder eingereiht.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="job-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.run_next():
+                # Jobs toter Worker (auch anderer Prozesse) zurückholen
+                self.queue.requeue_stale()
+                self._stop.wait(self.poll_seconds)
+
+    def run_next(self):
+        """Einen Job ausführen; False, wenn keiner wartet."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        job_id = job["job_id"]
+
+        def progress(stage, index, n_stages):
+            self.queue.update(job_id, stage, index / n_stages)
+
+        # Heartbeat auch während langer Stufen ohne Fortschrittsmeldung
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(HEARTBEAT_SECONDS):
+                self.queue.heartbeat(job_id)
+
+        threading.Thread(target=beat, name="job-heartbeat", daemon=True).start()
+        try:
+            result = self.handlers[job["kind"]](job["payload"], progress)
+        except Exception as e:
+            traceback.print_exc()
+            self.queue.finish(job_id, error=f"{type(e).__name__}: {e}")
+        else:
+            self.queue.finish(job_id, result=result)
+            print(f"Job {job_id[:12]} ({job['kind']}) abgeschlossen.")
+        finally:
+            done.set()
+        return True
+
+
+_WORKERS = {}
+_WORKERS_LOCK = threading.Lock()
+
+def background_worker(path, handlers):
+    """
+    Prozessweit genau ein laufender Worker pro Queue-Datei (Streamlit führt das
+    Seitenskript bei jedem Rerun und in jeder Session erneut aus).
+    """
+    key = str(Path(path).resolve())
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(key)
+        if worker is None:
+            worker = _WORKERS[key] = JobWorker(JobQueue(path), handlers)
+        return worker.start()
@@ -0,0 +1,134 @@
+"""
+Surrogat-Schlüssel (int32) für Tracks und Artists.
+
+Dimensionen (jeweils String → dichter int32-Schlüssel, -1 = fehlt):
+- track:       track_id                        → track_key
+- artist:      artist_id (Haupt-Artist)        → artist_key
+- artist_name: einzelne Artists aus artist_names
+               ("JC NO BEAT, DJ F7, MC Meno Dani" → 3 Artists) → artist_name_keys (list<int32>)
+
+Joins, Sortierungen und groupbys laufen auf diesen Schlüsseln statt auf langen Strings.
+Wie die Genre-IDs (genres.GenreVocab) sind die Schlüssel prozessweit und append-only,
+werden aber nicht gespeichert: in den Stores stehen weiterhin die Spotify-IDs,
+die Schlüssel entstehen beim Laden (add_keys).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MISSING_KEY = -1
+
+# Trennzeichen mehrerer Artists in artist_names (Spotify-Charts)
+ARTIST_SEPARATOR = ", "
+
+KEY_COLUMNS = ["track_key", "artist_key", "artist_name_keys"]
+
+
+# ____ DIMENSIONEN ____
+
+class KeyVocab:
+    """Append-only Dimension: jeder Wert bekommt einen festen, dichten int32-Schlüssel."""
+
+    def __init__(self, name):
+        self.name = name
+        self._keys = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def encode(self, values):
+        """Werte → Schlüssel (neue Werte werden angehängt, fehlende Werte → -1)."""
+        codes, uniques = pd.factorize(pd.Series(values, copy=False))
+        uniques = np.asarray(uniques, dtype=object)
+        with self._lock:
+            for value in uniques:
+                if value not in self._keys:
+                    self._keys[value] = len(self._values)
+                    self._values.append(value)
+            lookup = np.array([self._keys[value] for value in uniques], dtype=np.int32)
+        return np.where(codes >= 0, lookup[codes] if len(lookup) else MISSING_KEY, MISSING_KEY).astype(np.int32)
+
+    def decode(self, keys):
+        """Schlüssel → Categorical mit den Werten (-1 → NaN)."""
+        return pd.Categorical.from_codes(np.asarray(keys, dtype=np.int32), categories=list(self._values))
+
+    def table(self):
+        """Dimensionstabelle (key, value)."""
+        return pd.DataFrame({
+            "key": np.arange(len(self._values), dtype=np.int32),
+            self.name: pd.Series(self._values, dtype=object),
+        })
+
+
+_VOCABS = {name: KeyVocab(name) for name in ("track", "artist", "artist_name")}
+
+def key_vocab(name):
+    """Liefert die prozessweit geteilte Dimension 'track', 'artist' oder 'artist_name'."""
+    return _VOCABS[name]
+
+
+# ____ SCHLÜSSEL ____
+
+def split_artists(artist_names, vocab=None):
+    """
+    Zerlegt artist_names in die einzelnen Artists (geparst wird nur pro eindeutigem Wert).
+
+    Returns:
+        pd.Series mit dtype list<int32>[pyarrow] (Schlüssel der Dimension 'artist_name'),
+        gleicher Index wie artist_names; fehlende Werte → leere Liste
+    """
+    vocab = vocab if vocab is not None else key_vocab("artist_name")
+    artist_names = pd.Series(artist_names, copy=False)
+    codes, uniques = pd.factorize(artist_names)
+
+    parts = pd.Series(np.asarray(uniques, dtype=object), dtype=object).str.split(ARTIST_SEPARATOR).explode().str.strip()
+    parts = parts[parts.notna() & (parts != "")]
+    owner = parts.index.to_numpy()
+    keys = vocab.encode(parts.to_numpy(dtype=object)) if len(parts) else np.array([], dtype=np.int32)
+
+    u_lengths = np.bincount(owner, minlength=len(uniques)).astype(np.int64)
+    u_offsets = np.concatenate([[0], np.cumsum(u_lengths)])
+
+    # Pro Zeile: Offsets und Indizes aus den Unique-Werten zusammensetzen
+    lengths = np.where(codes >= 0, u_lengths[codes] if len(uniques) else 0, 0)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    pos = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths) + np.repeat(u_offsets[np.maximum(codes, 0)], lengths)
+
+    arr = pa.ListArray.from_arrays(pa.array(offsets.astype(np.int32)), pa.array(keys[pos], type=pa.int32()))
+    return pd.Series(pd.arrays.ArrowExtensionArray(arr), index=artist_names.index, name="artist_name_keys")
+
+
+def add_keys(df, loc=None):
+    """
+    Ergänzt track_key, artist_key und artist_name_keys (soweit die Quellspalten vorhanden
+    sind), an Position loc bzw. am Ende. Arbeitet in-place und gibt df zurück.
+    """
+    keys = {}
+    if "track_id" in df.columns:
+        keys["track_key"] = key_vocab("track").encode(df["track_id"])
+    if "artist_id" in df.columns:
+        keys["artist_key"] = key_vocab("artist").encode(df["artist_id"])
+    if "artist_names" in df.columns:
+        keys["artist_name_keys"] = split_artists(df["artist_names"]).set_axis(df.index)
+
+    loc = len(df.columns) if loc is None else loc
+    for i, (name, values) in enumerate(keys.items()):
+        df.insert(loc + i, name, values)
+    return df
+
+
+def ordered_codes(values):
+    """
+    Dichte int32-Codes in Sortierreihenfolge der Werte (bei Categoricals: Reihenfolge der
+    Kategorien, wie sort_values): Sortieren nach den Codes ergibt dieselbe Reihenfolge
+    wie nach den Strings, aber ohne String-Vergleiche.
+
+    Returns:
+        (codes, n_uniques); fehlende Werte haben den Code n_uniques (sortieren zuletzt)
+    """
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), sort=True)
+    return np.where(codes >= 0, codes, len(uniques)).astype(np.int32), len(uniques)
@@ -0,0 +1,88 @@
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .history_store import HistoryStore
+
+# Explizites Schema der Chart-Historie:
+# Strings als Categorical (Integer-Codes + Dictionary), Ränge/Wochen als int32,
+# Popularity als nullable Kleinst-Integer, Datumsfelder geparst.
+CHART_SCHEMA = {
+    "chart_week": "datetime64[ns]",
+    "rank": "int32",
+    "uri": "category",
+    "artist_names": "category",
+    "track_name": "category",
+    "peak_rank": "int32",
+    "previous_rank": "int32",
+    "weeks_on_chart": "int32",
+    "streams": "int64",
+    "track_id": "category",
+    "artist_id": "category",
+    "release_date": "datetime64[ns]",
+    "explicit": "boolean",
+    "track_popularity": "Int8",
+    "artist_genres": "category",
+    "artist_followers": "Int64",
+    "artist_popularity": "Int8",
+    "source": "category",
+    "region": "category",
+}
+
+DATE_COLUMNS = ["chart_week", "release_date"]
+
+
+def memory_mb(df):
+    """Tatsächlicher Speicherbedarf eines DataFrames in MB (inkl. Strings)."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def apply_schema(df, schema=CHART_SCHEMA):
+    """Castet alle bekannten Spalten auf das kompakte Schema (unbekannte bleiben unverändert)."""
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif dtype == "boolean":
+            df[col] = df[col].map(
+                {True: True, False: False, "True": True, "False": False}
+            ).astype("boolean")
+        elif dtype in ("Int8", "Int64"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def load_chart_history(source, columns=None, weeks=None, start=None, end=None, report=True):
+    """
+    Gemeinsamer Loader für die Chart-Historie mit kompakten Datentypen.
+
+    Args:
+        source: CSV-Datei (z.B. df_cleaned_full.csv), HistoryStore oder dessen Ordner
+        columns (list, optional): nur diese Spalten laden
+        weeks, start, end (optional): Wochenauswahl (nur beim HistoryStore)
+        report (bool): Speicherbedarf und Ladezeit ausgeben
+
+    Returns:
+        DataFrame mit Categorical-Strings, int32-Rängen, nullable Popularity und Datumsfeldern
+    """
+    t0 = time.perf_counter()
+
+    if isinstance(source, HistoryStore) or Path(source).is_dir():
+        store = source if isinstance(source, HistoryStore) else HistoryStore(source)
+        df_raw = store.read(weeks=weeks, start=start, end=end, columns=columns)
+    else:
+        # Strings direkt beim Parsen als Categorical einlesen (keine Object-Zwischenkopie)
+        categories = {c: "category" for c, dtype in CHART_SCHEMA.items() if dtype == "category"}
+        df_raw = pd.read_csv(source, usecols=columns, dtype=categories)
+
+    df = apply_schema(df_raw)
+    elapsed = time.perf_counter() - t0
+
+    if report:
+        print(f"Historie geladen: {len(df)} Zeilen in {elapsed:.2f}s, {memory_mb(df):.1f} MB.")
+    return df
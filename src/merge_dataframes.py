@@ -1,6 +1,10 @@
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
+
+from .extraction_unique_entities import track_id_from_uri
+from .history_backup import apply_retention, create_snapshot
+from .history_store import HistoryStore
+from .regions import DEFAULT_REGION, region_dirs, week_tag
 
 def merge_new_data(
     charts_csv: str, 
@@ -9,7 +13,9 @@ def merge_new_data(
     processed_dir: Path,
     hist_raw_path: Path,
     hist_updated_path: Path,
-    backup_dir:Path
+    backup_dir:Path,
+    history_dir: Path = None,
+    region: str = None
 ):
     """
     Schritte: 
@@ -18,23 +24,43 @@ def merge_new_data(
     3. Merge über 'track_id'
     4. Bereinigung der Daten
     5. Speichern als data_week_YYYY-MM-DD
-    6. Historie aktualisieren und Backup erzeugen
+    6. Woche als Partition in den HistoryStore schreiben
+    7. Inkrementelles Backup: nur geänderte Partitionen sichern (history_backup.py)
+
+    Die Historie liegt wochenweise partitioniert in <processed_dir>/history
+    (siehe history_store.py). Beim ersten Lauf wird sie aus hist_updated_path
+    bzw. hist_raw_path migriert; danach kostet eine neue Woche nur noch eine Partition.
+
+    Jede Region hat eine eigene Historie (regions.region_dirs); dedupliziert wird
+    damit pro (Region, chart_week, track_id). Die Migration aus den CSVs betrifft
+    nur "global". Ohne region gilt die Spalte 'region' der Charts bzw. "global".
+
+    Gelesen wird dabei nichts aus der Historie: die Kosten bleiben pro Woche konstant,
+    unabhängig von der Länge der Historie. Aufrufer laden nur die Wochen, die sie brauchen
+    (z.B. load_chart_history(store, weeks=[...])).
+
+    Returns:
+        (df_week, store): die neue Woche und der HistoryStore der Region
     """
     charts_csv = Path(charts_csv)
     enriched_csv = Path(enriched_csv)
-    processed_dir.mkdir(parents=True, exist_ok=True)
-    backup_dir.mkdir(parents=True, exist_ok=True)
 
     # ____ Charts + Meta laden ____
     df_charts = pd.read_csv(charts_csv)
     df_meta = pd.read_csv(enriched_csv)
 
+    if region is None:
+        region = df_charts["region"].iloc[0] if "region" in df_charts.columns and len(df_charts) else DEFAULT_REGION
+    df_charts["region"] = region
+
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    if region != DEFAULT_REGION:
+        backup_dir = backup_dir / "regions" / region
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    history_dir = Path(history_dir) if history_dir else region_dirs(processed_dir, region)["history"]
+
     # ____ track_id aus uri extrahieren
-    df_charts["track_id"] = (
-        df_charts["uri"]
-        .astype(str)
-        .str.replace("spotify:track:", "", regex=False)
-    )
+    df_charts["track_id"] = track_id_from_uri(df_charts["uri"])
 
     # ____ Merge über track_id ____
     df_week = pd.merge(
@@ -54,48 +80,20 @@ def merge_new_data(
     df_week["artist_genres"] = df_week["artist_genres"].fillna("unknown")
 
     # ____ data_week_YYYY-MM-DD.csv speichern ____
-    weekly_path = processed_dir / f"data_week_{date_str}.csv"
+    weekly_path = processed_dir / f"data_week_{week_tag(region, date_str)}.csv"
     df_week.to_csv(weekly_path, index=False)
 
-    # ____ Historie aktualisieren und speichern ____
-    if hist_updated_path.exists():
-        df_hist = pd.read_csv(hist_updated_path)
-    else:
-        # Falls noch keine updated_Datei gibt, starte mit raw
-        df_hist = pd.read_csv(hist_raw_path)
-    
-    # Datumsfelder vereinheitlichen 
-    df_hist["chart_week"] = pd.to_datetime(df_hist["chart_week"], errors="coerce") 
-    df_hist["release_date"] = pd.to_datetime(df_hist["release_date"], errors="coerce")
+    # ____ Historie aktualisieren (nur die Partition dieser Woche) ____
+    store = HistoryStore(history_dir, region)
 
-    # Neue Woche anhängen
-    df_all = pd.concat([df_hist, df_week], ignore_index=True)
+    if store.is_empty() and region == DEFAULT_REGION:
+        # Falls noch keine Partitionen existieren: Migration aus updated bzw. raw
+        store.bootstrap_from_csv(hist_updated_path if hist_updated_path.exists() else hist_raw_path)
 
-    # Deduplizieren
-    df_all = df_all.drop_duplicates(subset=["chart_week", "track_id"], keep="last") 
+    store.write_week(df_week, date_str)
 
-    # Sortieren
-    df_all = df_all.sort_values(by=["chart_week", "track_id"]).reset_index(drop=True)
-    
-    # Datumsformat zurück zu Strings
-    df_all["chart_week"] = df_all["chart_week"].dt.strftime("%Y-%m-%d")
-    df_all["release_date"] = df_all["release_date"].dt.strftime("%Y-%m-%d")
-    
-    # Speichern der aktualisierten Historie 
-    df_all.to_csv(hist_updated_path, index=False)
+    # ____ Inkrementelles Backup (max. ein Snapshot pro Tag) ____
+    create_snapshot(store, backup_dir)
+    apply_retention(backup_dir)
 
-    # ____ Backup erzeugen (max. ein Backup pro Tag) ____
-        
-    today_str = datetime.now().strftime("%Y-%m-%d") 
-    
-    # Alte Backups des heutigen Tages löschen 
-    for file in backup_dir.glob(f"hist_data_{today_str}_*.csv"): 
-        file.unlink() 
-    
-    # Neues Backup speichern 
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") 
-    backup_path = backup_dir / f"hist_data_{today_str}_{timestamp}.csv" 
-    df_all.to_csv(backup_path, index=False) 
-    
-    return df_all
-    
\ No newline at end of file
+    return df_week, store
@@ -0,0 +1,264 @@
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import lightgbm as lgb
+from prophet.serialize import model_from_json
+
+from .feature_cache import fingerprint
+from .history_store import atomic_write_json, file_sha256
+
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parents[1] / "models"
+REGISTRY_NAME = "registry.json"
+# Unter <Projekt>/data/interim: Pickle-Cache und Laufzeit-Zustand (aktive Version, nicht versioniert)
+CACHE_DIR_NAME = "model_cache"
+STATE_NAME = "model_state.json"
+
+
+def interim_dir(root):
+    """data/interim des Projekts, zu dem der Modellordner root (<Projekt>/models) gehört."""
+    return Path(root).resolve().parent / "data" / "interim"
+
+# Bisherige, fest verdrahtete Artefakte (werden beim ersten Start als "v1" registriert)
+LEGACY_FILES = {
+    "prophet": "market_trend_prophet_v1.json",
+    "lgbm": "rising_artist_lgbm_v1.txt",
+    "threshold": "rising_artist_threshold.json",
+    "features": "rising_artist_features.json",
+}
+
+
+class ModelBundle:
+    """Geladene Artefakte einer Modellversion (wird nach dem Laden nicht mehr verändert)."""
+
+    def __init__(self, version, prophet_model, lgbm_model, threshold, feature_cols, checksums, load_seconds):
+        self.version = version
+        self.prophet_model = prophet_model
+        self.lgbm_model = lgbm_model
+        self.threshold = threshold
+        self.feature_cols = feature_cols
+        self.checksums = checksums
+        self.prophet_version = checksums["prophet"]
+        self.fingerprint = fingerprint(checksums)
+        self.load_seconds = load_seconds
+
+    def as_tuple(self):
+        return self.prophet_model, self.lgbm_model, self.threshold, self.feature_cols
+
+
+class ModelRegistry:
+    """
+    Versionierte Modelle unter models/ mit Manifest.
+
+    Aufbau:
+        <root>/registry.json    Standardversion; pro Version Dateien, Prüfsummen,
+                                Threshold und Feature-Liste (nur statische Metadaten)
+        <root>/<Dateien>        Prophet-JSON, LightGBM-Text, Threshold, Feature-Liste
+        state_path              aktive Version zur Laufzeit (fehlt sie: Standardversion)
+
+    cache_dir und state_path liegen standardmäßig unter <Projekt>/data/interim des
+    Projekts von root, unabhängig vom Arbeitsverzeichnis des Prozesses.
+
+    Modelle werden erst beim ersten get() geladen. Geparste Artefakte landen als
+    Pickle im cache_dir (Schlüssel = Prüfsummen), ein Neustart liest dann nur noch
+    diese Binärdatei. activate() lädt die neue Version vollständig und tauscht sie
+    danach in einem Schritt aus; laufende Vorhersagen behalten ihr altes Bundle.
+    Die versionierte registry.json wird dabei nicht verändert.
+    """
+
+    def __init__(self, root=DEFAULT_MODEL_DIR, cache_dir=None, state_path=None):
+        self.root = Path(root).resolve()
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else interim_dir(root) / CACHE_DIR_NAME
+        self.state_path = Path(state_path) if state_path is not None else interim_dir(root) / STATE_NAME
+        self.manifest_path = self.root / REGISTRY_NAME
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._manifest_mtime_ns = None
+        self._state_mtime_ns = None
+        self._state = {}
+        self.stats = {"loads": 0, "binary_hits": 0, "last_load_seconds": None}
+        self.manifest = self._load_manifest()
+
+    # ____ MANIFEST ____
+    def _load_manifest(self):
+        if self.manifest_path.exists():
+            self._manifest_mtime_ns = self.manifest_path.stat().st_mtime_ns
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            # Ältere Manifeste führten die aktive Version als "active"
+            manifest.setdefault("default", manifest.pop("active", None))
+            return manifest
+
+        manifest = {"default": None, "versions": {}}
+        if all((self.root / name).exists() for name in LEGACY_FILES.values()):
+            self.manifest = manifest
+            self.register("v1", LEGACY_FILES)
+        return manifest
+
+    def _save_manifest(self):
+        atomic_write_json(self.manifest_path, self.manifest)
+        self._manifest_mtime_ns = self.manifest_path.stat().st_mtime_ns
+
+    def _refresh(self):
+        """Manifest und Zustand neu lesen, wenn ein anderer Prozess (z.B. die CLI) sie geändert hat."""
+        if self.manifest_path.exists() and self.manifest_path.stat().st_mtime_ns != self._manifest_mtime_ns:
+            self.manifest = self._load_manifest()
+
+        mtime_ns = self.state_path.stat().st_mtime_ns if self.state_path.exists() else None
+        if mtime_ns != self._state_mtime_ns:
+            self._state = {}
+            if mtime_ns is not None:
+                with open(self.state_path, encoding="utf-8") as f:
+                    self._state = json.load(f)
+            self._state_mtime_ns = mtime_ns
+
+    def versions(self):
+        return sorted(self.manifest["versions"])
+
+    def active_version(self):
+        """Aktive Version laut Zustandsdatei, sonst die Standardversion aus registry.json."""
+        self._refresh()
+        active = self._state.get("active")
+        return active if active in self.manifest["versions"] else self.manifest["default"]
+
+    # ____ REGISTRIEREN ____
+    def register(self, version, files, activate=False):
+        """
+        Registriert eine Version aus Dateien in root (die erste wird Standardversion).
+
+        Args:
+            files (dict): Dateinamen für "prophet", "lgbm", "threshold", "features"
+            activate (bool): zusätzlich aktivieren (nur Zustandsdatei)
+        """
+        missing = [role for role in LEGACY_FILES if role not in files]
+        if missing:
+            raise ValueError(f"Fehlende Modell-Artefakte für {version}: {missing}")
+
+        with open(self.root / files["threshold"], encoding="utf-8") as f:
+            threshold = json.load(f)["best_threshold"]
+        with open(self.root / files["features"], encoding="utf-8") as f:
+            feature_cols = json.load(f)
+
+        self.manifest["versions"][version] = {
+            "files": dict(files),
+            "sha256": {role: file_sha256(self.root / name) for role, name in files.items()},
+            "threshold": threshold,
+            "feature_cols": feature_cols,
+        }
+        if self.manifest["default"] is None:
+            self.manifest["default"] = version
+        self._save_manifest()
+        print(f"Modellversion {version} registriert.")
+        if activate:
+            self.activate(version)
+
+    # ____ LADEN ____
+    def _binary_path(self, meta):
+        # Nur Prophet und LightGBM landen im Pickle; Threshold/Features stehen im Manifest
+        key = fingerprint(meta["sha256"]["prophet"], meta["sha256"]["lgbm"])
+        return self.cache_dir / f"{key[:16]}.pkl"
+
+    def load(self, version):
+        """Lädt eine Version (ohne sie zu aktivieren); bevorzugt aus dem Binär-Cache."""
+        meta = self.manifest["versions"].get(version)
+        if meta is None:
+            raise KeyError(f"Unbekannte Modellversion: {version}")
+
+        t0 = time.perf_counter()
+        binary = self._binary_path(meta)
+        if binary.exists():
+            with open(binary, "rb") as f:
+                prophet_model, lgbm_model = pickle.load(f)
+            self.stats["binary_hits"] += 1
+        else:
+            # Prüfsummen nur beim Parsen der Originaldateien prüfen
+            for role in ("prophet", "lgbm"):
+                path = self.root / meta["files"][role]
+                if file_sha256(path) != meta["sha256"][role]:
+                    raise ValueError(f"Prüfsumme von {path} passt nicht zum Manifest ({version}).")
+
+            with open(self.root / meta["files"]["prophet"], "r") as f:
+                prophet_model = model_from_json(f.read())
+            lgbm_model = lgb.Booster(model_file=str(self.root / meta["files"]["lgbm"]))
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = binary.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump((prophet_model, lgbm_model), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, binary)
+
+        load_seconds = time.perf_counter() - t0
+        self.stats["loads"] += 1
+        self.stats["last_load_seconds"] = load_seconds
+        print(f"Modelle geladen: {version} in {load_seconds:.3f}s. Optimaler Threshold: {meta['threshold']}")
+
+        return ModelBundle(
+            version, prophet_model, lgbm_model, meta["threshold"], meta["feature_cols"],
+            meta["sha256"], load_seconds
+        )
+
+    def get(self):
+        """Bundle der aktiven Version (lazy; lädt neu, wenn die aktive Version gewechselt hat)."""
+        active = self.active_version()
+        if active is None:
+            raise FileNotFoundError(f"Keine Modellversion in {self.root} registriert.")
+
+        bundle = self._bundle
+        if bundle is not None and bundle.version == active:
+            return bundle
+
+        with self._lock:
+            if self._bundle is None or self._bundle.version != active:
+                self._bundle = self.load(active)
+            return self._bundle
+
+    def loaded(self):
+        """Aktuell geladenes Bundle oder None (lädt nichts)."""
+        return self._bundle
+
+    def activate(self, version):
+        """
+        Hot Swap: neue Version erst vollständig laden, dann aktivieren. Gilt für alle
+        Sessions und Jobs, die dieses Datenverzeichnis nutzen (Zustandsdatei).
+        """
+        bundle = self.load(version)
+        with self._lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.state_path, {
+                "active": version,
+                "activated_at": datetime.now().isoformat(timespec="seconds"),
+            })
+            self._bundle = bundle
+        return bundle
+
+    def version_fingerprint(self, version):
+        """Prüfsumme der Artefakte einer Version, ohne die Modelle zu laden."""
+        return fingerprint(self.manifest["versions"][version]["sha256"])
+
+    def active_fingerprint(self):
+        """Modellversion als Prüfsumme der Artefakte, ohne die Modelle zu laden."""
+        return self.version_fingerprint(self.active_version())
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+def model_registry(root=None):
+    """
+    Liefert die prozessweit geteilte Registry. Der erste Aufruf legt den Modellordner
+    fest (Default: <Projekt>/models); ohne root wird die bestehende Registry geliefert,
+    ein abweichender root ist ein Fehler statt stillschweigend ignoriert zu werden.
+    """
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = ModelRegistry(root if root is not None else DEFAULT_MODEL_DIR)
+        elif root is not None and Path(root).resolve() != _REGISTRY.root:
+            raise ValueError(
+                f"Modell-Registry ist bereits auf {_REGISTRY.root} festgelegt, nicht {Path(root).resolve()}."
+            )
+        return _REGISTRY
@@ -0,0 +1,434 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from .extraction_unique_entities import prepare_unique_tracks
+from .feature_cache import FeatureCache
+from .feature_store import FeatureStore, features_key, load_features
+from .forecast import FORECAST_WEEKS, RECENT_WEEKS
+from .history_store import HistoryStore, atomic_write_json
+from .merge_dataframes import merge_new_data
+from .model_registry import model_registry
+from .predict_pipeline import model_fingerprint
+from .prediction_store import PredictionStore, forecast_with_store, score_history
+from .regions import DEFAULT_REGION, extract_region_from_filename, region_dirs, week_tag
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+def pipeline_dirs(base_dir=BASE_DIR):
+    """
+    Verzeichnisse der Pipeline relativ zum Projektordner. Alles, was die Pipeline
+    liest oder schreibt (Stores, Caches, Trend-Tabellen, Modelle und deren Zustand),
+    liegt darunter; das Arbeitsverzeichnis des Prozesses spielt keine Rolle.
+    """
+    data_dir = Path(base_dir) / "data"
+    return {
+        "raw": data_dir / "raw",
+        "interim": data_dir / "interim",
+        "processed": data_dir / "processed",
+        "backups": data_dir / "backups",
+        "models": Path(base_dir) / "models",
+    }
+
+
+def default_client(dirs):
+    """SpotifyClient mit dem Spotify-Cache des Projektordners."""
+    from .spotify_cache import SpotifyCache
+    from .spotify_client import SpotifyClient
+
+    return SpotifyClient(cache=SpotifyCache(dirs["interim"] / "spotify_cache.sqlite"))
+
+
+# ____ STUFEN ____
+# Jede Stufe liest und ergänzt den gemeinsamen Kontext ctx.
+
+def stage_extract(ctx):
+    """Unique Tracks aus der hochgeladenen Chart-Datei extrahieren."""
+    dirs = ctx["dirs"]
+    _, unique_path, date_str = prepare_unique_tracks(
+        input_path=ctx["raw_path"],
+        processed_dir=dirs["processed"],
+        output_dir=dirs["interim"]
+    )
+    ctx["unique_path"] = unique_path
+    ctx["date_str"] = date_str
+    return len(pd.read_csv(unique_path))
+
+
+def stage_enrich(ctx):
+    """Spotify-IDs und Metadaten holen (Cache + API)."""
+    tag = week_tag(ctx["region"], ctx["date_str"])
+    client = ctx.get("client") or default_client(ctx["dirs"])
+    df_enriched = client.run_full_pipeline(
+        unique_tracks_csv=ctx["unique_path"],
+        date_str=tag,
+        output_dir=ctx["dirs"]["interim"]
+    )
+    ctx["enriched_csv"] = ctx["dirs"]["interim"] / f"enriched_data_{tag}.csv"
+    return len(df_enriched)
+
+
+def stage_merge(ctx):
+    """Charts + enriched_data als neue Woche in die Historie der Region schreiben."""
+    dirs, date_str, region = ctx["dirs"], ctx["date_str"], ctx["region"]
+    enriched_csv = ctx.get("enriched_csv") or dirs["interim"] / f"enriched_data_{week_tag(region, date_str)}.csv"
+    df_week, history = merge_new_data(
+        charts_csv=dirs["processed"] / f"regional_{region}_weekly_{date_str}.csv",
+        enriched_csv=enriched_csv,
+        date_str=date_str,
+        processed_dir=dirs["processed"],
+        hist_raw_path=dirs["processed"] / "hist_data_24-25.csv",
+        hist_updated_path=dirs["processed"] / "hist_data_updated.csv",
+        backup_dir=dirs["backups"],
+        history_dir=ctx["stores"]["history"],
+        region=region
+    )
+    ctx["rows_history"] = history.n_rows()
+    return len(df_week)
+
+
+def stage_features(ctx):
+    """Features inkrementell über den FeatureStore (bzw. aus dem Feature-Cache)."""
+    dirs, stores = ctx["dirs"], ctx["stores"]
+    history = HistoryStore(stores["history"], ctx["region"])
+    df_features = load_features(
+        history, FeatureStore(stores["features"]), FeatureCache(dirs["interim"] / "feature_cache")
+    )
+    df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce")
+    ctx["history"] = history
+    ctx["features_key"] = features_key(history)
+    ctx["df_features"] = df_features
+    return len(df_features)
+
+
+def stage_predict(ctx):
+    """Nur fehlende bzw. geänderte Wochen bewerten (PredictionStore)."""
+    ctx["prediction_store"] = PredictionStore(ctx["stores"]["predictions"], model_fingerprint())
+    ctx["df_features"] = score_history(
+        ctx["df_features"], ctx["history"], ctx["prediction_store"], trend_dir=ctx["trend_dir"]
+    )
+    return len(ctx["df_features"])
+
+
+def stage_forecast(ctx):
+    """Forecast ab der letzten Woche berechnen und speichern."""
+    forecast = forecast_with_store(
+        ctx["df_features"],
+        ctx["prediction_store"],
+        ctx["features_key"],
+        weeks=ctx.get("forecast_weeks", FORECAST_WEEKS),
+        recent_weeks=ctx.get("recent_weeks", RECENT_WEEKS),
+        trend_dir=ctx["trend_dir"]
+    )
+    ctx["forecast_tracks"] = len(forecast["tracks"])
+    ctx["forecast_pruned"] = forecast["n_pruned"]
+    return int(forecast["probs"].size)
+
+
+STAGES = {
+    "ingest": stage_extract,
+    "enrich": stage_enrich,
+    "merge": stage_merge,
+    "features": stage_features,
+    "predict": stage_predict,
+    "forecast": stage_forecast,
+}
+
+# Stufen je Befehl (predict / forecast brauchen die Features im Speicher;
+# bekannte Historien-Stände kommen dabei aus dem Feature-Cache)
+COMMANDS = {
+    "ingest": ["ingest"],
+    "enrich": ["enrich"],
+    "merge": ["merge"],
+    "features": ["features"],
+    "predict": ["features", "predict"],
+    "forecast": ["features", "predict", "forecast"],
+    "run-all": list(STAGES),
+}
+
+
+def make_context(base_dir=BASE_DIR, raw_path=None, date_str=None, client=None, recent_weeks=RECENT_WEEKS,
+                 forecast_weeks=FORECAST_WEEKS, region=None):
+    """
+    Kontext für einzelne Stufen; ohne ingest ergeben sich die Pfade aus date_str.
+    Die Region kommt aus dem Dateinamen der Chart-CSV, sonst aus region (Default "global").
+    Legt die prozessweite Modell-Registry auf <base_dir>/models fest.
+    """
+    dirs = pipeline_dirs(base_dir)
+    model_registry(dirs["models"])
+    if region is None:
+        region = extract_region_from_filename(raw_path) if raw_path else DEFAULT_REGION
+    ctx = {
+        "raw_path": Path(raw_path) if raw_path else None,
+        "dirs": dirs,
+        "region": region,
+        "stores": region_dirs(dirs["processed"], region),
+        "trend_dir": dirs["interim"] / "prophet_trend",
+        "client": client,
+        "recent_weeks": recent_weeks,
+        "forecast_weeks": forecast_weeks,
+    }
+    if date_str:
+        ctx["date_str"] = date_str
+        ctx["unique_path"] = dirs["interim"] / f"unique_tracks_to_enrich_{week_tag(region, date_str)}.csv"
+    return ctx
+
+
+def run_stages(ctx, stages, progress=None):
+    """
+    Führt die Stufen nacheinander aus und misst Laufzeit, Zeilen und Peak-Speicher.
+
+    Args:
+        progress: optional progress(stage, index, n_stages) vor jeder Stufe
+
+    Returns:
+        Liste mit einem Bericht pro Stufe (JSON-fähig)
+    """
+    report = []
+    for i, name in enumerate(stages):
+        if progress is not None:
+            progress(name, i, len(stages))
+        t0 = time.perf_counter()
+        rows = STAGES[name](ctx)
+        seconds = time.perf_counter() - t0
+        report.append({
+            "stage": name,
+            "seconds": round(seconds, 3),
+            "rows": rows,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        })
+        print(f"Stufe {name}: {seconds:.2f}s, {rows:,} Zeilen")
+    return report
+
+
+def _peak_rss_mb():
+    """Bisheriger Peak-Speicher des Prozesses (MB); 0 ohne das Modul resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_week_pipeline(raw_path, base_dir=BASE_DIR, client=None, recent_weeks=RECENT_WEEKS, progress=None):
+    """
+    Upload → Enrichment → Merge → Features → Vorhersage → Forecast für eine Wochen-Datei,
+    ohne Streamlit (Job-Worker, siehe jobs.py, und CLI run-all).
+
+    Returns:
+        dict mit Kennzahlen und Bericht pro Stufe (JSON-fähig)
+    """
+    ctx = make_context(base_dir, raw_path=raw_path, client=client, recent_weeks=recent_weeks)
+    report = run_stages(ctx, COMMANDS["run-all"], progress)
+
+    return {
+        "date_str": ctx["date_str"],
+        "region": ctx["region"],
+        "rows_history": ctx["rows_history"],
+        "weeks": len(ctx["history"].weeks()),
+        "forecast_tracks": ctx["forecast_tracks"],
+        "forecast_pruned": ctx["forecast_pruned"],
+        "stages": report,
+    }
+
+
+def week_job(payload, progress):
+    """Job-Handler (jobs.JobWorker) für eine hochgeladene Wochen-Datei."""
+    return run_week_pipeline(
+        payload["raw_path"],
+        base_dir=payload.get("base_dir", BASE_DIR),
+        recent_weeks=payload.get("recent_weeks", RECENT_WEEKS),
+        progress=progress
+    )
+
+
+# ____ MEHRERE REGIONEN ____
+# ingest und enrich laufen im Hauptprozess (ein gemeinsamer Spotify-Cache, keine doppelten
+# API-Calls für Tracks, die in mehreren Märkten chartet); merge → forecast pro Region
+# in eigenen Prozessen, da jede Region eigene Stores hat.
+
+REGION_STAGES = ["features", "predict", "forecast"]
+
+
+def enrich_shared(contexts, client=None):
+    """
+    Unique Tracks aller Regionen einer Woche vereinigen und einmal anreichern
+    (enriched_data_regions_YYYY-MM-DD.csv); setzt enriched_csv in jedem Kontext.
+    """
+    client = client or default_client(contexts[0]["dirs"])
+    by_date = {}
+    for ctx in contexts:
+        by_date.setdefault(ctx["date_str"], []).append(ctx)
+
+    report = []
+    for date_str, group in sorted(by_date.items()):
+        interim = group[0]["dirs"]["interim"]
+        df_unique = pd.concat([pd.read_csv(ctx["unique_path"]) for ctx in group], ignore_index=True)
+        df_unique = df_unique.drop_duplicates(subset=["track_name", "artist_names"])
+
+        tag = f"regions_{date_str}"
+        unique_path = interim / f"unique_tracks_to_enrich_{tag}.csv"
+        df_unique.to_csv(unique_path, index=False)
+
+        t0 = time.perf_counter()
+        df_enriched = client.run_full_pipeline(unique_tracks_csv=unique_path, date_str=tag, output_dir=interim)
+        report.append({
+            "stage": "enrich",
+            "region": ",".join(ctx["region"] for ctx in group),
+            "seconds": round(time.perf_counter() - t0, 3),
+            "rows": len(df_enriched),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        })
+        for ctx in group:
+            ctx["enriched_csv"] = interim / f"enriched_data_{tag}.csv"
+    return report
+
+
+def run_region(base_dir, region, weeks, recent_weeks=RECENT_WEEKS, forecast_weeks=FORECAST_WEEKS):
+    """
+    Neue Wochen einer Region in deren Historie schreiben, dann Features, Vorhersage
+    und Forecast der Region (läuft in einem Worker-Prozess von run_regions).
+
+    Args:
+        weeks: Liste von (date_str, enriched_csv), chronologisch
+    """
+    report = []
+    for date_str, enriched_csv in weeks:
+        ctx = make_context(base_dir, date_str=date_str, region=region, recent_weeks=recent_weeks,
+                           forecast_weeks=forecast_weeks)
+        ctx["enriched_csv"] = Path(enriched_csv)
+        report += run_stages(ctx, ["merge"])
+    report += run_stages(ctx, REGION_STAGES)
+
+    return {
+        "region": region,
+        "date_str": weeks[-1][0],
+        "rows_history": ctx["rows_history"],
+        "weeks": len(ctx["history"].weeks()),
+        "forecast_tracks": ctx["forecast_tracks"],
+        "forecast_pruned": ctx["forecast_pruned"],
+        "stages": [{**r, "region": region} for r in report],
+    }
+
+
+def run_regions(raw_paths, base_dir=BASE_DIR, client=None, workers=None, recent_weeks=RECENT_WEEKS,
+                forecast_weeks=FORECAST_WEEKS):
+    """
+    Alle Stufen für Chart-CSVs mehrerer Regionen (regional-<region>-weekly-YYYY-MM-DD.csv).
+
+    Returns:
+        Liste mit einem Ergebnis pro Region (wie run_week_pipeline) und die Berichte
+        der gemeinsamen Stufen ingest / enrich
+    """
+    contexts, shared = [], []
+    for raw_path in raw_paths:
+        ctx = make_context(base_dir, raw_path=raw_path, client=client)
+        shared += [{**r, "region": ctx["region"]} for r in run_stages(ctx, ["ingest"])]
+        contexts.append(ctx)
+    shared += enrich_shared(contexts, client)
+
+    by_region = {}
+    for ctx in sorted(contexts, key=lambda c: c["date_str"]):
+        by_region.setdefault(ctx["region"], []).append((ctx["date_str"], str(ctx["enriched_csv"])))
+
+    # spawn statt fork: keine geerbten Threads/Locks (Registry, Job-Worker) in den Workern
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = [
+            pool.submit(run_region, str(base_dir), region, weeks, recent_weeks, forecast_weeks)
+            for region, weeks in by_region.items()
+        ]
+        results = [f.result() for f in futures]
+
+    for r in results:
+        print(f"Region {r['region']}: {r['weeks']} Wochen, {r['forecast_tracks']} Forecast-Tracks")
+    return results, shared
+
+
+# ____ CLI ____
+
+def write_report(command, report, report_path=None, base_dir=BASE_DIR, **extra):
+    """
+    Bericht als JSON speichern (Default: data/interim/pipeline_reports/<Zeit>_<Befehl>.json).
+    total_seconds ist die Summe der Stufen; bei parallelen Regionen steht die
+    tatsächliche Dauer zusätzlich in wall_seconds (extra).
+    """
+    now = datetime.now()
+    if report_path is None:
+        report_dir = pipeline_dirs(base_dir)["interim"] / "pipeline_reports"
+        report_dir.mkdir(parents=True, exist_ok=True)
+        report_path = report_dir / f"{now:%Y-%m-%d_%H-%M-%S}_{command}.json"
+
+    payload = {
+        "command": command,
+        "finished_at": now.isoformat(timespec="seconds"),
+        "total_seconds": round(sum(r["seconds"] for r in report), 3),
+        "stages": report,
+        **extra,
+    }
+    atomic_write_json(Path(report_path), payload)
+    print(f"Bericht gespeichert: {report_path}")
+    return payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.pipeline",
+        description="Wochen-Pipeline ohne Streamlit (z.B. per cron zum Chart-Release am Donnerstag)."
+    )
+    parser.add_argument("--base-dir", default=str(BASE_DIR), help="Projektordner mit data/ und models/")
+    parser.add_argument("--report", default=None, help="Pfad des JSON-Berichts (Laufzeit und Zeilen pro Stufe)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("ingest", help="Unique Tracks aus einer Chart-CSV extrahieren").add_argument("raw_csv")
+    for name, help_text in [("enrich", "Spotify-IDs und Metadaten holen"), ("merge", "Woche in die Historie schreiben")]:
+        sub.add_parser(name, help=help_text).add_argument("--date", required=True, help="chart_week, z.B. 2026-01-15")
+    sub.add_parser("features", help="Features inkrementell aktualisieren")
+    sub.add_parser("predict", help="Fehlende Wochen bewerten")
+    for name, help_text in [("forecast", "Forecast ab der letzten Woche"), ("run-all", "Alle Stufen für eine Chart-CSV")]:
+        cmd = sub.add_parser(name, help=help_text)
+        if name == "run-all":
+            cmd.add_argument("raw_csv")
+        cmd.add_argument("--weeks", type=int, default=FORECAST_WEEKS, help="Forecast-Horizont in Wochen")
+        cmd.add_argument("--recent-weeks", type=int, default=RECENT_WEEKS, help="Nur Tracks der letzten N Wochen")
+    cmd = sub.add_parser("run-regions", help="Alle Stufen für Chart-CSVs mehrerer Regionen, parallel pro Region")
+    cmd.add_argument("raw_csvs", nargs="+")
+    cmd.add_argument("--workers", type=int, default=None, help="Prozesse (Default: Anzahl Kerne)")
+    cmd.add_argument("--weeks", type=int, default=FORECAST_WEEKS, help="Forecast-Horizont in Wochen")
+    cmd.add_argument("--recent-weeks", type=int, default=RECENT_WEEKS, help="Nur Tracks der letzten N Wochen")
+    for name in ["enrich", "merge", "features", "predict", "forecast"]:
+        sub.choices[name].add_argument("--region", default=DEFAULT_REGION, help="Region, z.B. de (Default: global)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run-regions":
+        t0 = time.perf_counter()
+        results, shared = run_regions(
+            args.raw_csvs, args.base_dir, workers=args.workers,
+            recent_weeks=args.recent_weeks, forecast_weeks=args.weeks
+        )
+        report = shared + [stage for r in results for stage in r["stages"]]
+        return write_report(
+            args.command, report, args.report, args.base_dir,
+            wall_seconds=round(time.perf_counter() - t0, 3),
+            regions={r["region"]: {k: v for k, v in r.items() if k != "stages"} for r in results}
+        )
+
+    ctx = make_context(
+        args.base_dir,
+        raw_path=getattr(args, "raw_csv", None),
+        date_str=getattr(args, "date", None),
+        recent_weeks=getattr(args, "recent_weeks", RECENT_WEEKS),
+        forecast_weeks=getattr(args, "weeks", FORECAST_WEEKS),
+        region=getattr(args, "region", None),
+    )
+    report = run_stages(ctx, COMMANDS[args.command])
+    return write_report(args.command, report, args.report, args.base_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,185 @@
-import json
+import numpy as np
 import pandas as pd
-from prophet.serialize import model_from_json
 import lightgbm as lgb
 import os
-import streamlit as st
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-MODEL_DIR = "models/"
+from .feature_cache import fingerprint
+from .model_registry import model_registry
 
+# Trend-Tabellen (ds → trend) je Prophet-Modellversion
+TREND_DIR = Path(__file__).resolve().parents[1] / "data" / "interim" / "prophet_trend"
 
-# ____ MODELLE LAZY LADEN ____
+# Zeilen pro LightGBM-Block (float32, zusammenhängend)
+SCORE_CHUNK_ROWS = 1 << 16
 
-_prophet_model = None
-_lgbm_model = None
-_best_t = None
-_feature_cols = None
 
-@st.cache_resource
-def load_artefacts(model_dir=MODEL_DIR):
-    """Lädt Prophet, LightGBM, Threshold und Feature-Liste."""
-    global _prophet_model, _lgbm_model, _best_t, _feature_cols
+# ____ MODELLE (LAZY ÜBER DIE REGISTRY) ____
 
-    if _prophet_model is not None:
-        return _prophet_model, _lgbm_model, _best_t, _feature_cols
+def load_artefacts(model_dir=None):
+    """Prophet, LightGBM, Threshold und Feature-Liste der aktiven Modellversion (Default: prozessweite Registry)."""
+    return model_registry(model_dir).get().as_tuple()
 
-    # Prophet
-    with open(os.path.join(model_dir, "market_trend_prophet_v1.json"), "r") as f:
-        _prophet_model = model_from_json(f.read())
+def prophet_version():
+    """Prüfsumme des aktiven Prophet-Modells (Schlüssel der Trend-Tabelle)."""
+    return model_registry().get().prophet_version
 
-    # LightGBM
-    _lgbm_model = lgb.Booster(
-        model_file=os.path.join(model_dir, "rising_artist_lgbm_v1.txt")
-    )
+def model_fingerprint(model_dir=None):
+    """Modellversion als Prüfsumme der Artefakte (für Cache-Schlüssel), ohne die Modelle zu laden."""
+    return model_registry(model_dir).active_fingerprint()
 
-    # Threshold
-    with open(os.path.join(model_dir, "rising_artist_threshold.json"), "r") as f:
-        _best_t = json.load(f)["best_threshold"]
+# ____ PROPHET-TREND ____
 
-    # Feature-Liste
-    with open(os.path.join(model_dir, "rising_artist_features.json"), "r") as f:
-        _feature_cols = json.load(f)
+def _trend_table_path(model_version, trend_dir=TREND_DIR):
+    return os.path.join(trend_dir, f"trend_{model_version[:16]}.parquet")
 
-    print(f"Modelle geladen. Optimaler Threshold: {_best_t}")
 
-    return _prophet_model, _lgbm_model, _best_t, _feature_cols
+def load_trend_table(model_version, trend_dir=TREND_DIR):
+    """Gespeicherte Trend-Tabelle einer Modellversion als Series (Index ds)."""
+    path = _trend_table_path(model_version, trend_dir)
+    if not os.path.exists(path):
+        return pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="ds"), name="trend")
+    table = pd.read_parquet(path)
+    return table.set_index("ds")["trend"]
+
+
+def prophet_trend(prophet_model, df, model_version=None, trend_dir=TREND_DIR):
+    """
+    Prophet-Trend pro Zeile von df.
+
+    Der Trend hängt nur von ds ab: Prophet wird deshalb nur einmal pro noch
+    unbekanntem Datum ausgewertet, und zwar nur die Trend-Komponente (kein
+    Unsicherheits-Sampling, keine Saisonalitäten). Das Ergebnis wird über ds
+    zurückgejoint; mit model_version wird die Tabelle ds → trend gespeichert
+    und beim nächsten Aufruf wiederverwendet.
+    """
+    ds = pd.to_datetime(df["ds"])
+    table = load_trend_table(model_version, trend_dir) if model_version else None
+    if table is None:
+        table = pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="ds"), name="trend")
+
+    missing = ~ds.isin(table.index)
+    if missing.any():
+        rows = df.loc[missing.to_numpy(), ["ds", "genre_idx_lagged", "seasonality_score"]]
+        rows = rows.assign(ds=ds[missing]).drop_duplicates("ds")
+
+        frame = prophet_model.setup_dataframe(rows.copy())
+        new = pd.Series(np.asarray(prophet_model.predict_trend(frame)), index=frame["ds"].to_numpy(), name="trend")
+        new.index.name = "ds"
+
+        table = pd.concat([table, new]).sort_index()
+        if model_version:
+            os.makedirs(trend_dir, exist_ok=True)
+            path = _trend_table_path(model_version, trend_dir)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            table.reset_index().to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        print(f"Prophet-Trend für {len(new)} neue Wochen berechnet ({len(table)} in der Tabelle).")
+
+    return ds.map(table).to_numpy()
+
+# ____ LIGHTGBM-SCORING IN BLÖCKEN ____
+
+def _fill_chunk(columns, start, stop, out):
+    """Schreibt die Zeilen [start, stop) aller Feature-Spalten in den float32-Block out."""
+    for j, col in enumerate(columns):
+        if col is None:
+            out[:, j] = 0
+        elif isinstance(col, pd.Series):
+            out[:, j] = col.iloc[start:stop].to_numpy(dtype="float32", na_value=np.nan)
+        else:
+            out[:, j] = col[start:stop]
+    out[np.isnan(out)] = 0
+    return out
+
+
+_worker_model = None
+_worker_threads = 0
+
+def _init_scoring_worker(model_str, num_threads):
+    global _worker_model, _worker_threads
+    _worker_model = lgb.Booster(model_str=model_str)
+    _worker_threads = num_threads
+
+def _score_block(X):
+    return _worker_model.predict(X, num_threads=_worker_threads)
+
+
+def score_lgbm(lgbm_model, columns, n_rows, chunk_rows=SCORE_CHUNK_ROWS, num_threads=0, processes=None):
+    """
+    Bewertet n_rows Zeilen blockweise: je chunk_rows Zeilen ein zusammenhängender
+    float32-Block, der Speicher hängt also nicht von der Eingabegröße ab.
+
+    Args:
+        columns: eine Spalte pro Modell-Feature (Series, Array oder None = 0)
+        num_threads: Threads pro Booster-Aufruf (0 = LightGBM-Standard, alle Kerne)
+        processes: optional Prozess-Pool für sehr große Frames (Blöcke parallel)
+
+    Returns:
+        np.ndarray mit den Wahrscheinlichkeiten
+    """
+    probs = np.empty(n_rows)
+    bounds = [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+    if not processes or processes < 2 or len(bounds) < 2:
+        buffer = np.empty((min(chunk_rows, n_rows), len(columns)), dtype=np.float32)
+        for start, stop in bounds:
+            X = _fill_chunk(columns, start, stop, buffer[:stop - start])
+            probs[start:stop] = lgbm_model.predict(X, num_threads=num_threads)
+        return probs
+
+    # Prozess-Pool: höchstens 2 Blöcke pro Prozess gleichzeitig unterwegs
+    threads = num_threads or max(1, (os.cpu_count() or 1) // processes)
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_scoring_worker,
+        initargs=(lgbm_model.model_to_string(), threads)
+    ) as pool:
+        pending = []
+        for start, stop in bounds:
+            X = _fill_chunk(columns, start, stop, np.empty((stop - start, len(columns)), dtype=np.float32))
+            pending.append((start, stop, pool.submit(_score_block, X)))
+            while len(pending) >= 2 * processes:
+                s, e, future = pending.pop(0)
+                probs[s:e] = future.result()
+        for s, e, future in pending:
+            probs[s:e] = future.result()
+    return probs
 
 # ____ PREDICTION PIPELINE ____ 
 
-@st.cache_data
-def run_prediction_pipeline(df):
+def run_prediction_pipeline(df, cache=None, cache_key=None, num_threads=0, chunk_rows=SCORE_CHUNK_ROWS, processes=None,
+                            trend_dir=TREND_DIR):
     """
     df: DataFrame mit Features + Spalte 'ds'
     Erwartet:
         - ds (datetime)
         - alle Feature-Spalten aus rising_artist_features.json
-    """
-    prophet_model, lgbm_model, best_t, feature_cols = load_artefacts()
 
-    df = df.copy()
+    Mit cache (FeatureCache) und cache_key (Fingerprint der Eingabe, z.B. features_key)
+    werden die Vorhersagen pro Eingabe und Modellversion auf der Platte gecacht;
+    der DataFrame selbst wird dafür nicht gehasht.
+
+    LightGBM bewertet blockweise (siehe score_lgbm): num_threads, chunk_rows und
+    processes steuern Threads, Blockgröße und optionalen Prozess-Pool.
+    trend_dir ist der Ordner der Trend-Tabellen (Pipeline: <base_dir>/data/interim/prophet_trend).
+    """
+    if cache is not None and cache_key is not None:
+        key = fingerprint("predictions", cache_key, model_fingerprint())
+        cached = cache.get(key)
+        if cached is not None and len(cached) == len(df):
+            return cached["pred"].to_numpy(), cached["prob"].to_numpy()
+
+        preds, probs = run_prediction_pipeline(
+            df, num_threads=num_threads, chunk_rows=chunk_rows, processes=processes, trend_dir=trend_dir
+        )
+        cache.put(key, pd.DataFrame({"pred": preds, "prob": probs}))
+        return preds, probs
+
+    # Ein Bundle für den ganzen Lauf: ein Hot Swap währenddessen betrifft erst den nächsten Aufruf
+    bundle = model_registry().get()
+    prophet_model, lgbm_model, best_t, feature_cols = bundle.as_tuple()
 
     # Prophet: Trend extrahieren
     if "ds" not in df.columns:
@@ -68,19 +191,16 @@ def run_prediction_pipeline(df):
     if missing:
         raise ValueError(f"Fehlende Prophet‑Regressoren: {missing}.")
     
-    forecast = prophet_model.predict(df[["ds", "genre_idx_lagged", "seasonality_score"]])
-    df["prophet_trend"] = forecast["trend"].values
-
-    # LightGBM: Features vorbereiten
-    # Fehlende Spalten automatisch ergänzen
-    for col in feature_cols:
-        if col not in df.columns:
-            df[col] = 0
+    trend = prophet_trend(prophet_model, df, model_version=bundle.prophet_version, trend_dir=trend_dir)
 
-    X = df[feature_cols].fillna(0)
+    # LightGBM: Feature-Spalten ohne Kopie des Frames; fehlende Spalten = 0
+    columns = [
+        trend if col == "prophet_trend" else df[col] if col in df.columns else None
+        for col in feature_cols
+    ]
 
     # Vorhersage
-    probs = lgbm_model.predict(X)
+    probs = score_lgbm(lgbm_model, columns, len(df), chunk_rows, num_threads, processes)
     preds = (probs > best_t).astype(int)
 
     return preds, probs
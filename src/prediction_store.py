@@ -0,0 +1,270 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .feature_cache import fingerprint
+from .feature_store import features_key, load_features
+from .forecast import FORECAST_WEEKS, RECENT_WEEKS, forecast_frame, last_rows_per_track, score_forecast
+from .history_store import HistoryStore, atomic_write_json
+from .keys import key_vocab
+from .predict_pipeline import run_prediction_pipeline
+
+MANIFEST_NAME = "manifest.json"
+
+
+class PredictionStore:
+    """
+    Persistente Vorhersagen je Modellversion.
+
+    Aufbau:
+        <root>/<version>/manifest.json
+        <root>/<version>/history/YYYY-MM-DD.parquet    Scores einer chart_week (is_future=False)
+        <root>/<version>/forecast/YYYY-MM-DD.parquet   Forecast ab dieser chart_week (is_future=True)
+
+    Schlüssel ist (chart_week, track_id); gejoint wird beim Laden über track_key
+    (siehe keys.py). Eine historische Woche wird nur neu bewertet,
+    wenn sie fehlt oder sich ihre Partition im HistoryStore geändert hat. Historische
+    Scores sind Momentaufnahmen zum Zeitpunkt der Bewertung.
+    """
+
+    def __init__(self, root, model_version):
+        self.model_version = model_version
+        self.root = Path(root) / model_version[:16]
+        self.history_dir = self.root / "history"
+        self.forecast_dir = self.root / "forecast"
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        self.forecast_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    # ____ MANIFEST ____
+    def _load_manifest(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {"model_version": self.model_version, "history": {}, "forecast": {}}
+
+    def _save_manifest(self):
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    @staticmethod
+    def _write_parquet(df, path):
+        tmp = path.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    # ____ HISTORIE ____
+    def missing_weeks(self, history: HistoryStore):
+        """Wochen der Historie ohne (aktuelle) Scores."""
+        return [
+            w for w in history.weeks()
+            if self.manifest["history"].get(w, {}).get("source_sha256") != history.manifest["weeks"][w]["sha256"]
+        ]
+
+    def write_history(self, df_week, week, source_sha256=None):
+        week = pd.Timestamp(week).strftime("%Y-%m-%d")
+        path = self.history_dir / f"{week}.parquet"
+        self._write_parquet(df_week, path)
+        self.manifest["history"][week] = {
+            "file": path.name,
+            "rows": len(df_week),
+            "source_sha256": source_sha256,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save_manifest()
+
+    def read_history(self, weeks=None):
+        selected = sorted(self.manifest["history"]) if weeks is None else weeks
+        frames = [pd.read_parquet(self.history_dir / self.manifest["history"][w]["file"]) for w in selected]
+        if not frames:
+            return pd.DataFrame(columns=["chart_week", "track_id", "is_rising", "probability", "is_future"])
+        return pd.concat(frames, ignore_index=True)
+
+    # ____ FORECAST ____
+    def write_forecast(self, df_forecast, origin, key, info=None):
+        """Speichert den Forecast ab origin; ältere Forecasts derselben Woche werden ersetzt."""
+        origin = pd.Timestamp(origin).strftime("%Y-%m-%d")
+        path = self.forecast_dir / f"{origin}.parquet"
+        self._write_parquet(df_forecast, path)
+        self.manifest["forecast"][origin] = {
+            "file": path.name,
+            "rows": len(df_forecast),
+            "key": key,
+            "info": info or {},
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save_manifest()
+
+    def latest_forecast(self):
+        """Neuester gespeicherter Forecast (origin, Eintrag) oder (None, None)."""
+        if not self.manifest["forecast"]:
+            return None, None
+        origin = max(self.manifest["forecast"])
+        return origin, self.manifest["forecast"][origin]
+
+    def read_forecast(self, origin, key):
+        """Gespeicherter Forecast ab origin, falls er zum Schlüssel passt, sonst None."""
+        entry = self.manifest["forecast"].get(pd.Timestamp(origin).strftime("%Y-%m-%d"))
+        if entry is None or entry["key"] != key:
+            return None, None
+        return pd.read_parquet(self.forecast_dir / entry["file"]), entry["info"]
+
+
+# ____ SCORING MIT STORE ____
+
+def score_history(df_features, history: HistoryStore, store: PredictionStore, **scoring):
+    """
+    Ergänzt df_features um is_rising / probability. Bewertet werden nur Wochen,
+    die im PredictionStore fehlen oder sich geändert haben; alle anderen kommen aus dem Store.
+    """
+    missing = store.missing_weeks(history)
+    if missing:
+        weeks = pd.to_datetime(missing)
+        df_new = df_features[df_features["chart_week"].isin(weeks)]
+        preds, probs = run_prediction_pipeline(df_new, **scoring)
+
+        scored = pd.DataFrame({
+            "chart_week": df_new["chart_week"].to_numpy(),
+            "track_id": df_new["track_id"].astype("string").to_numpy(),
+            "is_rising": preds,
+            "probability": probs,
+            "is_future": False,
+        })
+        for week, df_week in scored.groupby("chart_week", sort=True):
+            week = week.strftime("%Y-%m-%d")
+            store.write_history(df_week, week, history.manifest["weeks"][week]["sha256"])
+        print(f"Vorhersagen berechnet: {len(df_new)} Zeilen in {len(missing)} Wochen.")
+
+    return attach_scores(df_features, store.read_history())
+
+
+def attach_scores(df_features, stored):
+    """Gespeicherte Scores (chart_week, track_id) über track_key an die Features joinen."""
+    stored = stored.copy()
+    stored["track_key"] = key_vocab("track").encode(stored["track_id"])
+    stored["chart_week"] = stored["chart_week"].astype(df_features["chart_week"].dtype)
+
+    df = df_features.drop(columns=["is_rising", "probability", "is_future"], errors="ignore")
+    return df.merge(
+        stored[["chart_week", "track_key", "is_rising", "probability"]],
+        on=["chart_week", "track_key"],
+        how="left"
+    )
+
+
+def forecast_key(features_key, weeks=FORECAST_WEEKS, recent_weeks=RECENT_WEEKS, streams_quantile=None,
+                 growing_artists=False):
+    """Schlüssel eines gespeicherten Forecasts: Datenstand der Features + Forecast-Einstellungen."""
+    return fingerprint("forecast", features_key, weeks, recent_weeks, streams_quantile, growing_artists)
+
+
+def forecast_with_store(df_features, store: PredictionStore, features_key, weeks=FORECAST_WEEKS,
+                        recent_weeks=RECENT_WEEKS, streams_quantile=None, growing_artists=False, **scoring):
+    """
+    Forecast ab der letzten historischen Woche aus dem PredictionStore; berechnet
+    (score_forecast) und gespeichert wird nur, wenn für diesen Datenstand und diese
+    Einstellungen noch keiner vorliegt (oder er nicht mehr zu den Features passt).
+    Liefert dasselbe dict wie score_forecast.
+    """
+    origin = df_features["chart_week"].max()
+    key = forecast_key(features_key, weeks, recent_weeks, streams_quantile, growing_artists)
+
+    stored, info = store.read_forecast(origin, key)
+    forecast = forecast_from_stored(df_features, stored, info) if stored is not None else None
+    if forecast is None:
+        result = score_forecast(
+            df_features, weeks=weeks, recent_weeks=recent_weeks,
+            streams_quantile=streams_quantile, growing_artists=growing_artists, **scoring
+        )
+        n_tracks, n_weeks = result["probs"].shape
+        df_forecast = pd.DataFrame({
+            "chart_week": np.tile(result["dates"].to_numpy(), n_tracks),
+            "track_id": np.repeat(result["tracks"]["track_id"].astype("string").to_numpy(), n_weeks),
+            "is_rising": result["preds"].ravel(),
+            "probability": result["probs"].ravel(),
+            "is_future": True,
+        })
+        store.write_forecast(df_forecast, origin, key, {"n_total": result["n_total"], "n_pruned": result["n_pruned"]})
+        return result
+
+    return forecast
+
+
+def forecast_from_stored(df_features, stored, info):
+    """
+    Gespeicherten Forecast wieder ins Track × Woche-Layout bringen (wie score_forecast).
+    None, wenn ein Track des Forecasts in df_features fehlt (der Forecast gehört dann
+    nicht zu diesem Stand der Features).
+    """
+    dates = pd.DatetimeIndex(stored["chart_week"].drop_duplicates())
+    n_weeks = len(dates)
+    track_keys = key_vocab("track").encode(stored["track_id"].iloc[::n_weeks] if n_weeks else [])
+
+    all_tracks = last_rows_per_track(df_features)
+    positions = pd.Index(all_tracks["track_key"]).get_indexer(track_keys)
+    if (positions < 0).any():
+        return None
+    return {
+        "tracks": all_tracks.iloc[positions],
+        "dates": dates,
+        "probs": stored["probability"].to_numpy().reshape(len(track_keys), n_weeks),
+        "preds": stored["is_rising"].to_numpy().reshape(len(track_keys), n_weeks),
+        "n_total": info["n_total"],
+        "n_pruned": info["n_pruned"],
+    }
+
+
+def load_radar_data(history: HistoryStore, feature_store, prediction_store: PredictionStore, feature_cache=None,
+                    weeks=FORECAST_WEEKS, recent_weeks=RECENT_WEEKS):
+    """
+    Kompletter Datenstand des Radars (Historie + Forecast) aus den Stores.
+    Für bereits verarbeitete Wochen wird nichts neu berechnet.
+
+    Returns:
+        (df_all mit is_future-Flag, Forecast-dict)
+    """
+    df_features = load_features(history, feature_store, feature_cache)
+    df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce")
+
+    df_features = score_history(df_features, history, prediction_store)
+    forecast = forecast_with_store(
+        df_features, prediction_store, features_key(history), weeks=weeks, recent_weeks=recent_weeks
+    )
+
+    df_features["is_future"] = False
+    df_all = pd.concat([df_features, forecast_frame(forecast)], ignore_index=True)
+    return df_all, forecast
+
+
+def read_radar_data(history: HistoryStore, feature_store, prediction_store: PredictionStore,
+                    weeks=FORECAST_WEEKS, recent_weeks=RECENT_WEEKS):
+    """
+    Nur lesender Datenstand des Radars: Features, Scores und Forecast so, wie sie
+    zuletzt gespeichert wurden (vom Job-Worker bzw. der CLI). Anders als load_radar_data
+    wird nichts aktualisiert oder neu bewertet; sicher, während ein Job in dieselben
+    Stores schreibt. Der Forecast wird wie in forecast_with_store nur übernommen, wenn
+    sein Schlüssel zum Stand der Historie und zu weeks / recent_weeks passt.
+
+    Returns:
+        (df_all mit is_future-Flag, Forecast-dict oder None) bzw. (None, None) ohne Scores
+    """
+    df_features = feature_store.read()
+    stored = prediction_store.read_history()
+    if df_features.empty or stored.empty:
+        return None, None
+
+    df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce")
+    df_features = attach_scores(df_features, stored)
+    df_features["is_future"] = False
+
+    # Forecast nur, wenn er zum gelesenen Stand der Features gehört
+    key = forecast_key(features_key(history), weeks, recent_weeks)
+    stored, info = prediction_store.read_forecast(df_features["chart_week"].max(), key)
+    forecast = forecast_from_stored(df_features, stored, info) if stored is not None else None
+    if forecast is None:
+        return df_features, None
+    return pd.concat([df_features, forecast_frame(forecast)], ignore_index=True), forecast
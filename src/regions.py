@@ -0,0 +1,50 @@
+import re
+from pathlib import Path
+
+# Bestehende Daten (eine globale Chart) gelten als Region "global"
+DEFAULT_REGION = "global"
+
+REGION_PATTERN = re.compile(r"regional-([a-z]+)-weekly")
+
+
+def extract_region_from_filename(filename: str) -> str:
+    """
+    Extrahiert die Region aus einem Dateinamen wie:
+    regional-de-weekly-2026-01-08.csv → "de" (ohne Treffer: "global")
+    """
+    match = REGION_PATTERN.search(Path(filename).name)
+    return match.group(1) if match else DEFAULT_REGION
+
+
+def week_tag(region, date_str):
+    """
+    Namensteil für Wochen-Dateien: "2026-01-08" für global (wie bisher),
+    "de_2026-01-08" für andere Regionen.
+    """
+    return date_str if region == DEFAULT_REGION else f"{region}_{date_str}"
+
+
+def region_dirs(processed_dir, region=DEFAULT_REGION):
+    """
+    Stores einer Region. global bleibt unter <processed>/history usw.,
+    alle anderen liegen unter <processed>/regions/<region>/.
+    """
+    processed_dir = Path(processed_dir)
+    root = processed_dir if region == DEFAULT_REGION else processed_dir / "regions" / region
+    return {
+        "history": root / "history",
+        "features": root / "features",
+        "predictions": root / "predictions",
+    }
+
+
+def list_regions(processed_dir):
+    """Alle Regionen mit Historie (global zuerst)."""
+    processed_dir = Path(processed_dir)
+    regions = []
+    if (processed_dir / "history" / "manifest.json").exists():
+        regions.append(DEFAULT_REGION)
+    regions += sorted(
+        p.parent.parent.name for p in (processed_dir / "regions").glob("*/history/manifest.json")
+    )
+    return regions
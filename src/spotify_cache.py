@@ -0,0 +1,256 @@
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / "data" / "interim" / "spotify_cache.sqlite"
+
+DAY = 24 * 60 * 60
+
+# TTL pro Feldgruppe (Sekunden): Popularity und Follower veralten schneller
+# als Genres, Release-Daten oder das ID-Mapping.
+DEFAULT_TTLS = {
+    "id_map": 365 * DAY,
+    "track_static": 180 * DAY,     # name, artist_id, release_date, explicit
+    "track_popularity": 6 * DAY,   # track_popularity
+    "artist_genres": 90 * DAY,     # artist_genres
+    "artist_stats": 6 * DAY,       # artist_followers, artist_popularity
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS id_map (
+    track_name TEXT NOT NULL,
+    artist_names TEXT NOT NULL,
+    track_id TEXT,
+    artist_id TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (track_name, artist_names)
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    track_id TEXT PRIMARY KEY,
+    track_name TEXT,
+    artist_id TEXT,
+    release_date TEXT,
+    explicit INTEGER,
+    static_at REAL,
+    track_popularity INTEGER,
+    popularity_at REAL
+);
+CREATE TABLE IF NOT EXISTS artists (
+    artist_id TEXT PRIMARY KEY,
+    artist_genres TEXT,
+    genres_at REAL,
+    artist_followers INTEGER,
+    artist_popularity INTEGER,
+    stats_at REAL
+);
+"""
+
+
+class SpotifyCache:
+    """
+    Persistenter Cache (SQLite) für Spotify-ID-Mappings und Track-/Artist-Metadaten.
+    Jede Feldgruppe hat einen eigenen Zeitstempel und eine eigene TTL, sodass die
+    Pipeline nur Cache-Misses und abgelaufene Einträge bei der API anfragt.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _is_fresh(self, ts, group, now):
+        return ts is not None and now - ts <= self.ttls[group]
+
+    def _query_in(self, sql, keys):
+        """Führt ein SELECT ... IN (...) in Blöcken aus (SQLite-Parameterlimit)."""
+        keys = list(keys)
+        rows = []
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows += self._conn.execute(sql.format(placeholders), chunk).fetchall()
+        return rows
+
+    # ____ ID-MAPPING (track_name, artist_names) → IDs ____
+    def get_ids(self, pairs, now=None):
+        """Liefert {(track_name, artist_names): (track_id, artist_id)} für frische Einträge."""
+        now = now or time.time()
+        result = {}
+        with self._lock:
+            for track_name, artist_names in set(pairs):
+                row = self._conn.execute(
+                    "SELECT track_id, artist_id, updated_at FROM id_map "
+                    "WHERE track_name = ? AND artist_names = ?",
+                    (track_name, artist_names)
+                ).fetchone()
+                if row and self._is_fresh(row[2], "id_map", now):
+                    result[(track_name, artist_names)] = (row[0], row[1])
+        return result
+
+    def put_ids(self, rows, now=None):
+        """rows: Iterable aus (track_name, artist_names, track_id, artist_id)."""
+        now = now or time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO id_map VALUES (?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows]
+            )
+            self._conn.commit()
+
+    # ____ TRACKS ____
+    def get_tracks(self, track_ids, require_popularity=True, now=None):
+        """
+        Liefert {track_id: record} für Tracks, deren Feldgruppen noch gültig sind.
+        Mit require_popularity=False reicht ein gültiger statischer Teil (z.B. für artist_id).
+        """
+        now = now or time.time()
+        rows = self._query_in(
+            "SELECT track_id, track_name, artist_id, release_date, explicit, static_at, "
+            "track_popularity, popularity_at FROM tracks WHERE track_id IN ({})",
+            track_ids
+        )
+        result = {}
+        for (track_id, name, artist_id, release_date, explicit, static_at,
+             popularity, popularity_at) in rows:
+            if not self._is_fresh(static_at, "track_static", now):
+                continue
+            if require_popularity and not self._is_fresh(popularity_at, "track_popularity", now):
+                continue
+            result[track_id] = {
+                "track_id": track_id,
+                "track_name": name,
+                "artist_id": artist_id,
+                "release_date": release_date,
+                "explicit": bool(explicit),
+                "track_popularity": popularity,
+            }
+        return result
+
+    def put_tracks(self, tracks, now=None):
+        """tracks: Track-Objekte aus /v1/tracks (Rohformat der API)."""
+        now = now or time.time()
+        rows = []
+        for track in tracks:
+            if not track or "id" not in track:
+                continue
+            album_info = track.get("album", {})
+            rows.append((
+                track["id"],
+                track.get("name"),
+                track["artists"][0]["id"] if track.get("artists") else None,
+                album_info.get("release_date", track.get("release_date", "1900-01-01")),
+                int(bool(track.get("explicit", False))),
+                now,
+                track.get("popularity", 0),
+                now,
+            ))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    # ____ ARTISTS ____
+    def get_artists(self, artist_ids, now=None):
+        """Liefert {artist_id: record} für Artists, deren Genres und Stats noch gültig sind."""
+        now = now or time.time()
+        rows = self._query_in(
+            "SELECT artist_id, artist_genres, genres_at, artist_followers, artist_popularity, "
+            "stats_at FROM artists WHERE artist_id IN ({})",
+            artist_ids
+        )
+        result = {}
+        for artist_id, genres, genres_at, followers, popularity, stats_at in rows:
+            if not (self._is_fresh(genres_at, "artist_genres", now)
+                    and self._is_fresh(stats_at, "artist_stats", now)):
+                continue
+            result[artist_id] = {
+                "artist_genres": genres or "",
+                "artist_followers": followers,
+                "artist_popularity": popularity,
+            }
+        return result
+
+    def put_artists(self, artists, now=None):
+        """artists: Artist-Objekte aus /v1/artists (Rohformat der API)."""
+        now = now or time.time()
+        rows = [
+            (
+                a["id"],
+                "|".join(a.get("genres", [])),
+                now,
+                a.get("followers", {}).get("total", 0),
+                a.get("popularity", 0),
+                now,
+            )
+            for a in artists if a and "id" in a
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO artists VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    # ____ IMPORT BESTEHENDER WOCHEN-DATEIEN ____
+    def import_csvs(self, interim_dir):
+        """
+        Befüllt den Cache aus vorhandenen unique_tracks_with_ids_*.csv und enriched_data_*.csv.
+        Als Zeitstempel dient das Datum im Dateinamen, damit die TTLs greifen.
+        """
+        interim_dir = Path(interim_dir)
+        files = sorted(interim_dir.glob("unique_tracks_with_ids_*.csv")) + \
+            sorted(interim_dir.glob("enriched_data_*.csv"))
+
+        for path in files:
+            match = re.search(r"\d{4}-\d{2}-\d{2}", path.name)
+            if not match:
+                continue
+            ts = datetime.strptime(match.group(0), "%Y-%m-%d").timestamp()
+            df = pd.read_csv(path)
+
+            if path.name.startswith("unique_tracks_with_ids"):
+                df = df.dropna(subset=["track_id"])[["track_name", "artist_names", "track_id", "artist_id"]]
+                self.put_ids(
+                    df.astype(object).where(df.notna(), None).itertuples(index=False, name=None),
+                    now=ts
+                )
+                continue
+
+            tracks = [
+                {
+                    "id": r.track_id,
+                    "name": r.track_name,
+                    "artists": [{"id": r.artist_id}] if pd.notna(r.artist_id) else [],
+                    "album": {"release_date": r.release_date},
+                    "explicit": bool(r.explicit),
+                    "popularity": int(r.track_popularity),
+                }
+                for r in df.itertuples(index=False)
+            ]
+            self.put_tracks(tracks, now=ts)
+
+            # Artists nur übernehmen, wenn Genres tatsächlich vorhanden sind
+            df_art = df.dropna(subset=["artist_id", "artist_genres"]).drop_duplicates("artist_id")
+            self.put_artists(
+                [
+                    {
+                        "id": r.artist_id,
+                        "genres": str(r.artist_genres).split("|"),
+                        "followers": {"total": int(r.artist_followers)},
+                        "popularity": int(r.artist_popularity),
+                    }
+                    for r in df_art.itertuples(index=False)
+                ],
+                now=ts
+            )
+            print(f"Cache befüllt aus: {path.name}")
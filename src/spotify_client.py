@@ -1,10 +1,13 @@
 import os
+import json
+import threading
 import time
 import pandas as pd
-from tqdm import tqdm
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .spotify_cache import SpotifyCache
+from .spotify_http import SpotifyHttp
 from .spotify_utils import (
     refresh_access_token,
     get_spotify_ids,
@@ -19,27 +22,49 @@ class SpotifyClient:
     Spotify-Client:
     1. Access Token holen
     2. unique_tracks_to_enrich_YYYY-MM-DD.csv laden
-    3. Spotify IDs suchen (track_id + artist_id)
+    3. Spotify IDs ermitteln (track_id aus der URI, artist_id aus /v1/tracks,
+       Suche nur als Fallback)
     4. Ergebnis speichern
-    5. Enrichment durchführen (Genres, Popularity, Release Dates, etc.)
+    5. Enrichment durchführen (Genres, Popularity, Release Dates, etc.),
+       bekannte Tracks/Artists kommen aus dem SQLite-Cache (spotify_cache.py)
     6. enriched_data_YYYY-MM-DD.csv speichern
+
+    Jeder Client hat seinen eigenen SpotifyHttp (ohne http wird einer erzeugt), weil
+    der Token-Refresh bei HTTP 401 am HTTP-Client hängt. Ein übergebener http darf
+    deshalb nicht schon zu einem anderen Client gehören.
     """
 
-    def __init__(self):
-        self.client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        self.client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        self.refresh_token = os.getenv("SPOTIFY_REFRESH_TOKEN")
+    def __init__(self, http=None, cache=None, use_cache=True,
+                 client_id=None, client_secret=None, refresh_token=None):
+        self.http = http or SpotifyHttp()
+        if self.http.token_refresher is not None:
+            raise ValueError("Dieser SpotifyHttp gehört bereits zu einem anderen SpotifyClient.")
+        # Ohne persistenten Cache läuft alles über eine In-Memory-Datenbank
+        self.cache = (cache or SpotifyCache()) if use_cache else SpotifyCache(":memory:")
+        # Zugangsdaten explizit (z.B. Fake-Server) oder aus der .env
+        self.client_id = client_id or os.getenv("SPOTIFY_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("SPOTIFY_CLIENT_SECRET")
+        self.refresh_token = refresh_token or os.getenv("SPOTIFY_REFRESH_TOKEN")
         self.access_token = None
 
+        # API-Calls pro Stage (map_ids, tracks, artists) des letzten Laufs
+        self.api_calls = {}
+
+        self._auth_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+
         self._validate_env()
         self.authenticate()
+        self.http.token_refresher = self._refresh_expired_token
 
     # ____ AUTHENTIFIZIERUNG ____
     def _validate_env(self):
-        missing = [
-            key for key in ["SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "SPOTIFY_REFRESH_TOKEN"]
-            if os.getenv(key) is None
-        ]
+        credentials = {
+            "SPOTIFY_CLIENT_ID": self.client_id,
+            "SPOTIFY_CLIENT_SECRET": self.client_secret,
+            "SPOTIFY_REFRESH_TOKEN": self.refresh_token,
+        }
+        missing = [key for key, value in credentials.items() if value is None]
         if missing:
             raise ValueError(f"Fehlende Umgebungsvariablen: {missing}")
 
@@ -48,7 +73,8 @@ class SpotifyClient:
         self.access_token = refresh_access_token(
             self.refresh_token,
             self.client_id,
-            self.client_secret
+            self.client_secret,
+            http=self.http
         )
 
         if not self.access_token:
@@ -56,84 +82,226 @@ class SpotifyClient:
 
         print("Spotify-Authentifizierung erfolgreich.")
 
+    def _refresh_expired_token(self, expired_token):
+        """Wird vom HTTP-Client bei 401 aufgerufen; erneuert den Token nur einmal pro Ablauf."""
+        with self._auth_lock:
+            if self.access_token == expired_token:
+                try:
+                    self.authenticate()
+                except RuntimeError:
+                    return None
+            return self.access_token
+
     # ____ ID-MAPPING ____
-    def map_spotify_ids(self, input_csv, output_csv):
+    def map_spotify_ids(self, input_csv, output_csv, mode="uri", batch_size=50):
         """
-        Lädt unique_tracks_to_enrich_YYYY-MM-DD.csv, sucht Spotify IDs und speichert sie.
+        Lädt unique_tracks_to_enrich_YYYY-MM-DD.csv, ermittelt Spotify IDs und speichert sie.
+
+        mode="uri":    track_id kommt direkt aus der Chart-Spalte 'uri', die artist_id
+                       aus dem gebatchten /v1/tracks-Response (track["artists"][0]).
+                       Nur Zeilen ohne URI werden per Suche nachgeschlagen.
+        mode="search": Alle Zeilen per /v1/search suchen (bisheriges Verhalten).
+
+        Bereits bekannte IDs kommen aus dem Cache, die API wird nur für Misses gefragt.
         """
+        if mode not in ("uri", "search"):
+            raise ValueError(f"Unbekannter Modus für das ID-Mapping: {mode}")
+
         print(f"Lade Datei: {input_csv}")
         df = pd.read_csv(input_csv)
+        calls_before = self.http.calls
 
-        tqdm.pandas()
-        print("Starte Suche nach Spotify IDs...")
+        if "track_id" not in df.columns or mode == "search":
+            df["track_id"] = None
+        df["artist_id"] = None
 
-        ids = df.progress_apply(
-            lambda row: get_spotify_ids(
-                row["track_name"],
-                row["artist_names"],
-                self.access_token
-            ), axis=1
-        )
-        df[["track_id","artist_id"]] = pd.DataFrame(ids.tolist(), index=df.index)
+        # ____ Track-IDs aus der URI: Artist-IDs aus Cache bzw. gebatcht nachladen ____
+        has_uri = df["track_id"].notna()
+        uri_ids = df.loc[has_uri, "track_id"].drop_duplicates().tolist()
+
+        if uri_ids:
+            cached = self.cache.get_tracks(uri_ids, require_popularity=False)
+            artist_by_track = {tid: t["artist_id"] for tid, t in cached.items()}
+            to_fetch = [tid for tid in uri_ids if tid not in cached]
+
+            print(f"Artist-IDs: {len(cached)} aus dem Cache, {len(to_fetch)} per API...")
+            batches = [to_fetch[i:i + batch_size] for i in range(0, len(to_fetch), batch_size)]
+            results = self.http.map(
+                lambda ids: get_tracks_batch(ids, self.access_token, http=self.http),
+                batches
+            )
+            for tracks_res in results:
+                self.cache.put_tracks(tracks_res)
+                for track in tracks_res:
+                    if track and track.get("artists"):
+                        artist_by_track[track["id"]] = track["artists"][0]["id"]
+
+            df.loc[has_uri, "artist_id"] = df.loc[has_uri, "track_id"].map(artist_by_track)
+
+        # ____ Fallback: Suche für Zeilen ohne URI ____
+        missing = df["track_id"].isna()
+
+        if missing.any():
+            pairs = list(df.loc[missing, ["track_name", "artist_names"]].itertuples(index=False, name=None))
+            found = self.cache.get_ids(pairs)
+            to_search = list(dict.fromkeys(p for p in pairs if p not in found))
+
+            print(f"Suche Spotify IDs: {len(pairs) - len(to_search)} aus dem Cache, {len(to_search)} per API...")
+            ids = self.http.map(
+                lambda pair: get_spotify_ids(
+                    pair[0],
+                    pair[1],
+                    self.access_token,
+                    http=self.http
+                ),
+                to_search
+            )
+            searched = [(*pair, *res) for pair, res in zip(to_search, ids) if res[0] is not None]
+            self.cache.put_ids(searched)
+            found.update({(name, artists): (tid, aid) for name, artists, tid, aid in searched})
+
+            df.loc[missing, ["track_id", "artist_id"]] = pd.DataFrame(
+                [found.get(pair, (None, None)) for pair in pairs],
+                index=df.index[missing],
+                columns=["track_id", "artist_id"]
+            )
+
+        self.api_calls["map_ids"] = self.http.calls - calls_before
 
         df.to_csv(output_csv, index=False)
         print(f"Mapping fertig! {df['track_id'].notna().sum()} IDs gefunden.")
         return df
 
+    # ____ CHECKPOINTS ____
+    def _write_checkpoint(self, checkpoint_path, phase, items):
+        """Hängt einen fertigen Batch dauerhaft an die Checkpoint-Datei (JSONL) an."""
+        line = json.dumps({"phase": phase, "ts": time.time(), "items": items})
+        with self._checkpoint_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _replay_checkpoint(self, checkpoint_path):
+        """Spielt bereits fertige Batches eines abgebrochenen Laufs in den Cache ein."""
+        if not checkpoint_path.exists():
+            return 0
+
+        n_batches = 0
+        with open(checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Unvollständige letzte Zeile (Abbruch beim Schreiben) ignorieren
+                    continue
+                if entry["phase"] == "tracks":
+                    self.cache.put_tracks(entry["items"], now=entry["ts"])
+                else:
+                    self.cache.put_artists(entry["items"], now=entry["ts"])
+                n_batches += 1
+
+        print(f"Checkpoint gefunden: {n_batches} fertige Batches werden übernommen.")
+        return n_batches
+
     # ____ ENRICHMENT ____
-    def enrich_tracks(self, input_csv, output_csv, batch_size=50, sleep_time=1):
+    def enrich_tracks(self, input_csv, output_csv, batch_size=50):
         """
-        Lädt unique_tracks_with_ids.csv, erzeugt enriched_data.csv.
+        Lädt unique_tracks_with_ids.csv, erzeugt enriched_data.csv in zwei Phasen:
+        1. Tracks: alle fehlenden/abgelaufenen Tracks der Woche über /v1/tracks holen
+        2. Artists: die Haupt-Artists (track["artists"][0]) der gesamten Woche sammeln
+           und jeden genau einmal in vollen 50er-Batches über /v1/artists holen
+        Frische Cache-Einträge werden nicht erneut angefragt. Die Batches laufen
+        parallel, das Tempo bestimmt der Rate-Limiter des HTTP-Clients.
+
+        Jeder fertige Batch wird sofort in <output_csv>.checkpoint.jsonl geschrieben.
+        Bricht der Lauf ab (Netzwerk, Token), setzt ein erneuter Aufruf nach dem
+        letzten fertigen Batch fort. Nach Erfolg wird der Checkpoint gelöscht.
         """
+        output_csv = Path(output_csv)
+        checkpoint_path = output_csv.with_suffix(".checkpoint.jsonl")
+
         print(f"Lade Datei: {input_csv}")
-        df_ids = pd.read_csv(input_csv).dropna(subset=["track_id","artist_id"])
+        df_ids = pd.read_csv(input_csv).dropna(subset=["track_id"])
+        track_ids = df_ids["track_id"].drop_duplicates().tolist()
 
-        print(f"Starte Enrichment für {len(df_ids)} Tracks...")
-        all_enriched_data = []
+        print(f"Starte Enrichment für {len(track_ids)} Tracks...")
+        self._replay_checkpoint(checkpoint_path)
 
-        for i in tqdm(range(0, len(df_ids), batch_size)):
-            batch = df_ids.iloc[i:i + batch_size] 
-            
-            t_batch = batch["track_id"].tolist() 
-            a_batch = batch["artist_id"].unique().tolist()
-            
-            tracks_res = get_tracks_batch(t_batch, self.access_token)
-            artists_res = get_artists_batch(a_batch, self.access_token)
+        def fetch_tracks(ids):
+            tracks_res = get_tracks_batch(ids, self.access_token, http=self.http)
+            if tracks_res:
+                self._write_checkpoint(checkpoint_path, "tracks", tracks_res)
+                self.cache.put_tracks(tracks_res)
+            return bool(tracks_res)
 
-            artist_map = {a["id"]: a for a in artists_res if a}
+        def fetch_artists(ids):
+            artists_res = get_artists_batch(ids, self.access_token, http=self.http)
+            if artists_res:
+                self._write_checkpoint(checkpoint_path, "artists", artists_res)
+                self.cache.put_artists(artists_res)
+            return bool(artists_res)
 
-            for track in tracks_res:
-                if not track or "id" not in track:
-                    continue
+        # ____ Phase 1: Tracks ____
+        calls_before = self.http.calls
+        fresh_tracks = self.cache.get_tracks(track_ids)
+        t_todo = [t for t in track_ids if t not in fresh_tracks]
+        print(f"Tracks: {len(fresh_tracks)} aus dem Cache, {len(t_todo)} per API...")
+
+        batches = [t_todo[i:i + batch_size] for i in range(0, len(t_todo), batch_size)]
+        failed = self.http.map(fetch_tracks, batches).count(False)
+        self.api_calls["tracks"] = self.http.calls - calls_before
+
+        # ____ Phase 2: Haupt-Artists der gesamten Woche, dedupliziert ____
+        calls_before = self.http.calls
+        tracks = self.cache.get_tracks(track_ids)
+        artist_ids = list(dict.fromkeys(t["artist_id"] for t in tracks.values() if t["artist_id"]))
+        fresh_artists = self.cache.get_artists(artist_ids)
+        a_todo = [a for a in artist_ids if a not in fresh_artists]
+        print(f"Artists: {len(artist_ids)} eindeutig, {len(fresh_artists)} aus dem Cache, {len(a_todo)} per API...")
 
-                main_artist_id = track["artists"][0]["id"] if track.get("artists") else None 
-                artist_info = artist_map.get(main_artist_id, {}) 
-                
-                album_info = track.get("album", {}) 
-                release_date = album_info.get( 
-                    "release_date", 
-                    track.get("release_date", "1900-01-01") 
-                )
-
-                all_enriched_data.append({ 
-                    "track_id": track.get("id"), 
-                    "track_name": track.get("name"), 
-                    "artist_id": main_artist_id, 
-                    "release_date": release_date, 
-                    "explicit": track.get("explicit", False), 
-                    "track_popularity": track.get("popularity", 0), 
-                    "artist_genres": "|".join(artist_info.get("genres", [])), 
-                    "artist_followers": artist_info.get("followers", {}).get("total", 0), 
-                    "artist_popularity": artist_info.get("popularity", 0) 
-                })
-
-            time.sleep(sleep_time)
-
-        df_final = pd.DataFrame(all_enriched_data)
+        batches = [a_todo[i:i + batch_size] for i in range(0, len(a_todo), batch_size)]
+        failed += self.http.map(fetch_artists, batches).count(False)
+        self.api_calls["artists"] = self.http.calls - calls_before
+
+        if failed:
+            raise RuntimeError(
+                f"Enrichment unvollständig: {failed} Batches fehlgeschlagen. "
+                f"Erneuter Start setzt ab Checkpoint fort ({checkpoint_path})."
+            )
+
+        df_final = self._build_enriched(track_ids)
         df_final.to_csv(output_csv, index=False)
+        checkpoint_path.unlink(missing_ok=True)
 
         print(f"Fertig! {len(df_final)} Tracks angereichert.")
         return df_final
+
+    def _build_enriched(self, track_ids):
+        """Setzt die Enrichment-Tabelle aus den (frischen) Cache-Einträgen zusammen."""
+        tracks = self.cache.get_tracks(track_ids)
+        artists = self.cache.get_artists({t["artist_id"] for t in tracks.values() if t["artist_id"]})
+
+        all_enriched_data = []
+        for track_id in track_ids:
+            track = tracks.get(track_id)
+            if track is None:
+                continue
+            artist_info = artists.get(track["artist_id"], {})
+
+            all_enriched_data.append({ 
+                "track_id": track_id, 
+                "track_name": track["track_name"], 
+                "artist_id": track["artist_id"], 
+                "release_date": track["release_date"], 
+                "explicit": track["explicit"], 
+                "track_popularity": track["track_popularity"], 
+                "artist_genres": artist_info.get("artist_genres", ""), 
+                "artist_followers": artist_info.get("artist_followers", 0), 
+                "artist_popularity": artist_info.get("artist_popularity", 0) 
+            })
+
+        return pd.DataFrame(all_enriched_data)
     
     # ____ KOMPLETTER WORKFLOW ____
     def run_full_pipeline(
@@ -154,7 +322,8 @@ class SpotifyClient:
         
         df_ids = self.map_spotify_ids(unique_tracks_csv, mapped_csv) 
         df_enriched = self.enrich_tracks(mapped_csv, enriched_csv) 
-        
+
+        print(f"API-Calls pro Stage: {self.api_calls}")
         return df_enriched
             
 
@@ -0,0 +1,318 @@
+"""
+Offline-Stand-in für die Spotify Web API (Tests, Benchmarks, CI ohne Netzwerk).
+
+- FakeSpotifyAdapter: beantwortet /api/token, /v1/search, /v1/tracks und /v1/artists
+  aus einem lokalen Korpus, mit konfigurierbarer Latenz, 429-Injektion und Token-Ablauf
+- RecordReplayAdapter: zeichnet echte API-Antworten in eine JSONL-Kassette auf
+  bzw. spielt sie ohne Netzwerk wieder ab
+- benchmark_enrichment(): misst map_spotify_ids + enrich_tracks gegen den Fake
+
+Aufruf: python -m src.spotify_fake --workers 1 4 8 --latency 0.05
+"""
+import argparse
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from .spotify_http import SpotifyHttp
+
+INTERIM_DIR = Path(__file__).resolve().parents[1] / "data" / "interim"
+
+SPOTIFY_HOSTS = ("https://accounts.spotify.com", "https://api.spotify.com")
+
+
+def _make_response(request, status, payload=None, headers=None):
+    """Baut eine requests.Response ohne Netzwerk."""
+    res = requests.Response()
+    res.status_code = status
+    res._content = json.dumps(payload if payload is not None else {}).encode()
+    res.headers.update({"Content-Type": "application/json", **(headers or {})})
+    res.url = request.url
+    res.request = request
+    res.encoding = "utf-8"
+    return res
+
+
+# ____ KORPUS ____
+
+class FakeSpotifyCorpus:
+    """Track- und Artist-Objekte im Format der Web API, indiziert nach ID und Namen."""
+
+    def __init__(self, tracks, artists, names):
+        self.tracks = tracks      # {track_id: track-Objekt}
+        self.artists = artists    # {artist_id: artist-Objekt}
+        self.names = names        # {(track_name.lower(), artist_names.lower()): track_id}
+
+    @classmethod
+    def from_enriched_csvs(cls, interim_dir=INTERIM_DIR):
+        """Erzeugt den Korpus aus den vorhandenen enriched_data*.csv und unique_tracks_with_ids*.csv."""
+        interim_dir = Path(interim_dir)
+        df_meta = pd.concat(
+            [pd.read_csv(p) for p in sorted(interim_dir.glob("enriched_data*.csv"))],
+            ignore_index=True
+        ).dropna(subset=["track_id"]).drop_duplicates("track_id", keep="last")
+
+        tracks, artists = {}, {}
+        for r in df_meta.itertuples(index=False):
+            tracks[r.track_id] = {
+                "id": r.track_id,
+                "name": r.track_name,
+                "artists": [{"id": r.artist_id}] if pd.notna(r.artist_id) else [],
+                "album": {"release_date": r.release_date if pd.notna(r.release_date) else "1900-01-01"},
+                "explicit": bool(r.explicit),
+                "popularity": int(r.track_popularity) if pd.notna(r.track_popularity) else 0,
+            }
+            if pd.notna(r.artist_id):
+                genres = r.artist_genres if isinstance(r.artist_genres, str) else ""
+                artists[r.artist_id] = {
+                    "id": r.artist_id,
+                    "genres": [g for g in genres.split("|") if g],
+                    "followers": {"total": int(r.artist_followers) if pd.notna(r.artist_followers) else 0},
+                    "popularity": int(r.artist_popularity) if pd.notna(r.artist_popularity) else 0,
+                }
+
+        df_ids = pd.concat(
+            [pd.read_csv(p) for p in sorted(interim_dir.glob("unique_tracks_with_ids*.csv"))],
+            ignore_index=True
+        ).dropna(subset=["track_id"])
+        names = {
+            (str(r.track_name).lower(), str(r.artist_names).lower()): r.track_id
+            for r in df_ids.itertuples(index=False)
+            if r.track_id in tracks
+        }
+        return cls(tracks, artists, names)
+
+    def search(self, track_name, artist_names):
+        track_id = self.names.get((track_name.lower(), artist_names.lower()))
+        return [self.tracks[track_id]] if track_id else []
+
+
+# ____ FAKE-TRANSPORT ____
+
+class FakeSpotifyAdapter(BaseAdapter):
+    """
+    requests-Transport, der die Spotify-Endpunkte lokal beantwortet.
+
+    Args:
+        corpus (FakeSpotifyCorpus)
+        latency (float): künstliche Antwortzeit pro Request in Sekunden
+        rate_limit_prob (float): Anteil der API-Requests, die mit 429 beantwortet werden
+        retry_after (float): Wert des Retry-After-Headers bei 429
+        token_ttl_requests (int, optional): Token läuft nach so vielen API-Requests ab (401)
+        seed (int): Seed für reproduzierbare 429-Injektion
+    """
+
+    def __init__(self, corpus, latency=0.0, rate_limit_prob=0.0, retry_after=0.1,
+                 token_ttl_requests=None, seed=42):
+        super().__init__()
+        self.corpus = corpus
+        self.latency = latency
+        self.rate_limit_prob = rate_limit_prob
+        self.retry_after = retry_after
+        self.token_ttl_requests = token_ttl_requests
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._token_no = 0
+        self._token_uses = 0
+        self.stats = {"token": 0, "search": 0, "tracks": 0, "artists": 0, "429": 0, "401": 0}
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlsplit(request.url)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/api/token":
+            with self._lock:
+                self._token_no += 1
+                self._token_uses = 0
+                self.stats["token"] += 1
+                token = f"fake-token-{self._token_no}"
+            return _make_response(request, 200, {"access_token": token})
+
+        with self._lock:
+            if request.headers.get("Authorization") != f"Bearer fake-token-{self._token_no}" or (
+                self.token_ttl_requests is not None and self._token_uses >= self.token_ttl_requests
+            ):
+                self.stats["401"] += 1
+                return _make_response(request, 401, {"error": {"status": 401, "message": "The access token expired"}})
+            self._token_uses += 1
+
+            if self._rng.random() < self.rate_limit_prob:
+                self.stats["429"] += 1
+                return _make_response(request, 429, {"error": {"status": 429}},
+                                      headers={"Retry-After": str(self.retry_after)})
+
+        if url.path == "/v1/search":
+            match = re.match(r"track:(.*) artist:(.*)", query.get("q", ""))
+            items = self.corpus.search(*match.groups()) if match else []
+            with self._lock:
+                self.stats["search"] += 1
+            return _make_response(request, 200, {"tracks": {"items": items[:int(query.get("limit", 1))]}})
+
+        if url.path in ("/v1/tracks", "/v1/artists"):
+            ids = [i for i in query.get("ids", "").split(",") if i]
+            if len(ids) > 50:
+                return _make_response(request, 400, {"error": {"status": 400, "message": "Too many ids requested"}})
+            kind = url.path.rsplit("/", 1)[1]
+            source = self.corpus.tracks if kind == "tracks" else self.corpus.artists
+            with self._lock:
+                self.stats[kind] += 1
+            return _make_response(request, 200, {kind: [source.get(i) for i in ids]})
+
+        return _make_response(request, 404, {"error": {"status": 404}})
+
+    def close(self):
+        pass
+
+
+# ____ RECORD / REPLAY ____
+
+class RecordReplayAdapter(BaseAdapter):
+    """
+    mode="record": leitet an einen echten Transport weiter und schreibt jede Antwort
+                   in die Kassette (JSONL). Access Tokens werden geschwärzt.
+    mode="replay": beantwortet Requests ausschließlich aus der Kassette.
+    """
+
+    def __init__(self, cassette_path, mode="replay", inner=None):
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unbekannter Modus: {mode}")
+
+        self.cassette_path = Path(cassette_path)
+        self.mode = mode
+        self.inner = inner or HTTPAdapter()
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        if mode == "replay":
+            with open(self.cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def _key(request):
+        url = urlsplit(request.url)
+        query = sorted(parse_qs(url.query).items())
+        return f"{request.method} {url.path} {json.dumps(query)}"
+
+    def send(self, request, **kwargs):
+        key = self._key(request)
+
+        if self.mode == "replay":
+            with self._lock:
+                entries = self._entries.get(key)
+                if not entries:
+                    raise requests.ConnectionError(f"Kein Eintrag in der Kassette für: {key}")
+                # Mehrfach aufgezeichnete Antworten in Reihenfolge abspielen, die letzte bleibt stehen
+                entry = entries.pop(0) if len(entries) > 1 else entries[0]
+            return _make_response(request, entry["status"], entry["body"], entry["headers"])
+
+        res = self.inner.send(request, **kwargs)
+        body = res.json() if res.content else {}
+        if "access_token" in body:
+            body = {**body, "access_token": "recorded-token", "refresh_token": None}
+
+        entry = {
+            "key": key,
+            "status": res.status_code,
+            "headers": {k: v for k, v in res.headers.items() if k in ("Retry-After",)},
+            "body": body,
+        }
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return res
+
+    def close(self):
+        self.inner.close()
+
+
+def mount_adapter(http, adapter):
+    """Hängt einen Transport für alle Spotify-Hosts in die Session eines SpotifyHttp."""
+    for host in SPOTIFY_HOSTS:
+        http.session.mount(host, adapter)
+    return http
+
+
+def make_fake_http(corpus=None, latency=0.0, rate_limit_prob=0.0, retry_after=0.1,
+                   token_ttl_requests=None, seed=42, **http_kwargs):
+    """SpotifyHttp, dessen Spotify-Requests vom FakeSpotifyAdapter beantwortet werden."""
+    corpus = corpus or FakeSpotifyCorpus.from_enriched_csvs()
+    adapter = FakeSpotifyAdapter(corpus, latency, rate_limit_prob, retry_after, token_ttl_requests, seed)
+    http = mount_adapter(SpotifyHttp(**http_kwargs), adapter)
+    return http, adapter
+
+
+# ____ BENCHMARK ____
+
+def benchmark_enrichment(unique_tracks_csv, workers=(1, 4, 8), latency=0.05, rate_limit_prob=0.0,
+                         rate=1000.0, mode="uri", corpus=None):
+    """
+    Misst map_spotify_ids + enrich_tracks gegen den Fake-Server für verschiedene
+    Thread-Zahlen (ohne Cache, damit jeder Lauf die API vollständig nutzt).
+    Liefert ein DataFrame mit Laufzeit, Requests und Durchsatz pro Setting.
+    """
+    from .spotify_client import SpotifyClient
+
+    corpus = corpus or FakeSpotifyCorpus.from_enriched_csvs()
+    results = []
+
+    for n in workers:
+        http, adapter = make_fake_http(
+            corpus, latency=latency, rate_limit_prob=rate_limit_prob,
+            max_workers=n, rate=rate, burst=max(n, 1)
+        )
+        client = SpotifyClient(
+            http=http, use_cache=False,
+            client_id="fake", client_secret="fake", refresh_token="fake"
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            client.map_spotify_ids(unique_tracks_csv, Path(tmp) / "ids.csv", mode=mode)
+            t_map = time.perf_counter() - start
+
+            start = time.perf_counter()
+            df = client.enrich_tracks(Path(tmp) / "ids.csv", Path(tmp) / "enriched.csv")
+            t_enrich = time.perf_counter() - start
+
+        results.append({
+            "workers": n,
+            "tracks": len(df),
+            "requests": http.calls,
+            "map_s": round(t_map, 3),
+            "enrich_s": round(t_enrich, 3),
+            "tracks_per_s": round(len(df) / (t_map + t_enrich), 1),
+            "injected_429": adapter.stats["429"],
+        })
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrichment-Benchmark gegen den Fake-Spotify-Server")
+    parser.add_argument("--input", default=str(INTERIM_DIR / "unique_tracks_with_ids_2026-01-15.csv"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--mode", choices=["uri", "search"], default="uri")
+    args = parser.parse_args()
+
+    print(benchmark_enrichment(
+        args.input, workers=args.workers, latency=args.latency,
+        rate_limit_prob=args.rate_limit_prob, mode=args.mode
+    ).to_string(index=False))
@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+# ____ RATE LIMITER ____
+
+class TokenBucket:
+    """
+    Token-Bucket-Limiter (thread-safe).
+    Erlaubt im Mittel `rate` Requests pro Sekunde mit Bursts bis `capacity`.
+    Über pause() kann ein Retry-After der API für alle Threads umgesetzt werden.
+    """
+
+    def __init__(self, rate=10.0, capacity=10):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blockiert, bis ein Token verfügbar ist (und keine Retry-After-Pause läuft)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Sperrt den Bucket für `seconds` Sekunden (z.B. Retry-After bei HTTP 429)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+# ____ HTTP-CLIENT ____
+
+class SpotifyHttp:
+    """
+    Gemeinsamer HTTP-Client für die Spotify Web API:
+    - requests.Session mit Connection-Pool (keine neue TLS-Verbindung pro Call)
+    - Token-Bucket-Limiter, der Retry-After bei HTTP 429 respektiert
+    - Retries mit Jitter-Backoff bei Netzwerkfehlern und 5xx
+    - begrenzte Parallelität über einen Thread-Pool (map)
+    - optional transparenter Token-Refresh bei HTTP 401 (token_refresher)
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        max_workers=4,
+        rate=10.0,
+        burst=10,
+        max_retries=5,
+        backoff=0.5,
+        max_backoff=30.0,
+        timeout=10
+    ):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, burst)
+
+        # Callback(abgelaufener_token) -> neuer Token; wird bei HTTP 401 aufgerufen
+        self.token_refresher = None
+
+        # Zähler aller abgesetzten Requests (inkl. Retries), z.B. für Stage-Reports
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _sleep_backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def request(self, method, url, **kwargs):
+        """
+        Führt einen Request mit Rate-Limit und Retries aus.
+        Liefert die letzte Response (oder None, wenn jeder Versuch an einem Netzwerkfehler scheiterte).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        res = None
+        refreshed = False
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            with self._calls_lock:
+                self.calls += 1
+            try:
+                res = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                print(f"Netzwerkfehler ({url}): {e}")
+                res = None
+                self._sleep_backoff(attempt)
+                continue
+
+            if res.status_code == 401 and not refreshed and self._refresh_auth(kwargs):
+                refreshed = True
+                continue
+
+            if res.status_code not in self.RETRY_STATUS or attempt == self.max_retries:
+                return res
+
+            if res.status_code == 429:
+                retry_after = res.headers.get("Retry-After")
+                try:
+                    wait = float(retry_after)
+                except (TypeError, ValueError):
+                    wait = min(self.max_backoff, self.backoff * 2 ** attempt)
+                print(f"Rate-Limit erreicht, warte {wait:.1f}s...")
+                self.limiter.pause(wait)
+            else:
+                self._sleep_backoff(attempt)
+
+        return res
+
+    def _refresh_auth(self, kwargs):
+        """Erneuert bei abgelaufenem Bearer-Token den Authorization-Header (in kwargs)."""
+        headers = kwargs.get("headers") or {}
+        auth = headers.get("Authorization", "")
+        if self.token_refresher is None or not auth.startswith("Bearer "):
+            return False
+
+        new_token = self.token_refresher(auth[len("Bearer "):])
+        if not new_token:
+            return False
+
+        print("Access Token abgelaufen, Token wurde erneuert.")
+        kwargs["headers"] = {**headers, "Authorization": f"Bearer {new_token}"}
+        return True
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def map(self, func, items, progress=True):
+        """Wendet func parallel (max_workers Threads) auf items an, Reihenfolge bleibt erhalten."""
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in tqdm(items, disable=not progress)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(tqdm(pool.map(func, items), total=len(items), disable=not progress))
+
+
+_default_http = None
+_default_lock = threading.Lock()
+
+def get_default_http():
+    """Liefert den prozessweit geteilten SpotifyHttp-Client (lazy erzeugt)."""
+    global _default_http
+
+    with _default_lock:
+        if _default_http is None:
+            _default_http = SpotifyHttp()
+        return _default_http
@@ -1,15 +1,14 @@
-import requests
 import base64
-import time      
-import pandas as pd 
-from pprint import pprint
 
-def refresh_access_token(refresh_token, client_id, client_secret):
+from .spotify_http import get_default_http
+
+def refresh_access_token(refresh_token, client_id, client_secret, http=None):
     """Diese Funktion sendet einen POST-Request an `/api/token` 
     und liefert den aktualisierten Access Token für die App.
 
     Args:
         refresh_token (str)
+        http (SpotifyHttp, optional): gemeinsamer HTTP-Client (Default: get_default_http())
 
     Returns:
         str: Der Access Token (`None`, wenn die Anfrage versagt)
@@ -31,16 +30,17 @@ def refresh_access_token(refresh_token, client_id, client_secret):
         "refresh_token": refresh_token
     }
     
-    response = requests.post(auth_url, headers=headers, data=data)
+    http = http or get_default_http()
+    response = http.post(auth_url, headers=headers, data=data)
     
-    if response.status_code == 200:
+    if response is not None and response.status_code == 200:
         return response.json().get("access_token")
-    else:
+    elif response is not None:
         print(f"Fehler: {response.status_code}")
-        print(response.json())
-        return None
+        print(response.text)
+    return None
 
-def get_spotify_ids(track_name, artist_name, token):
+def get_spotify_ids(track_name, artist_name, token, http=None):
     """Sucht Track- und Artist_ID für eine Namen-Kombination."""
 
     search_url="https://api.spotify.com/v1/search"
@@ -53,9 +53,10 @@ def get_spotify_ids(track_name, artist_name, token):
         "limit": 1
     }
     
+    http = http or get_default_http()
     try:
-        res = requests.get(search_url, headers=headers, params=params)
-        if res.status_code == 200:
+        res = http.get(search_url, headers=headers, params=params)
+        if res is not None and res.status_code == 200:
             items = res.json().get('tracks', {}).get('items', [])
             if items:
                 track_id = items[0]['id']
@@ -65,30 +66,32 @@ def get_spotify_ids(track_name, artist_name, token):
         print(f"Fehler bei {track_name}: {e}")
     return None, None
 
-def get_artists_batch(id_list, token):
+def get_artists_batch(id_list, token, http=None):
     """Holt Genres, Follower und Popularität für bis zu 50 IDs via Query-Params."""
     url = "https://api.spotify.com/v1/artists"
     headers = {"Authorization": f"Bearer {token}"}
     
-    # requests.get baut mit 'params' automatisch das richtige ?ids=ID1,ID2 Format
+    # 'params' baut automatisch das richtige ?ids=ID1,ID2 Format
     params = {"ids": ",".join(id_list)}
     
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code == 200:
+    http = http or get_default_http()
+    response = http.get(url, headers=headers, params=params)
+    if response is not None and response.status_code == 200:
         return response.json().get('artists', [])
     else:
-        print(f"Fehler Artist-Batch: {response.status_code}")
+        print(f"Fehler Artist-Batch: {getattr(response, 'status_code', 'keine Antwort')}")
         return []
 
-def get_tracks_batch(id_list, token):
+def get_tracks_batch(id_list, token, http=None):
     """Holt Release-Datum, Popularity und Explicit-Flag für bis zu 50 IDs."""
     url = "https://api.spotify.com/v1/tracks"
     headers = {"Authorization": f"Bearer {token}"}
     params = {"ids": ",".join(id_list)}
     
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code == 200:
+    http = http or get_default_http()
+    response = http.get(url, headers=headers, params=params)
+    if response is not None and response.status_code == 200:
         return response.json().get('tracks', [])
     else:
-        print(f"Fehler Track-Batch: {response.status_code}")
+        print(f"Fehler Track-Batch: {getattr(response, 'status_code', 'keine Antwort')}")
         return []
@@ -0,0 +1,204 @@
+"""
+Synthetische Spotify-Charts im echten Schema (Benchmarks, Lasttests ohne echte Daten).
+
+- generate_charts(): Wochen-Charts im Schema von regional-<region>-weekly-YYYY-MM-DD.csv
+  plus passende Metadaten-Tabelle im Schema von enriched_data_YYYY-MM-DD.csv
+- skalierbar über Wochen, Regionen, Chart-Tiefe, Anzahl Genres und Artist-Schiefe
+- write_chart_files() / history_frame(): Roh-Dateien bzw. Historie wie hist_data_updated.csv
+
+Die Defaults entsprechen ungefähr den echten Daten (107 Wochen Global Top 200,
+ca. 1.700 Tracks, 520 Artists, 230 Genres).
+
+Aufruf: python -m src.synthetic_charts --weeks 107 --depth 200 --out data/interim/synthetic
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .history_store import HISTORY_COLUMNS
+
+BASE62 = np.array(list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"))
+
+RAW_COLUMNS = [
+    "rank", "uri", "artist_names", "track_name", "source",
+    "peak_rank", "previous_rank", "weeks_on_chart", "streams"
+]
+META_COLUMNS = [
+    "track_id", "track_name", "artist_id", "release_date", "explicit", "track_popularity",
+    "artist_genres", "artist_followers", "artist_popularity"
+]
+
+
+def spotify_ids(n, rng):
+    """n zufällige, reproduzierbare 22-stellige Base62-IDs (wie Spotify-IDs)."""
+    digits = rng.integers(0, 62, size=(n, 22))
+    return pd.Series(BASE62[digits].view("<U22").ravel(), dtype=object)
+
+
+def _zipf_choice(rng, n_items, size, skew):
+    """size Ziehungen aus n_items mit Wahrscheinlichkeit ∝ 1 / Rang^skew."""
+    weights = 1.0 / np.arange(1, n_items + 1) ** skew
+    return rng.choice(n_items, size=size, p=weights / weights.sum())
+
+
+# ____ GENERATOR ____
+
+def generate_charts(weeks=107, regions=("global",), depth=200, n_genres=230, artist_skew=0.8,
+                    start="2024-01-04", churn=0.08, seed=42):
+    """
+    Erzeugt Wochen-Charts und die zugehörigen Track-/Artist-Metadaten.
+
+    Tracks erscheinen laufend neu (churn · depth pro Woche), haben eine Lebensdauer
+    und eine Grund-Popularität; pro Region und Woche werden die depth Tracks mit dem
+    höchsten Score platziert. Artists werden Zipf-verteilt (artist_skew) auf Tracks
+    verteilt, Genres ebenso auf Artists.
+
+    Args:
+        weeks: Anzahl chart_weeks (ab start, wöchentlich)
+        regions: Regionen (je Region ein eigener Chart)
+        depth: Chart-Tiefe pro Region und Woche
+        n_genres: Anzahl unterschiedlicher Genres
+        artist_skew: Zipf-Exponent der Tracks pro Artist (größer = wenige Stars)
+
+    Returns:
+        (charts, meta): charts mit chart_week, region + RAW_COLUMNS; meta mit META_COLUMNS
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=weeks, freq="7D")
+
+    # ____ Track-Pool ____
+    n_new = max(1, int(depth * churn))
+    n_tracks = 3 * depth + weeks * n_new
+    release_week = np.concatenate([
+        rng.integers(-52, 0, 3 * depth),                  # Katalog vor dem ersten Chart
+        np.repeat(np.arange(weeks), n_new),               # laufende Neuerscheinungen
+    ])
+    lifetime = rng.geometric(1 / 14, n_tracks) + 2
+    base = rng.lognormal(0.0, 0.8, n_tracks)
+    evergreen = rng.random(n_tracks) < 0.05               # Dauerbrenner (z.B. "Mr. Brightside")
+    lifetime[evergreen] = 10 * weeks
+
+    n_artists = max(1, n_tracks // 3)
+    artist_of = _zipf_choice(rng, n_artists, n_tracks, artist_skew)
+
+    # ____ Platzierungen pro Region und Woche ____
+    frames = []
+    for r, region in enumerate(regions):
+        regional = base * rng.lognormal(0.0, 0.5 if r else 0.0, n_tracks)
+        for w, date in enumerate(dates):
+            age = w - release_week
+            active = np.flatnonzero((age >= 0) & (age < lifetime))
+            score = regional[active] * np.exp(-age[active] / lifetime[active]) * rng.lognormal(0.0, 0.1, len(active))
+
+            top = active[np.argsort(-score, kind="stable")[:depth]]
+            frames.append(pd.DataFrame({
+                "chart_week": date,
+                "region": region,
+                "rank": np.arange(1, len(top) + 1),
+                "track": top,
+            }))
+
+    charts = pd.concat(frames, ignore_index=True)
+    n = len(charts)
+
+    # Streams fallen mit dem Rang (Top 1 ca. 60 Mio., Rang 200 ca. 8 Mio. im Global-Chart)
+    region_scale = pd.Series(
+        np.concatenate([[1.0], rng.uniform(0.02, 0.3, len(regions) - 1)]), index=list(regions)
+    )
+    charts["streams"] = (
+        6e7 * charts["rank"].to_numpy() ** -0.38
+        * charts["region"].map(region_scale).to_numpy()
+        * rng.lognormal(0.0, 0.05, n)
+    ).astype(np.int64)
+
+    # peak_rank, previous_rank, weeks_on_chart je (Region, Track)
+    charts = charts.sort_values(["region", "track", "chart_week"], kind="stable")
+    grp = charts.groupby(["region", "track"], sort=False)
+    charts["peak_rank"] = grp["rank"].cummin()
+    charts["weeks_on_chart"] = grp.cumcount() + 1
+    consecutive = grp["chart_week"].diff() == pd.Timedelta(days=7)
+    charts["previous_rank"] = grp["rank"].shift(1).where(consecutive, -1).astype(np.int64)
+    charts = charts.sort_values(["region", "chart_week", "rank"], kind="stable").reset_index(drop=True)
+
+    # ____ Namen und IDs ____
+    track_ids = spotify_ids(n_tracks, rng)
+    artist_ids = spotify_ids(n_artists, rng)
+    track_names = pd.Series([f"Track {i:06d}" for i in range(n_tracks)], dtype=object)
+    artist_names = pd.Series([f"Artist {i:05d}" for i in range(n_artists)], dtype=object)
+
+    tracks = charts["track"].to_numpy()
+    charts["uri"] = "spotify:track:" + track_ids.to_numpy()[tracks]
+    charts["artist_names"] = artist_names.to_numpy()[artist_of[tracks]]
+    charts["track_name"] = track_names.to_numpy()[tracks]
+    charts["source"] = charts["artist_names"]
+    charts = charts[["chart_week", "region"] + RAW_COLUMNS]
+
+    # ____ Metadaten (enriched_data) für alle gecharteten Tracks ____
+    charted = np.unique(tracks)
+    genre_names = np.array([f"genre {i:04d}" for i in range(n_genres)], dtype=object)
+    n_artist_genres = np.minimum(rng.poisson(1.5, n_artists), 6)
+    artist_genres = np.array([
+        "|".join(genre_names[np.unique(_zipf_choice(rng, n_genres, k, 1.0))]) if k else ""
+        for k in n_artist_genres
+    ], dtype=object)
+
+    artist_rank = np.bincount(artist_of, minlength=n_artists)
+    artist_followers = (rng.lognormal(13, 1.5, n_artists) * (1 + artist_rank)).astype(np.int64)
+    artist_popularity = np.clip(50 + 8 * np.log1p(artist_rank) + rng.normal(0, 5, n_artists), 0, 100).astype(int)
+
+    release_date = dates[0] + pd.to_timedelta(release_week[charted] * 7, unit="D")
+    a = artist_of[charted]
+    meta = pd.DataFrame({
+        "track_id": track_ids.to_numpy()[charted],
+        "track_name": track_names.to_numpy()[charted],
+        "artist_id": artist_ids.to_numpy()[a],
+        "release_date": release_date.strftime("%Y-%m-%d"),
+        "explicit": rng.random(len(charted)) < 0.3,
+        "track_popularity": np.clip(60 + 15 * np.log(base[charted]) + 20, 0, 100).astype(int),
+        "artist_genres": artist_genres[a],
+        "artist_followers": artist_followers[a],
+        "artist_popularity": artist_popularity[a],
+    })
+    return charts, meta[META_COLUMNS]
+
+
+# ____ DATEIEN ____
+
+def write_chart_files(charts, out_dir):
+    """Eine Roh-Datei pro Region und Woche (regional-<region>-weekly-YYYY-MM-DD.csv)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for (region, week), df in charts.groupby(["region", "chart_week"], sort=True):
+        path = out_dir / f"regional-{region}-weekly-{week:%Y-%m-%d}.csv"
+        df[RAW_COLUMNS].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def history_frame(charts, meta):
+    """Charts + Metadaten im Schema der Historie (wie hist_data_updated.csv)."""
+    df = charts.assign(track_id=charts["uri"].str.slice(len("spotify:track:")))
+    df = df.merge(meta.drop(columns=["track_name"]), on="track_id", how="left")
+    return df[HISTORY_COLUMNS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetische Chart-Daten im echten Schema erzeugen")
+    parser.add_argument("--weeks", type=int, default=107)
+    parser.add_argument("--regions", nargs="+", default=["global"])
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--genres", type=int, default=230)
+    parser.add_argument("--artist-skew", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="data/interim/synthetic")
+    args = parser.parse_args()
+
+    charts, meta = generate_charts(
+        args.weeks, args.regions, args.depth, args.genres, args.artist_skew, seed=args.seed
+    )
+    paths = write_chart_files(charts, Path(args.out) / "raw")
+    meta.to_csv(Path(args.out) / "enriched_data_synthetic.csv", index=False)
+    print(f"{len(charts):,} Chart-Zeilen in {len(paths)} Dateien, {len(meta):,} Tracks ({args.out}).")
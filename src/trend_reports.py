@@ -1,7 +1,8 @@
 import os
-import pandas as pd
 from google import genai
 
+from .genres import top_genre_names
+
 def generate_gemini_report(df_display, top_10):
     """
     Erstellt einen KI-Trendbericht basierend auf den aktuellen Dashboard-Daten.
@@ -21,19 +22,9 @@ def generate_gemini_report(df_display, top_10):
         return "Top-10-Daten fehlen. Ein Bericht kann nicht erstellt werden."
     
     # Daten-Aggregation für den Prompt
-    if "artist_genres" in df_display.columns:
-        df_genres = df_display.copy()
-        df_genres["artist_genres"] = df_genres["artist_genres"].apply(
-            lambda x: x if isinstance(x, list) else [str(x)] if pd.notna(x) else ["unknown"]
-        )
-        df_genres = df_genres.explode("artist_genres")
-        top_genres = (
-            df_genres["artist_genres"]
-            .value_counts()
-            .head(5)
-            .index
-            .tolist()
-        )
+    if "genre_ids" in df_display.columns or "artist_genres" in df_display.columns:
+        # Häufigste Genres direkt über die Genre-IDs zählen (kein Explode von Listen)
+        top_genres = top_genre_names(df_display, n=5)
     else:
         top_genres = ["unknown"]
         
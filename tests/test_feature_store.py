@@ -0,0 +1,99 @@
+"""
+FeatureStore: Bootstrap, inkrementelles update über mehrere neue Wochen und verify()
+gegen einen vollständigen build_features-Lauf, auf synthetischen Charts.
+"""
+import pandas as pd
+import pytest
+
+from src.feature_store import FeatureStore
+from src.history_store import HistoryStore
+from src.synthetic_charts import generate_charts, history_frame
+
+N_WEEKS = 12
+N_BOOTSTRAP = 8
+
+
+@pytest.fixture
+def charts():
+    charts, meta = generate_charts(weeks=N_WEEKS, depth=60, n_genres=40, seed=3)
+    return history_frame(charts, meta)
+
+
+@pytest.fixture
+def stores(charts, tmp_path):
+    """HistoryStore aus einer Historien-CSV der ersten Wochen (wie die Migration) plus leerer FeatureStore."""
+    weeks = sorted(charts["chart_week"].unique())
+    hist_path = tmp_path / "hist_data_updated.csv"
+    charts[charts["chart_week"] < weeks[N_BOOTSTRAP]].to_csv(hist_path, index=False)
+
+    history = HistoryStore(tmp_path / "history")
+    history.bootstrap_from_csv(hist_path)
+    return history, FeatureStore(tmp_path / "features")
+
+
+def count_rebuilds(monkeypatch, store):
+    calls = []
+    rebuild = store.rebuild
+    monkeypatch.setattr(store, "rebuild", lambda history: calls.append(1) or rebuild(history))
+    return calls
+
+
+def test_update_over_appended_weeks_matches_full_build(charts, stores, monkeypatch):
+    history, store = stores
+    rebuilds = count_rebuilds(monkeypatch, store)
+
+    store.update(history)
+    assert store.verify(history)
+    assert len(rebuilds) == 1 and len(store.weeks()) == N_BOOTSTRAP
+
+    # Neue Wochen einzeln anhängen: nur inkrementell, nach jeder Woche bitgleich
+    for week, df_week in list(charts.groupby("chart_week", sort=True))[N_BOOTSTRAP:]:
+        history.write_week(df_week, week)
+        store.update(history)
+        assert store.verify(history)
+
+    assert len(rebuilds) == 1
+    assert store.weeks() == history.weeks()
+    assert len(store.read()) == history.n_rows()
+
+
+def test_replaced_older_week_triggers_rebuild(charts, stores, monkeypatch):
+    history, store = stores
+    store.update(history)
+    rebuilds = count_rebuilds(monkeypatch, store)
+
+    # Korrigierte Datei für eine ältere Woche: eine Zeile weniger
+    week = history.weeks()[3]
+    df_week = charts[charts["chart_week"] == pd.Timestamp(week)]
+    history.write_week(df_week.iloc[1:], week)
+    store.update(history)
+
+    assert len(rebuilds) == 1
+    assert store.verify(history)
+
+
+def test_verify_detects_diverging_partition(stores):
+    history, store = stores
+    store.update(history)
+
+    # Features einer Woche verfälschen, ohne den State anzupassen
+    path = store.week_dir / store.manifest["weeks"][store.weeks()[-1]]["file"]
+    df = pd.read_parquet(path)
+    df["artist_growth_rate"] = df["artist_growth_rate"] + 1.0
+    df.to_parquet(path, index=False)
+
+    with pytest.raises(AssertionError):
+        store.verify(history)
+
+
+def test_verify_detects_diverging_list_column(stores, monkeypatch):
+    history, store = stores
+    store.update(history)
+
+    # genre_ids entsteht erst beim Lesen; nur die Listen-Spalte weicht ab
+    df = store.read()
+    df["genre_ids"] = df["genre_ids"].map(lambda ids: list(ids) + [-1])
+    monkeypatch.setattr(store, "read", lambda: df)
+
+    with pytest.raises(AssertionError, match="genre_ids"):
+        store.verify(history)
@@ -0,0 +1,94 @@
+"""
+genres.genre_pop_index gegen die ursprüngliche pandas-Berechnung
+(explode → groupby → merge → groupby → merge), bitgleich.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.genres import explode_genres, genre_pop_index, parse_genres
+from src.keys import add_keys
+from src.synthetic_charts import generate_charts, history_frame
+
+
+def reference_genre_pop_index(df):
+    """Die bisherige Berechnung aus features.py."""
+    genre_df = explode_genres(df, ["chart_week", "track_id", "streams"])
+
+    # Durchschnittliche Streams pro Genre pro Woche
+    genre_stats = (
+        genre_df.groupby(["chart_week", "genre"], observed=True)["streams"]
+        .mean()
+        .rename("genre_pop_idx")
+        .reset_index()
+    )
+
+    # Merge Genre-Stats zurück
+    genre_df = genre_df.merge(genre_stats, on=["chart_week", "genre"], how="left")
+
+    # Durchschnittlicher Genre-Index pro Track
+    song_genre_index = (
+        genre_df.groupby(["chart_week", "track_id"], observed=True)["genre_pop_idx"]
+        .mean()
+        .reset_index()
+    )
+
+    merged = df[["chart_week", "track_id"]].merge(song_genre_index, on=["chart_week", "track_id"], how="left")
+    return merged["genre_pop_idx"]
+
+
+@pytest.fixture
+def charts():
+    charts, meta = generate_charts(weeks=6, depth=80, n_genres=25, seed=11)
+    df = history_frame(charts, meta)[["chart_week", "track_id", "artist_id", "artist_names",
+                                      "streams", "artist_genres"]]
+    df = df.reset_index(drop=True)
+    rng = np.random.default_rng(5)
+
+    # Sonderfälle: leere Genre-Listen, fehlende Genres ("unknown"), Listen-Strings
+    idx = rng.choice(len(df), size=60, replace=False)
+    df.loc[idx[:20], "artist_genres"] = "[]"
+    df.loc[idx[20:40], "artist_genres"] = np.nan
+    df.loc[idx[40:50], "artist_genres"] = "['pop', 'dance pop']"
+    # Fehlende Streams zählen im Mittelwert nicht mit
+    df.loc[idx[50:], "streams"] = np.nan
+
+    # Doppelte Tracks innerhalb einer Woche (andere Streams, andere Genres)
+    dupes = df.iloc[rng.choice(len(df), size=40, replace=False)].copy()
+    dupes["streams"] = dupes["streams"] * 2 + 1
+    dupes["artist_genres"] = "hip hop|pop"
+    df = pd.concat([df, dupes], ignore_index=True)
+
+    df["genre_ids"] = parse_genres(df["artist_genres"])
+    return df.sample(frac=1, random_state=2).reset_index(drop=True)
+
+
+def test_special_cases_are_present(charts):
+    lengths = charts["genre_ids"].map(len)
+    assert (lengths == 0).any()
+    assert charts["artist_genres"].isna().any()
+    assert charts.duplicated(["chart_week", "track_id"]).any()
+
+
+@pytest.mark.parametrize("block_rows", [1 << 15, 100])
+def test_matches_pandas_reference_by_track_id(charts, block_rows):
+    expected = reference_genre_pop_index(charts)
+    actual = pd.Series(genre_pop_index(charts, block_rows=block_rows), name="genre_pop_idx")
+    pd.testing.assert_series_equal(actual, expected, check_exact=True)
+
+
+def test_matches_pandas_reference_by_track_key(charts):
+    expected = reference_genre_pop_index(charts)
+    df = add_keys(charts.copy())
+    actual = pd.Series(genre_pop_index(df), name="genre_pop_idx")
+    pd.testing.assert_series_equal(actual, expected, check_exact=True)
+
+
+def test_missing_week_or_track_id_gives_nan(charts):
+    df = charts.copy()
+    df.loc[:4, "chart_week"] = pd.NaT
+    df.loc[5:9, "track_id"] = np.nan
+
+    actual = pd.Series(genre_pop_index(df), name="genre_pop_idx")
+    pd.testing.assert_series_equal(actual, reference_genre_pop_index(df), check_exact=True)
+    assert actual[:10].isna().all()
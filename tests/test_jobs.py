@@ -0,0 +1,108 @@
+"""
+JobQueue über mehrere Prozesse: zwei Queue-Instanzen auf derselben SQLite-Datei
+übernehmen keinen Job doppelt, und requeue_stale holt nur Jobs toter Besitzer zurück.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.jobs import HEARTBEAT_TIMEOUT, JobQueue, owner_alive
+
+N_JOBS = 40
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Zwei unabhängige Verbindungen auf dieselbe Datei (wie zwei Streamlit-Server)."""
+    path = tmp_path / "jobs.sqlite"
+    first, second = JobQueue(path), JobQueue(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+@pytest.fixture
+def dead_pid():
+    """PID eines beendeten Prozesses."""
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def set_owner(queue, job_id, host, pid, heartbeat_at):
+    queue._execute(
+        "UPDATE jobs SET status = 'running', owner_host = ?, owner_pid = ?, heartbeat_at = ? WHERE job_id = ?",
+        (host, pid, heartbeat_at, job_id)
+    )
+
+
+def test_no_job_is_claimed_twice(queues):
+    for i in range(N_JOBS):
+        queues[i % 2].submit("week", f"job{i:03d}")
+    # Dieselbe Datei noch einmal einreichen: wird nicht doppelt eingereiht
+    assert queues[1].submit("week", "job000") == ("job000", False)
+
+    claimed = []
+    lock = threading.Lock()
+
+    def drain(queue):
+        while (job := queue.claim()) is not None:
+            with lock:
+                claimed.append(job["job_id"])
+
+    threads = [threading.Thread(target=drain, args=(q,)) for q in queues for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(claimed) == len(set(claimed)) == N_JOBS
+    jobs = queues[0].recent(limit=N_JOBS)
+    assert all(job["status"] == "running" and job["owner_pid"] == os.getpid() for job in jobs)
+
+
+def test_owner_alive_uses_heartbeat_and_pid(dead_pid):
+    now = 1_000_000.0
+    host = socket.gethostname()
+    job = {"owner_host": host, "owner_pid": os.getpid(), "heartbeat_at": now - 5}
+
+    assert owner_alive(job, now=now)
+    assert not owner_alive(job, now=now + HEARTBEAT_TIMEOUT)
+    assert not owner_alive({**job, "heartbeat_at": None}, now=now)
+    assert not owner_alive({**job, "owner_pid": dead_pid}, now=now)
+    # Anderer Rechner: PID nicht prüfbar, nur der Heartbeat zählt
+    assert owner_alive({**job, "owner_host": f"{host}-other", "owner_pid": dead_pid}, now=now)
+    assert not owner_alive({**job, "owner_host": f"{host}-other"}, now=now + HEARTBEAT_TIMEOUT)
+
+
+def test_requeue_stale_only_takes_dead_owners(queues, dead_pid):
+    first, second = queues
+    for job_id in ("alive", "dead_pid", "silent", "remote"):
+        first.submit("week", job_id)
+
+    now = time.time()
+    host = socket.gethostname()
+    set_owner(first, "alive", host, os.getpid(), now)
+    set_owner(first, "dead_pid", host, dead_pid, now)
+    set_owner(first, "silent", host, os.getpid(), now - HEARTBEAT_TIMEOUT - 60)
+    set_owner(first, "remote", f"{host}-other", dead_pid, now)
+
+    # Die zweite Instanz räumt auf, z.B. beim Start ihres Workers
+    assert second.requeue_stale() == 2
+
+    status = {job["job_id"]: job for job in first.recent()}
+    assert status["alive"]["status"] == "running" and status["alive"]["owner_pid"] == os.getpid()
+    assert status["remote"]["status"] == "running"
+    for job_id in ("dead_pid", "silent"):
+        assert status[job_id]["status"] == "queued"
+        assert status[job_id]["owner_pid"] is None and status[job_id]["heartbeat_at"] is None
+
+    # Wieder eingereihte Jobs werden genau einmal neu übernommen
+    reclaimed = {second.claim()["job_id"], first.claim()["job_id"]}
+    assert reclaimed == {"dead_pid", "silent"}
+    assert first.claim() is None and second.claim() is None
@@ -0,0 +1,131 @@
+"""
+map_spotify_ids + enrich_tracks gegen den Fake-Server (spotify_fake.py) mit
+429-Injektion: alle Tracks müssen ankommen, jeder 429 kostet genau einen Retry.
+"""
+import math
+
+import pandas as pd
+import pytest
+
+from src.spotify_cache import SpotifyCache
+from src.spotify_client import SpotifyClient
+from src.spotify_fake import FakeSpotifyCorpus, make_fake_http
+
+N_TRACKS = 120
+N_ARTISTS = 30
+
+
+@pytest.fixture
+def corpus():
+    tracks, artists, names = {}, {}, {}
+    for i in range(N_ARTISTS):
+        artist_id = f"artist{i:03d}"
+        artists[artist_id] = {
+            "id": artist_id,
+            "genres": ["pop", f"genre {i % 7}"],
+            "followers": {"total": 1000 * (i + 1)},
+            "popularity": 40 + i,
+        }
+    for i in range(N_TRACKS):
+        track_id = f"track{i:04d}"
+        artist_id = f"artist{i % N_ARTISTS:03d}"
+        tracks[track_id] = {
+            "id": track_id,
+            "name": f"Song {i}",
+            "artists": [{"id": artist_id}],
+            "album": {"release_date": "2025-01-01"},
+            "explicit": i % 3 == 0,
+            "popularity": i % 100,
+        }
+        names[(f"song {i}", f"artist {i % N_ARTISTS}")] = track_id
+    return FakeSpotifyCorpus(tracks, artists, names)
+
+
+def make_client(corpus, tmp_path, rate_limit_prob, max_retries=10, seed=7):
+    http, adapter = make_fake_http(
+        corpus, rate_limit_prob=rate_limit_prob, retry_after=0, seed=seed,
+        max_workers=4, rate=10_000, burst=50, max_retries=max_retries, backoff=0
+    )
+    client = SpotifyClient(
+        http=http, cache=SpotifyCache(tmp_path / "spotify_cache.sqlite"),
+        client_id="fake", client_secret="fake", refresh_token="fake"
+    )
+    return client, http, adapter
+
+
+def write_unique_tracks(path, with_ids=False):
+    df = pd.DataFrame({
+        "track_name": [f"Song {i}" for i in range(N_TRACKS)],
+        "artist_names": [f"Artist {i % N_ARTISTS}" for i in range(N_TRACKS)],
+    })
+    if with_ids:
+        df["track_id"] = [f"track{i:04d}" for i in range(N_TRACKS)]
+    df.to_csv(path, index=False)
+    return path
+
+
+def successful_requests(adapter):
+    return sum(adapter.stats[k] for k in ("token", "search", "tracks", "artists"))
+
+
+def test_search_mapping_and_enrichment_survive_rate_limits(corpus, tmp_path):
+    client, http, adapter = make_client(corpus, tmp_path, rate_limit_prob=0.3)
+
+    df_ids = client.map_spotify_ids(write_unique_tracks(tmp_path / "unique.csv"), tmp_path / "ids.csv")
+    df = client.enrich_tracks(tmp_path / "ids.csv", tmp_path / "enriched.csv")
+
+    assert len(df_ids) == N_TRACKS and df_ids["track_id"].notna().all()
+    assert len(df) == N_TRACKS and df["track_id"].is_unique
+    assert df["artist_genres"].str.contains("pop").all()
+    assert not (tmp_path / "enriched.checkpoint.jsonl").exists()
+
+    # Jeder 429 wurde wiederholt: gezählte Requests = erfolgreiche + abgewiesene
+    assert adapter.stats["429"] > 0
+    assert adapter.stats["search"] == N_TRACKS
+    assert adapter.stats["tracks"] == math.ceil(N_TRACKS / 50)
+    assert adapter.stats["artists"] == math.ceil(N_ARTISTS / 50)
+    assert http.calls == successful_requests(adapter) + adapter.stats["429"]
+    assert sum(client.api_calls.values()) == http.calls - adapter.stats["token"]
+
+
+def test_uri_mapping_batches_and_cache_under_rate_limits(corpus, tmp_path):
+    client, http, adapter = make_client(corpus, tmp_path, rate_limit_prob=0.5)
+
+    client.map_spotify_ids(write_unique_tracks(tmp_path / "unique.csv", with_ids=True), tmp_path / "ids.csv")
+    df = client.enrich_tracks(tmp_path / "ids.csv", tmp_path / "enriched.csv")
+
+    assert len(df) == N_TRACKS
+    assert adapter.stats["search"] == 0
+    assert adapter.stats["429"] > 0
+    assert http.calls == successful_requests(adapter) + adapter.stats["429"]
+
+    # Zweiter Lauf: alles kommt aus dem Cache, keine API-Calls
+    df_again = client.enrich_tracks(tmp_path / "ids.csv", tmp_path / "enriched_again.csv")
+    assert len(df_again) == N_TRACKS
+    assert client.api_calls["tracks"] == 0 and client.api_calls["artists"] == 0
+
+
+def test_enrichment_fails_after_max_retries(corpus, tmp_path):
+    client, http, adapter = make_client(corpus, tmp_path, rate_limit_prob=1.0, max_retries=2)
+    write_unique_tracks(tmp_path / "ids.csv", with_ids=True)
+
+    with pytest.raises(RuntimeError, match="Enrichment unvollständig"):
+        client.enrich_tracks(tmp_path / "ids.csv", tmp_path / "enriched.csv")
+
+    # Pro Batch: erster Versuch + max_retries Wiederholungen, dann Abbruch
+    assert client.api_calls["tracks"] == math.ceil(N_TRACKS / 50) * 3
+    assert adapter.stats["tracks"] == 0
+    assert not (tmp_path / "enriched.csv").exists()
+
+
+def test_clients_do_not_share_token_refresh(corpus, tmp_path):
+    client, http, adapter = make_client(corpus, tmp_path, rate_limit_prob=0.0)
+    other, other_http, _ = make_client(corpus, tmp_path / "other", rate_limit_prob=0.0)
+
+    assert http.token_refresher == client._refresh_expired_token
+    assert other_http.token_refresher == other._refresh_expired_token
+
+    # Ein zweiter Client auf demselben HTTP-Client würde den Token-Refresh überschreiben
+    with pytest.raises(ValueError, match="anderen SpotifyClient"):
+        SpotifyClient(http=http, client_id="fake", client_secret="fake", refresh_token="fake")
+    assert http.token_refresher == client._refresh_expired_token